@@ -10,10 +10,10 @@
 
 import json
 import os
-from google.genai import types
 from src.logic.cache_manager import cache_mgr  # ⚠️ 赠金账户不可用
-from src.tools.excel_handler import nutrition_tool
+from src.tools.tool_calls import parse_tool_calls, run_tool_calls, format_tool_results
 from src.logic.api_client import api_client
+from src.logic.history_manager import HistoryManager
 
 # 颜色配置 (保持你喜欢的审美)
 YOU_COLOR = "\u001b[94m"
@@ -21,17 +21,8 @@ ASSISTANT_COLOR = "\u001b[93m"
 RESET_COLOR = "\u001b[0m"
 
 def extract_tool_calls(text: str):
-    """从文本中解析出 tool: query_food({"food_name": "xxx"})"""
-    if "tool: query_food" in text:
-        try:
-            start = text.find("{")
-            end = text.rfind("}") + 1
-            json_str = text[start:end]
-            args = json.loads(json_str)
-            return args.get("food_name")
-        except:
-            return None
-    return None
+    """从文本中解析出全部 tool: query_food({"food_name": "xxx"}) 调用"""
+    return parse_tool_calls(text)
 
 def run_orchestrator():
     print(f"{ASSISTANT_COLOR}[系统初始化] 正在准备夏萌老师的知识库...{RESET_COLOR}")
@@ -47,7 +38,11 @@ def run_orchestrator():
         print(f"❌ 缓存加载失败，将使用全额 Token 模式: {e}")
         CACHE_ID = None
 
-    history = []
+    # 有界历史：最近几轮原文 + 滚动摘要，单轮 prompt 大小不随会话变长
+    history = HistoryManager(
+        token_budget=int(os.getenv("HISTORY_TOKEN_BUDGET", "6000")),
+        keep_recent_turns=int(os.getenv("HISTORY_KEEP_TURNS", "6")),
+    )
     print(f"{ASSISTANT_COLOR}[系统就绪] 夏萌老师已上线。您可以开始咨询需求了。{RESET_COLOR}")
 
     while True:
@@ -62,24 +57,27 @@ def run_orchestrator():
             # 2. 调用 API (带上缓存 ID)
             response_text = api_client.generate_response(
                 user_input=current_input, 
-                history=history, 
+                history=history.as_contents(), 
                 cache_id=CACHE_ID
             )
 
             # 3. 检查是否需要调用工具 (Excel 查表)
-            food_to_query = extract_tool_calls(response_text)
+            tool_calls = extract_tool_calls(response_text)
             
-            if food_to_query:
-                print(f"🔍 [工具调用] 正在本地查表: {food_to_query}")
-                # 0 Token 消耗的本地查询
-                tool_result = nutrition_tool.query(food_to_query)
+            if tool_calls:
+                print(f"🔍 [工具调用] 正在本地批量查表: {len(tool_calls)} 项")
+                # 0 Token 消耗的本地查询（同一回复里的所有调用一次执行完）
+                tool_result = format_tool_results(run_tool_calls(tool_calls))
                 
-                # 将工具结果作为新的“输入”喂给 AI，并记录到历史
-                history.append(types.Content(role="user", parts=[types.Part(text=f"用户输入: {current_input}")]))
-                history.append(types.Content(role="model", parts=[types.Part(text=response_text)]))
+                # 将工具结果作为新的“输入”喂给 AI，并记录到历史（工具输出在下一次提问时过期丢弃）
+                if current_input == user_input:
+                    history.add_user(current_input)
+                else:
+                    history.add_tool_result(current_input)
+                history.add_model(response_text)
                 
                 # 更新 current_input 为工具执行结果，触发下一轮推理
-                current_input = f"本地工具返回数据：{tool_result}。请基于此数据继续回答。"
+                current_input = f"本地工具返回数据：\n{tool_result}\n请基于以上数据继续回答。"
                 continue 
             else:
                 # 4. 最终回答输出
@@ -103,16 +101,19 @@ def run_orchestrator():
                         # 调用我们之前写的脚本
                         from scripts.output_formatter import BookClubReport
                         reporter = BookClubReport(extracted_json)
-                        reporter.save_report()
-                        print(f"✅ [系统提示] 需求已补齐，夏萌老师已为您生成策划案：output/plan_v1.md")
+                        report_path = reporter.save_report()
+                        print(f"✅ [系统提示] 需求已补齐，夏萌老师已为您生成策划案：{report_path}")
                         
                     except Exception as e:
                         print(f"⚠️ [系统提示] 尝试生成策划案时出错，可能是 JSON 格式不规范: {e}")
                 # --- 结束插入 ---
 
-                # 存入对话历史
-                history.append(types.Content(role="user", parts=[types.Part(text=user_input)]))
-                history.append(types.Content(role="model", parts=[types.Part(text=response_text)]))
+                # 存入对话历史（超出预算的早期轮次会自动折叠进摘要）
+                if current_input == user_input:
+                    history.add_user(current_input)
+                else:
+                    history.add_tool_result(current_input)
+                history.add_model(response_text)
                 break
 
 if __name__ == "__main__":
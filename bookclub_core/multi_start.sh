@@ -13,17 +13,14 @@ echo -e "${BLUE}  BookClub Core - 智能启动系统${NC}"
 echo -e "${BLUE}━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━${NC}"
 
 # 1. 清理旧进程和缓存
-echo -e "\n${YELLOW}[1/5] 清理旧进程和缓存...${NC}"
+echo -e "\n${YELLOW}[1/5] 清理旧进程...${NC}"
 pkill -9 -f "openagents" || true
 lsof -i:8700,8600 -t | xargs kill -9 2>/dev/null || true
 sleep 1
 
-# 清理 Python 缓存（确保加载最新代码）
-echo -e "${BLUE}→ 清理 Python 缓存...${NC}"
-find . -type d -name "__pycache__" -exec rm -rf {} + 2>/dev/null || true
-find . -name "*.pyc" -delete 2>/dev/null || true
-
-echo -e "${GREEN}✓ 旧进程已清理，缓存已刷新${NC}"
+# 保留 __pycache__：Python 会按源文件 mtime 自动失效旧字节码，
+# 删除缓存只会让每个 Agent 重启时都重新编译一遍（拖慢到达 ✅ [Ready] 的时间）
+echo -e "${GREEN}✓ 旧进程已清理${NC}"
 
 # 2. 激活 Conda 环境
 echo -e "\n${YELLOW}[2/5] 激活 Conda 环境 bookclub_env...${NC}"
@@ -75,6 +72,13 @@ fi
 
 export PYTHONPATH=$(pwd):$PYTHONPATH
 
+# 预编译字节码（只编译有改动的文件），并检查启动耗时预算
+echo -e "${BLUE}→ 预编译字节码...${NC}"
+python -m compileall -q src scripts >/dev/null 2>&1 || true
+if [ "${CHECK_STARTUP:-0}" = "1" ]; then
+    python scripts/check_startup.py || echo -e "${YELLOW}⚠ 启动耗时超出预算（见上方明细）${NC}"
+fi
+
 # 4. 启动系统
 echo -e "\n${YELLOW}[4/5] 启动多 Agent 网络...${NC}"
 echo -e "${BLUE}→ 启动基座 (Network Base)...${NC}"
@@ -136,6 +140,10 @@ else
     echo -e "${YELLOW}  ⚠ PDF 上传状态未知（查看 content.log）${NC}"
 fi
 
+# 检查知识库预热状态（.health/*.json，由 Agent 后台预热时写入）
+echo -e "\n🔥 预热状态："
+python scripts/healthcheck.py --wait 30 bc-intake bc-content bc-ops || echo -e "${YELLOW}  ⚠ 部分 Agent 仍在预热（不影响 intake 使用，稍后可重跑 python scripts/healthcheck.py）${NC}"
+
 # 检查网络端口
 echo -e "\n🌐 网络服务："
 if lsof -i:8700 -t >/dev/null 2>&1; then
@@ -0,0 +1,288 @@
+"""
+离线批量生成 - 一次准备几十个读书会方案（不经过 OpenAgents 网络 / Studio）
+
+用法：
+    python scripts/batch_generate.py specs.jsonl
+    python scripts/batch_generate.py specs.csv --name 2026-10-night --llm-concurrency 4
+    python scripts/batch_generate.py specs.jsonl --stages intake,content   # 只跑前两步
+
+输入（JSONL 每行一个对象 / CSV 每行一条，字段相同）：
+    id          方案 ID（可选，默认取内容哈希）
+    text        完整的 @bc-intake 需求文本（给出时忽略下面的结构化字段）
+    host        主理人，如 "注册营养师Eva"
+    specialty   专业特长
+    style       风格偏好
+    days        交付天数（默认 3）
+    recruit_days 招募天数（默认 7）
+    product / product_benefit / product_position  产品信息（可选）
+
+执行方式：
+    - 每个方案依次跑 intake → content → ops，直接调用 BookClubAgent 的生成核心
+      （_execute_reasoning / generate_content / generate_ops），知识库照常预热
+    - 所有方案共享一个 LLM 网关，全局在途调用数 ≤ --llm-concurrency（吞吐只受 API 配额限制）
+    - Word / 微信版渲染放进进程池，不占用事件循环
+    - 结果清单 output/batch/<name>/manifest.jsonl：每完成一个 (方案, 步骤) 追加一行，
+      中断后用同样的参数重跑，已成功且输入未变的步骤直接跳过
+"""
+
+import argparse
+import asyncio
+import csv
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src.agents.base_agent import GenerationError, is_failure  # noqa: E402
+from src.logic.exporters import render_outputs  # noqa: E402
+from src.logic.generation_index import generation_index  # noqa: E402
+from src.logic.llm_gateway import llm_gateway  # noqa: E402
+from src.logic.tracing import tracer  # noqa: E402
+
+BATCH_DIR = os.path.join("output", "batch")
+STAGES = ("intake", "content", "ops")
+
+
+# ---------- 输入 ----------
+def load_specs(path: str):
+    if path.lower().endswith(".csv"):
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            rows = [dict(r) for r in csv.DictReader(f)]
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    specs = []
+    for row in rows:
+        row = {k: v for k, v in row.items() if v not in (None, "")}
+        text = spec_to_text(row)
+        spec_id = str(row.get("id") or hashlib.sha256(text.encode("utf-8")).hexdigest()[:12])
+        specs.append({"id": spec_id, "text": text, "days": int(row["days"]) if row.get("days") else None})
+    return specs
+
+
+def spec_to_text(row: dict) -> str:
+    """结构化字段 → 与欢迎消息中 Prompt 模板一致的 intake 文本"""
+    if row.get("text"):
+        return row["text"]
+    days = row.get("days", 3)
+    lines = [
+        f"我是{row.get('host', '主理人')}，想做一个 {days} 天的读书会。",
+        "",
+        "【书籍信息】",
+        "书名：《你是你吃出来的》",
+        "",
+        "【主理人信息】",
+        f"专业特长：{row.get('specialty', '临床营养')}",
+    ]
+    if row.get("style"):
+        lines.append(f"风格偏好：{row['style']}")
+    lines += [
+        "",
+        "【项目参数】",
+        f"交付周期：{days}天",
+        f"招募周期：{row.get('recruit_days', 7)}天",
+    ]
+    if row.get("product"):
+        lines += ["", "【产品信息】", f"产品名：{row['product']}"]
+        if row.get("product_benefit"):
+            lines.append(f"功效：{row['product_benefit']}")
+        if row.get("product_position"):
+            lines.append(f"定位：{row['product_position']}")
+    return "\n".join(lines)
+
+
+def _hash(*parts: str) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()[:16]
+
+
+# ---------- 结果清单（可续跑） ----------
+class Manifest:
+    def __init__(self, path: str):
+        self.path = path
+        self.done = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # 中断时可能留下半行
+                    if record.get("status") == "ok":
+                        self.done[(record["spec_id"], record["stage"])] = record
+                    else:
+                        self.done.pop((record["spec_id"], record["stage"]), None)
+        self._file = open(path, "a", encoding="utf-8", buffering=1)
+
+    def lookup(self, spec_id: str, stage: str, input_hash: str):
+        record = self.done.get((spec_id, stage))
+        if record and record.get("input_hash") == input_hash and os.path.exists(record.get("markdown", "")):
+            return record
+        return None
+
+    def append(self, record: dict):
+        if record["status"] == "ok":
+            self.done[(record["spec_id"], record["stage"])] = record
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+# ---------- Agent（离线构造，不连接网络） ----------
+def build_offline_agent(role: str, model_name: str = None):
+    """按 agents/<role>.yaml 构造 Agent（与 openagents agent start 相同的加载器；model_name 可覆盖 YAML 中的模型）"""
+    from openagents.agents.runner import AgentRunner
+
+    agent = AgentRunner.from_yaml(os.path.join(PROJECT_ROOT, "agents", f"{role}.yaml"))
+    if model_name:
+        agent.model_name = model_name
+        agent.llm = llm_gateway.model(model_name)
+    return agent
+
+
+class BatchRunner:
+    def __init__(self, name: str, stages, jobs: int, render_workers: int):
+        self.out_dir = os.path.join(BATCH_DIR, name)
+        os.makedirs(self.out_dir, exist_ok=True)
+        self.manifest = Manifest(os.path.join(self.out_dir, "manifest.jsonl"))
+        self.stages = stages
+        self.jobs = asyncio.Semaphore(jobs)
+        self.pool = ProcessPoolExecutor(max_workers=render_workers)
+        self.agents = {}
+        self.stats = {"ok": 0, "skipped": 0, "error": 0}
+
+    async def start(self):
+        for role in self.stages:
+            self.agents[role] = build_offline_agent(role)
+        # 与 on_startup 相同的知识库预热（PDF 索引 / 膳食规则 / 营养速查表）
+        await asyncio.gather(*(agent._warm_up() for agent in self.agents.values()))
+
+    async def _render(self, text: str, base_path: str):
+        loop = asyncio.get_running_loop()
+        with tracer.span("batch.render", file=os.path.basename(base_path)):
+            return await loop.run_in_executor(self.pool, render_outputs, text, base_path)
+
+    async def _stage(self, spec, stage: str, stage_input: str) -> str:
+        input_hash = _hash(stage, self.agents[stage].instruction, stage_input)
+        cached = self.manifest.lookup(spec["id"], stage, input_hash)
+        if cached:
+            self.stats["skipped"] += 1
+            with open(cached["markdown"], "r", encoding="utf-8") as f:
+                return f.read()
+
+        agent = self.agents[stage]
+        spec_dir = os.path.join(self.out_dir, spec["id"])
+        renders = []
+        start = time.time()
+        error = ""
+        # content 按天判定：大纲或任意一天失败都算该步骤失败（合并后的全文以标题开头，看不出失败）
+        try:
+            with tracer.span(f"batch.{stage}"):
+                if stage == "intake":
+                    text = await agent._execute_reasoning(stage_input)
+                elif stage == "content":
+                    total_days = spec["days"] or agent._total_days(stage_input)
+
+                    def on_day(day, day_text):
+                        day_path = os.path.join(spec_dir, f"content_day{day}")
+                        renders.append(asyncio.ensure_future(self._render(day_text, day_path)))
+                        generation_index.add(f"{day_path}.md", day_text, role="content", day=day,
+                                             total_days=total_days)
+
+                    text = await agent.generate_content(stage_input, total_days, on_day=on_day, strict=True)
+                else:
+                    text = await agent.generate_ops(stage_input)
+            if is_failure(text):
+                raise GenerationError(text[:200])
+        except GenerationError as e:
+            text, error = "", str(e)
+        elapsed = time.time() - start
+
+        base_path = os.path.join(spec_dir, stage)
+        files = []
+        for result in await asyncio.gather(*([] if error else [self._render(text, base_path)]), *renders):
+            files.extend(result)
+
+        record = {
+            "spec_id": spec["id"],
+            "stage": stage,
+            "status": "error" if error else "ok",
+            "input_hash": input_hash,
+            "chars": len(text),
+            "seconds": round(elapsed, 2),
+            "markdown": f"{base_path}.md",
+            "files": files,
+            "finished_at": time.time(),
+        }
+        if error:
+            record["error"] = error
+        self.manifest.append(record)
+        self.stats["error" if error else "ok"] += 1
+        print(f"{'💥' if error else '✅'} [Batch] {spec['id']} {stage} {len(text)} 字 {elapsed:.1f}s", flush=True)
+        if error:
+            raise GenerationError(error)
+        return text
+
+    async def run_spec(self, spec):
+        async with self.jobs:
+            with tracer.job(f"batch:{spec['id']}", "batch.spec"):
+                stage_input = spec["text"]
+                try:
+                    for stage in self.stages:
+                        stage_input = await self._stage(spec, stage, stage_input)
+                except Exception as e:
+                    print(f"💥 [Batch] {spec['id']} 中止: {e}", flush=True)
+
+    async def run(self, specs):
+        await self.start()
+        try:
+            await asyncio.gather(*(self.run_spec(spec) for spec in specs))
+        finally:
+            self.pool.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线批量生成读书会方案（intake → content → ops）")
+    parser.add_argument("input", help="需求清单（.jsonl 或 .csv）")
+    parser.add_argument("--name", help="批次名（输出到 output/batch/<name>/，默认取输入文件名）")
+    parser.add_argument("--stages", default=",".join(STAGES), help="要执行的步骤（默认 intake,content,ops）")
+    parser.add_argument("--llm-concurrency", type=int, default=int(os.getenv("LLM_MAX_CONCURRENCY") or 4),
+                        help="全局在途 LLM 调用上限（默认 4）")
+    parser.add_argument("--jobs", type=int, default=0, help="同时进行的方案数（默认等于 --llm-concurrency）")
+    parser.add_argument("--render-workers", type=int, default=max(1, (os.cpu_count() or 2) - 1),
+                        help="Word/微信版渲染进程数")
+    args = parser.parse_args()
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown:
+        parser.error(f"未知步骤: {unknown}")
+
+    specs = load_specs(args.input)
+    os.chdir(PROJECT_ROOT)  # 知识库路径（data/...）相对项目根目录
+    name = args.name or os.path.splitext(os.path.basename(args.input))[0]
+
+    llm_gateway.set_concurrency(args.llm_concurrency)
+    runner = BatchRunner(name, stages, jobs=args.jobs or args.llm_concurrency, render_workers=args.render_workers)
+    print(f"🚀 [Batch] {len(specs)} 个方案 | 步骤 {'→'.join(stages)} | LLM 并发 {args.llm_concurrency}", flush=True)
+
+    start = time.time()
+    asyncio.run(runner.run(specs))
+    stats = runner.stats
+    print(
+        f"📊 [Batch] 完成 {stats['ok']} / 跳过 {stats['skipped']} / 失败 {stats['error']} "
+        f"| 用时 {time.time() - start:.1f}s | 清单 {runner.manifest.path}",
+        flush=True,
+    )
+    sys.exit(1 if stats["error"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""
+模型对比基准 - 同一组需求在各候选模型上跑大纲 / 单天逐字稿 / 物料包，按子任务汇总
+
+用法：
+    python scripts/benchmark_models.py specs.jsonl --models gemini-2.0-flash-exp,gemini-2.0-flash-thinking-exp
+    python scripts/benchmark_models.py specs.jsonl --backend record --name 2026-10-models   # 真实调用并录制
+    python scripts/benchmark_models.py specs.jsonl --backend replay --name 2026-10-models   # 回放录制结果重新统计
+    python scripts/benchmark_models.py specs.jsonl --backend stub --sample-days 2           # 只验证流程
+
+输入：与 scripts/batch_generate.py 相同的需求清单（JSONL / CSV）。需求文本（text 字段，或由结构化字段拼成的文本）
+      原样作为各子任务的输入（与 batch_generate.py 跳过 intake 时相同），各模型拿到的输入完全一致。
+
+子任务（直接使用 BookClubAgent 的 prompt，知识库照常预热，不复用历史逐字稿）：
+    outline   主题大纲（_outline_prompt）
+    day       单天逐字稿（_day_prompt，基于该模型自己生成的大纲）
+    ops       物料包（_ops_prompt）
+
+统计（每个 子任务 × 模型）：
+    延迟 p50 / p95、prompt / 输出 token、输出字数、截断率（finish_reason=MAX_TOKENS）、
+    膳食规则违规数（src/logic/rule_check.py 本地检查）、调用失败数
+    每个子任务推荐"通过"（无失败、截断率 ≤ --max-truncation、每次调用违规数 ≤ --max-violations）的最快模型
+
+后端（--backend）：
+    gemini  真实调用（需要 GOOGLE_API_KEY）
+    record  真实调用并写入磁带（src/logic/llm_cassette.py），之后可用 replay 重新统计
+    replay  只回放磁带（延迟取录制时的耗时）
+    stub    桩后端（只验证流程，数据没有参考意义）
+
+输出：output/benchmark/<name>/
+    calls.jsonl      每次调用一行
+    report.json      汇总
+    outputs/<模型>/<需求 ID>/<子任务>.md   生成结果（人工抽查）
+"""
+
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src.agents.base_agent import is_failure  # noqa: E402
+from src.logic.llm_gateway import llm_gateway  # noqa: E402
+from src.logic.outline import outline_topic  # noqa: E402
+from src.logic.rule_check import check_rules  # noqa: E402
+from batch_generate import build_offline_agent, load_specs  # noqa: E402
+from trace_summary import percentile  # noqa: E402
+
+BENCHMARK_DIR = os.path.join("output", "benchmark")
+SUBTASKS = ("outline", "day", "ops")
+BACKENDS = ("gemini", "record", "replay", "stub")
+
+# 当前需求 / 子任务的调用记录（每个需求一个任务，互不干扰）
+_calls: contextvars.ContextVar = contextvars.ContextVar("benchmark_calls")
+
+
+class MeteredHandle:
+    """包一层 ModelHandle：记录每次调用的耗时、token 与 finish_reason"""
+
+    def __init__(self, handle):
+        self.handle = handle
+        self.model_name = handle.model_name
+
+    async def generate(self, contents, config=None):
+        record = {"seconds": 0.0, "prompt_tokens": 0, "output_tokens": 0, "finish_reason": ""}
+        calls = _calls.get(None)
+        if calls is not None:
+            calls.append(record)
+        start = time.perf_counter()
+        try:
+            resp = await self.handle.generate(contents, config)
+        finally:
+            record["seconds"] = round(time.perf_counter() - start, 3)
+        usage = getattr(resp, "usage_metadata", None)
+        candidates = getattr(resp, "candidates", None) or []
+        reason = getattr(candidates[0], "finish_reason", None) if candidates else None
+        record.update(
+            prompt_tokens=getattr(usage, "prompt_token_count", None) or 0,
+            output_tokens=getattr(usage, "candidates_token_count", None) or 0,
+            finish_reason=str(getattr(reason, "name", reason) or ""),
+        )
+        return resp
+
+
+def default_models():
+    """agents/*.yaml 中当前使用的模型"""
+    import yaml
+
+    models = []
+    for role in ("content", "ops"):
+        with open(os.path.join(PROJECT_ROOT, "agents", f"{role}.yaml"), "r", encoding="utf-8") as f:
+            model = ((yaml.safe_load(f) or {}).get("config") or {}).get("model_name")
+        if model and model not in models:
+            models.append(model)
+    return models
+
+
+class Benchmark:
+    def __init__(self, name: str, models, subtasks, sample_days: int, repeat: int):
+        self.out_dir = os.path.join(BENCHMARK_DIR, name)
+        os.makedirs(self.out_dir, exist_ok=True)
+        self.models = models
+        self.subtasks = subtasks
+        self.sample_days = sample_days
+        self.repeat = repeat
+        self.agents = {}
+        self.records = []
+        self._log = open(os.path.join(self.out_dir, "calls.jsonl"), "w", encoding="utf-8", buffering=1)
+
+    async def start(self):
+        for model in self.models:
+            for role in ("content", "ops"):
+                agent = build_offline_agent(role, model_name=model)
+                agent.llm = MeteredHandle(agent.llm)
+                self.agents[(model, role)] = agent
+        # 知识库在进程内只加载一次（src/logic/knowledge_cache.py），各模型共用
+        await asyncio.gather(*(agent._warm_up() for agent in self.agents.values()))
+
+    async def _call(self, model: str, spec, subtask: str, run: int, agent, prompt: str,
+                    day: int = None, retrieval_query: str = None) -> str:
+        calls = []
+        _calls.set(calls)
+        text = await agent._execute_reasoning(prompt, retrieval_query=retrieval_query)
+        call = calls[-1] if calls else {"seconds": 0.0, "prompt_tokens": 0, "output_tokens": 0, "finish_reason": ""}
+        failed = is_failure(text)
+        violations = [] if failed else check_rules(text)
+        record = {
+            "model": model,
+            "spec_id": spec["id"],
+            "subtask": subtask,
+            "day": day,
+            "run": run,
+            **call,
+            "output_chars": 0 if failed else len(text),
+            "truncated": call["finish_reason"] == "MAX_TOKENS",
+            "violations": len(violations),
+            "violation_rules": sorted({v["rule"] for v in violations}),
+            "error": text[:200] if failed else "",
+        }
+        self.records.append(record)
+        self._log.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+        name = subtask if day is None else f"day{day}"
+        if run:
+            name += f"_run{run + 1}"
+        path = os.path.join(self.out_dir, "outputs", model, spec["id"], f"{name}.md")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        mark = "💥" if failed else ("✂️" if record["truncated"] else "✅")
+        print(f"{mark} [Bench] {model} {spec['id']} {name} {record['seconds']:.1f}s "
+              f"{record['output_chars']} 字 违规 {record['violations']}", flush=True)
+        return text
+
+    async def run_spec(self, model: str, spec, run: int):
+        content, ops = self.agents[(model, "content")], self.agents[(model, "ops")]
+        request = spec["text"]
+        total_days = spec["days"] or content._total_days(request)
+
+        if "outline" in self.subtasks or "day" in self.subtasks:
+            outline = await self._call(model, spec, "outline", run, content,
+                                       content._outline_prompt(request, total_days))
+            if "day" in self.subtasks and not is_failure(outline):
+                plan = content._day_plan(request, outline)
+                days = range(1, total_days + 1)
+                if self.sample_days:
+                    # 抽样时保留首日（种草）与末日（销讲），其余从最中间的一天向两边取
+                    middle = sorted(range(2, total_days), key=lambda d: (abs(2 * d - total_days - 1), d))
+                    days = sorted(list(dict.fromkeys([1, total_days, *middle]))[:self.sample_days])
+                for day in days:
+                    topic = outline_topic(plan["entries"], day, fallback=plan["outline"])
+                    await self._call(model, spec, "day", run, content, content._day_prompt(plan, day, total_days),
+                                     day=day, retrieval_query=topic)
+        if "ops" in self.subtasks:
+            await self._call(model, spec, "ops", run, ops, ops._ops_prompt(request))
+
+    async def run(self, specs, concurrency: int):
+        await self.start()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(model, spec, run):
+            async with semaphore:
+                try:
+                    await self.run_spec(model, spec, run)
+                except Exception as e:
+                    print(f"💥 [Bench] {model} {spec['id']} 中止: {e}", flush=True)
+
+        # 按模型依次跑，同一时间只有一个模型在调用，延迟互不干扰
+        for model in self.models:
+            await asyncio.gather(*(one(model, spec, run) for spec in specs for run in range(self.repeat)))
+        self._log.close()
+
+
+def summarize(records, models, subtasks, max_truncation: float, max_violations: float):
+    table = defaultdict(dict)
+    for subtask in subtasks:
+        for model in models:
+            rows = [r for r in records if r["model"] == model and r["subtask"] == subtask]
+            if not rows:
+                continue
+            ok = [r for r in rows if not r["error"]]
+            seconds = sorted(r["seconds"] for r in ok)
+            calls = len(rows)
+            stats = {
+                "calls": calls,
+                "errors": calls - len(ok),
+                "p50_s": round(percentile(seconds, 50), 2),
+                "p95_s": round(percentile(seconds, 95), 2),
+                "prompt_tokens": round(sum(r["prompt_tokens"] for r in ok) / max(1, len(ok))),
+                "output_tokens": round(sum(r["output_tokens"] for r in ok) / max(1, len(ok))),
+                "output_chars": round(sum(r["output_chars"] for r in ok) / max(1, len(ok))),
+                "truncation_rate": round(sum(r["truncated"] for r in ok) / max(1, len(ok)), 3),
+                "violations": sum(r["violations"] for r in ok),
+                "violations_per_call": round(sum(r["violations"] for r in ok) / max(1, len(ok)), 2),
+            }
+            stats["passed"] = (
+                bool(ok) and not stats["errors"]
+                and stats["truncation_rate"] <= max_truncation
+                and stats["violations_per_call"] <= max_violations
+            )
+            table[subtask][model] = stats
+
+    recommended = {}
+    for subtask, by_model in table.items():
+        passed = [(s["p50_s"], model) for model, s in by_model.items() if s["passed"]]
+        recommended[subtask] = min(passed)[1] if passed else None
+    return {"subtasks": dict(table), "recommended": recommended}
+
+
+def print_report(report):
+    print(f"\n📊 模型对比：{report['specs']} 个需求 × {report['repeat']} 次 | 后端 {report['backend']}"
+          f" | 耗时 {report['elapsed_s']:.0f}s")
+    for subtask, by_model in report["subtasks"].items():
+        print(f"\n🧪 {subtask}")
+        print(f"{'模型':<34}{'次数':>5}{'失败':>5}{'p50(s)':>8}{'p95(s)':>8}{'prompt tok':>11}{'输出 tok':>9}"
+              f"{'字数':>7}{'截断率':>8}{'违规':>6}{'违规/次':>8}  通过")
+        for model, s in sorted(by_model.items(), key=lambda kv: kv[1]["p50_s"]):
+            print(f"{model:<34}{s['calls']:>5}{s['errors']:>5}{s['p50_s']:>8.1f}{s['p95_s']:>8.1f}"
+                  f"{s['prompt_tokens']:>11}{s['output_tokens']:>9}{s['output_chars']:>7}"
+                  f"{s['truncation_rate']:>8.0%}{s['violations']:>6}{s['violations_per_call']:>8.2f}"
+                  f"  {'✅' if s['passed'] else '✗'}")
+        chosen = report["recommended"].get(subtask)
+        print(f"   → 推荐：{chosen}" if chosen else "   → 没有模型通过（放宽 --max-truncation / --max-violations 或换模型）")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="候选模型对比（大纲 / 单天逐字稿 / 物料包）")
+    parser.add_argument("input", help="需求清单（.jsonl 或 .csv，格式同 batch_generate.py）")
+    parser.add_argument("--models", help="候选模型，逗号分隔（默认 agents/*.yaml 中的模型）")
+    parser.add_argument("--subtasks", default=",".join(SUBTASKS), help="子任务（默认 outline,day,ops）")
+    parser.add_argument("--backend", choices=BACKENDS, default="gemini", help="LLM 后端（默认 gemini）")
+    parser.add_argument("--sample-days", type=int, default=0, help="每个需求只测 N 天（含首日与末日，默认全部）")
+    parser.add_argument("--repeat", type=int, default=1, help="每个需求在每个模型上跑几次（默认 1）")
+    parser.add_argument("--concurrency", type=int, default=1, help="同时进行的需求数（默认 1，延迟最干净）")
+    parser.add_argument("--max-truncation", type=float, default=0.0, help="通过标准：截断率上限（默认 0）")
+    parser.add_argument("--max-violations", type=float, default=0.0, help="通过标准：每次调用的违规数上限（默认 0）")
+    parser.add_argument("--name", help="本次对比名称（输出到 output/benchmark/<name>/，默认当前时间）")
+    args = parser.parse_args()
+
+    subtasks = [s.strip() for s in args.subtasks.split(",") if s.strip()]
+    unknown = [s for s in subtasks if s not in SUBTASKS]
+    if unknown:
+        parser.error(f"未知子任务: {', '.join(unknown)}")
+    specs = load_specs(args.input)
+    os.chdir(PROJECT_ROOT)  # 知识库路径（data/...）相对项目根目录
+    models = [m.strip() for m in args.models.split(",") if m.strip()] if args.models else default_models()
+    name = args.name or datetime.now().strftime("%Y%m%d-%H%M%S")
+
+    # 后端在第一次调用时才创建，这里设置的环境变量会生效
+    os.environ["LLM_BACKEND"] = "stub" if args.backend == "stub" else "gemini"
+    if args.backend in ("record", "replay"):
+        os.environ["LLM_CASSETTE_MODE"] = args.backend
+        os.environ.setdefault("LLM_CASSETTE", os.path.join(BENCHMARK_DIR, name, "cassette.jsonl"))
+        if args.backend == "replay":
+            os.environ.setdefault("LLM_CASSETTE_LATENCY", "recorded")
+    llm_gateway.set_concurrency(args.concurrency)
+
+    print(f"🚀 [Bench] {len(specs)} 个需求 | 模型 {', '.join(models)} | 子任务 {','.join(subtasks)}"
+          f" | 后端 {args.backend}", flush=True)
+    bench = Benchmark(name, models, subtasks, args.sample_days, args.repeat)
+    start = time.time()
+    asyncio.run(bench.run(specs, args.concurrency))
+
+    report = {
+        "name": name,
+        "backend": args.backend,
+        "models": models,
+        "specs": len(specs),
+        "repeat": args.repeat,
+        "elapsed_s": round(time.time() - start, 1),
+        "criteria": {"max_truncation": args.max_truncation, "max_violations": args.max_violations},
+        **summarize(bench.records, models, subtasks, args.max_truncation, args.max_violations),
+    }
+    with open(os.path.join(bench.out_dir, "report.json"), "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print_report(report)
+    print(f"\n📁 明细：{bench.out_dir}/calls.jsonl | 汇总：{bench.out_dir}/report.json", flush=True)
+
+
+if __name__ == "__main__":
+    main()
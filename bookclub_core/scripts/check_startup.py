@@ -0,0 +1,94 @@
+"""
+启动耗时预算检查（基于 python -X importtime）
+
+用法：
+    python scripts/check_startup.py              # 默认预算 150ms
+    STARTUP_BUDGET_MS=80 python scripts/check_startup.py
+
+检查内容：
+    1. 在 openagents 已导入的前提下，import src.agents.base_agent 的累计耗时不超过预算
+       （openagents 本身的导入成本无法避免，单独列出不计入预算）
+    2. 重型依赖（google.genai / pandas / python-docx 等）不能在 import 阶段被加载
+    3. 列出本项目导入链中自身耗时最高的模块，方便定位回归
+
+超出预算或出现重型依赖时退出码为 1，可直接接入 CI / 启动脚本。
+"""
+
+import os
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BASELINE_MODULE = "openagents.agents.worker_agent"
+TARGET_MODULE = "src.agents.base_agent"
+
+# 这些依赖必须推迟到首次使用时再导入
+HEAVY_MODULES = ["google.genai", "google.generativeai", "pandas", "docx", "pypdf"]
+
+
+def measure():
+    code = (
+        "import sys\n"
+        f"import {BASELINE_MODULE}\n"
+        f"import {TARGET_MODULE}\n"
+        f"heavy = {HEAVY_MODULES!r}\n"
+        "print(','.join(m for m in heavy if m in sys.modules))\n"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        print(proc.stderr[-2000:])
+        raise SystemExit(f"❌ 导入失败（退出码 {proc.returncode}）")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        raw_name = parts[2].rstrip()
+        depth = (len(raw_name) - len(raw_name.lstrip()) - 1) // 2
+        rows.append((raw_name.strip(), int(parts[0]), int(parts[1]), depth))
+
+    heavy_loaded = [m for m in proc.stdout.strip().split(",") if m]
+    return rows, heavy_loaded
+
+
+def main():
+    budget_ms = float(os.getenv("STARTUP_BUDGET_MS", "150"))
+    rows, heavy_loaded = measure()
+
+    # -X importtime 按后序输出：目标模块的顶层记录与它前一条顶层记录之间，就是本项目的导入链
+    top_level = [i for i, r in enumerate(rows) if r[3] == 0]
+    target_idx = next((i for i in top_level if rows[i][0].startswith("src")), len(rows) - 1)
+    baseline_idx = max((i for i in top_level if i < target_idx), default=-1)
+    baseline_ms = rows[baseline_idx][2] / 1000 if baseline_idx >= 0 else 0.0
+    project_rows = rows[baseline_idx + 1:target_idx + 1]
+    target_ms = rows[target_idx][2] / 1000
+
+    print(f"📦 {BASELINE_MODULE}（基线，不计入预算）: {baseline_ms:.1f} ms")
+    print(f"⏱️  {TARGET_MODULE}: {target_ms:.1f} ms（预算 {budget_ms:.0f} ms）")
+
+    print("\n🔝 本项目导入链自身耗时 Top 10：")
+    for name, self_us, cumulative_us, _ in sorted(project_rows, key=lambda r: r[1], reverse=True)[:10]:
+        print(f"  {self_us / 1000:8.1f} ms  (累计 {cumulative_us / 1000:8.1f} ms)  {name}")
+
+    ok = True
+    if heavy_loaded:
+        print(f"\n❌ 以下重型依赖在 import 阶段被加载：{', '.join(heavy_loaded)}")
+        ok = False
+    if target_ms > budget_ms:
+        print(f"\n❌ 启动耗时超出预算：{target_ms:.1f} ms > {budget_ms:.0f} ms")
+        ok = False
+
+    if ok:
+        print("\n✅ 启动耗时在预算内，且没有重型依赖被提前加载")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
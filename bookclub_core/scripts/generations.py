@@ -0,0 +1,91 @@
+"""
+历史生成索引管理（output/.index/generations.sqlite，见 src/logic/generation_index.py）
+
+用法：
+    python scripts/generations.py backfill                  # 把 output/ 下已有的 Markdown 补进索引
+    python scripts/generations.py search "营养学的真相"       # 按主题检索历史单天逐字稿
+    python scripts/generations.py closest "慢病的真相" --day 2 --total-days 3
+    python scripts/generations.py stats
+"""
+
+import argparse
+import os
+import re
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src.logic.generation_index import generation_index, topic_similarity  # noqa: E402
+from src.logic.output_store import OUTPUT_ROOT  # noqa: E402
+
+_NAME_RE = re.compile(r"^(intake|content|ops)(?:_.*?)?(?:_day(\d+))?\.md$")
+
+
+def cmd_backfill(args):
+    added = scanned = 0
+    for dirpath, dirnames, filenames in os.walk(OUTPUT_ROOT):
+        dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+        for name in filenames:
+            match = _NAME_RE.match(name)
+            if not match:
+                continue
+            scanned += 1
+            path = os.path.join(dirpath, name)
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+            role, day = match.group(1), match.group(2)
+            if generation_index.add(path, text, role=role, day=int(day) if day else None):
+                added += 1
+    print(f"✅ 扫描 {scanned} 个 Markdown，新增 / 更新 {added} 条")
+
+
+def cmd_search(args):
+    for hit in generation_index.search(args.query, role=args.role, k=args.k, days_only=args.days_only):
+        similarity = topic_similarity(args.query, hit["topic"] or "")
+        print(f"  {hit['score']:>7.2f}  相似度 {similarity:.0%}  {hit['role']:<8} "
+              f"Day {hit['day'] or '-'}  {hit['topic'] or '（无主题）'}  {hit['path']}")
+
+
+def cmd_closest(args):
+    hit = generation_index.closest_day_script(args.topic, args.day, args.total_days)
+    if hit is None:
+        print("  没有足够接近的历史逐字稿（将从零生成）")
+        return
+    print(f"  {hit['mode']}  相似度 {hit['similarity']:.0%}  Day {hit['day']}（{hit['position']}）"
+          f"  {hit['topic']}  {hit['path']}")
+
+
+def cmd_stats(args):
+    for role, info in generation_index.stats().items():
+        print(f"  {role:<8} {info['count']:>5} 份  {info['chars']:>9} 字")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="管理历史生成全文索引")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("backfill", help="索引 output/ 下已有的 Markdown").set_defaults(func=cmd_backfill)
+
+    p_search = sub.add_parser("search", help="全文检索")
+    p_search.add_argument("query")
+    p_search.add_argument("--role", choices=["intake", "content", "ops"])
+    p_search.add_argument("--days-only", action="store_true", help="只看单天逐字稿")
+    p_search.add_argument("-k", type=int, default=10)
+    p_search.set_defaults(func=cmd_search)
+
+    p_closest = sub.add_parser("closest", help="content 生成时实际会选中的历史逐字稿")
+    p_closest.add_argument("topic")
+    p_closest.add_argument("--day", type=int, default=1)
+    p_closest.add_argument("--total-days", type=int, default=3)
+    p_closest.set_defaults(func=cmd_closest)
+
+    sub.add_parser("stats", help="按角色统计").set_defaults(func=cmd_stats)
+
+    args = parser.parse_args()
+    os.chdir(PROJECT_ROOT)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
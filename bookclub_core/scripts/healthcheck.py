@@ -0,0 +1,87 @@
+"""
+Agent 就绪检查（读取 .health/<agent_id>.json）
+
+用法：
+    python scripts/healthcheck.py                       # 检查 .health/ 下所有 Agent
+    python scripts/healthcheck.py bc-content bc-ops     # 只检查指定 Agent
+    python scripts/healthcheck.py --wait 90 bc-content  # 最多等待 90 秒直到预热完成
+
+退出码：0 = 全部预热完成（warm），1 = 仍在预热 / 进程不存在 / 状态文件缺失
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src.logic.env import ensure_env  # noqa: E402
+
+ensure_env()
+
+HEALTH_DIR = os.getenv("HEALTH_DIR", ".health")
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+        return True
+    except (OSError, TypeError):
+        return False
+
+
+def check(names):
+    if not names:
+        names = sorted(os.path.splitext(os.path.basename(p))[0] for p in glob.glob(os.path.join(HEALTH_DIR, "*.json")))
+
+    all_warm = bool(names)
+    lines = []
+    for name in names:
+        path = os.path.join(HEALTH_DIR, f"{name}.json")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            lines.append(f"  ✗ {name:<12} 无状态文件")
+            all_warm = False
+            continue
+
+        if not _pid_alive(state.get("pid")):
+            lines.append(f"  ✗ {name:<12} 进程已退出（pid {state.get('pid')}）")
+            all_warm = False
+            continue
+
+        parts = []
+        for component, info in state.get("components", {}).items():
+            icon = {"ready": "✓", "failed": "⚠", "pending": "…"}.get(info.get("state"), "?")
+            parts.append(f"{icon}{component}")
+        status = "warm" if state.get("warm") else "warming"
+        lines.append(f"  {'✓' if state.get('warm') else '…'} {name:<12} {status:<8} {' '.join(parts)}")
+        all_warm = all_warm and bool(state.get("warm"))
+
+    return all_warm, lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="检查 BookClub Agent 是否完成知识库预热")
+    parser.add_argument("agents", nargs="*", help="agent_id 列表（默认全部）")
+    parser.add_argument("--wait", type=float, default=0, help="最长等待秒数")
+    args = parser.parse_args()
+
+    deadline = time.time() + args.wait
+    while True:
+        ok, lines = check(args.agents)
+        if ok or time.time() >= deadline:
+            break
+        time.sleep(1)
+
+    print("\n".join(lines) if lines else f"  ✗ {HEALTH_DIR}/ 下没有任何状态文件")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,510 @@
+"""
+端到端压测 - 本地起 OpenAgents 网络 + Agent 进程，桩 LLM 后端，模拟 N 个读书会同时 @
+
+用法：
+    python scripts/load_test.py --clubs 10
+    python scripts/load_test.py --clubs 50 --latency lognormal:3:0.6 --output-chars 4000 --error-rate 0.02
+    python scripts/load_test.py --clubs 100 --ramp 60 --stages intake,content --content-replicas 3
+
+过程：
+    1. 启动 openagents network 与 agents/<role>.yaml 进程（LLM_BACKEND=stub：不联网、不计费），
+       输出 / 追踪 / 健康状态都写入 output/loadtest/<name>/，等待全部 Agent 预热完成
+    2. 每个读书会一个独立频道（lt-<name>-<n>），在 --ramp 秒内陆续开始，依次 @bc-intake → @bc-content → @bc-ops，
+       下一步的输入是上一步的输出（与用户复制粘贴一致）；某一步失败或超时后该读书会停止
+    3. 所有读书会由同一个压测连接代发：网络会把频道消息广播给每个连接，
+       每个模拟用户各开一个连接时，压测端自己会先成为瓶颈
+
+报告（同时写入 output/loadtest/<name>/report.json）：
+    - 吞吐：完成全部步骤的读书会数 / 分钟，各步骤完成数与失败数
+    - 各步骤端到端耗时（@ → 最终输出）与首次回复耗时（@ → "已收到"）的 p50 / p95 / p99
+    - 各 span（llm.generate / content.day / save.docx ...）的 p50 / p95 / p99（来自各进程的追踪数据）
+    - 各进程的事件循环延迟（Agent 开启 LOOP_LAG_MONITOR）与 RSS 峰值
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src.logic.loop_monitor import LoopLagMonitor  # noqa: E402
+from trace_summary import load_spans, percentile  # noqa: E402
+
+LOADTEST_DIR = os.path.join("output", "loadtest")
+ROLES = ("intake", "content", "ops")
+
+# 各步骤最终输出的标志（见 BookClubAgent._run_job 的回复文本）
+FINAL_MARKERS = {
+    "intake": "【INTAKE 输出】",
+    "content": "【CONTENT 输出】",
+    "ops": "【OPS 最终版",
+}
+LLM_ERROR_MARKER = "❌ 引擎报错"
+
+
+# ---------- 进程 ----------
+def _rss_mb(pid):
+    """进程常驻内存（MB，读取 /proc；非 Linux 返回 None）"""
+    try:
+        with open(f"/proc/{pid}/status", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+class LocalCluster:
+    """本地的网络 + Agent 进程（各自独立的进程组，结束时整组回收）"""
+
+    def __init__(self, run_dir: str, port: int, env: dict):
+        self.run_dir = run_dir
+        self.port = port
+        self.env = env
+        self.health_dir = env["HEALTH_DIR"]
+        self.processes = {}  # 名称 -> Popen
+        self.hosted = {}  # 单进程托管时：agent_id -> 托管进程名
+        self._logs = []
+
+    def _spawn(self, name: str, cmd, extra_env=None):
+        log = open(os.path.join(self.run_dir, f"{name}.log"), "w", encoding="utf-8")
+        self._logs.append(log)
+        self.processes[name] = subprocess.Popen(
+            cmd, cwd=PROJECT_ROOT, env={**self.env, **(extra_env or {})},
+            stdout=log, stderr=subprocess.STDOUT, start_new_session=True,
+        )
+
+    def write_network_config(self) -> str:
+        """
+        本次压测用的网络配置：沿用 network.yaml 的名称与 mods，HTTP 端口改为 --port，gRPC 端口另取空闲端口
+        （openagents network start --port 不会改配置里的端口，只能写一份新配置传进去）
+        """
+        import yaml
+
+        with open(os.path.join(PROJECT_ROOT, "network.yaml"), "r", encoding="utf-8") as f:
+            base = yaml.safe_load(f) or {}
+        network = dict(base.get("network") or {})
+        mods = network.get("mods") or [
+            {"name": m["name"] if m["name"].startswith("openagents.") else f"openagents.mods.{m['name']}",
+             "enabled": True, "config": m.get("config") or {}}
+            for m in ((base.get("workspace") or {}).get("default") or {}).get("mods") or []
+        ]
+        with socket.socket() as s:
+            s.bind(("localhost", 0))
+            grpc_port = s.getsockname()[1]
+        network.update(
+            name=network.get("name") or base.get("name") or "bookclub-loadtest",
+            mode=network.get("mode") or "centralized",
+            transports=[{"type": "http", "config": {"port": self.port}},
+                        {"type": "grpc", "config": {"port": grpc_port}}],
+            mods=mods,
+        )
+        path = os.path.join(self.run_dir, "network.yaml")
+        with open(path, "w", encoding="utf-8") as f:
+            yaml.safe_dump({**{k: v for k, v in base.items() if k not in ("name", "workspace")}, "network": network},
+                           f, allow_unicode=True, sort_keys=False)
+        return path
+
+    def start_network(self, timeout: float = 60):
+        self._spawn("network", ["openagents", "network", "start", self.write_network_config()])
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.processes["network"].poll() is not None:
+                raise RuntimeError(f"网络进程已退出，见 {self.run_dir}/network.log")
+            try:
+                with socket.create_connection(("localhost", self.port), timeout=1):
+                    return
+            except OSError:
+                time.sleep(0.5)
+        raise RuntimeError(f"网络 {timeout:.0f}s 内未就绪（端口 {self.port}）")
+
+    def start_agent(self, role: str, replica_id: str = ""):
+        agent_id = f"bc-{role}" + (f"-{replica_id}" if replica_id else "")
+        self._spawn(
+            agent_id,
+            ["openagents", "agent", "start", os.path.join("agents", f"{role}.yaml"), "--network-port", str(self.port)],
+            {"REPLICA_ID": replica_id} if replica_id else None,
+        )
+        return agent_id
+
+    def start_host(self, roles):
+        """所有角色在一个进程里运行（scripts/multi_role_host.py）"""
+        self._spawn(
+            "bc-host",
+            [sys.executable, os.path.join("scripts", "multi_role_host.py"),
+             "--roles", ",".join(roles), "--network-port", str(self.port)],
+        )
+        agent_ids = [f"bc-{role}" for role in roles]
+        self.hosted.update({agent_id: "bc-host" for agent_id in agent_ids})
+        return agent_ids
+
+    @property
+    def agent_ids(self):
+        return [n for n in self.processes if n != "network" and n not in self.hosted.values()] + list(self.hosted)
+
+    def health(self, agent_id: str):
+        try:
+            with open(os.path.join(self.health_dir, f"{agent_id}.json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def wait_warm(self, agent_ids, timeout: float):
+        deadline = time.time() + timeout
+        pending = list(agent_ids)
+        while pending and time.time() < deadline:
+            for agent_id in list(pending):
+                name = self.hosted.get(agent_id, agent_id)
+                if self.processes[name].poll() is not None:
+                    raise RuntimeError(f"{name} 已退出，见 {self.run_dir}/{name}.log")
+                state = self.health(agent_id)
+                if state and state.get("warm"):
+                    pending.remove(agent_id)
+            time.sleep(0.5)
+        if pending:
+            raise RuntimeError(f"{timeout:.0f}s 内未完成预热: {', '.join(pending)}")
+
+    def pids(self):
+        """名称 -> pid（Agent 取健康状态文件里的 pid，即实际运行 Agent 的进程）"""
+        result = {}
+        for name, proc in self.processes.items():
+            state = self.health(name) if name != "network" else None
+            result[name] = (state or {}).get("pid") or proc.pid
+        return result
+
+    def stop(self, timeout: float = 10):
+        # 先停 Agent 再停网络
+        for name in sorted(self.processes, key=lambda n: n == "network"):
+            proc = self.processes[name]
+            if proc.poll() is None:
+                try:
+                    os.killpg(proc.pid, signal.SIGTERM)
+                except OSError:
+                    proc.terminate()
+        deadline = time.time() + timeout
+        for proc in self.processes.values():
+            try:
+                proc.wait(max(0.1, deadline - time.time()))
+            except subprocess.TimeoutExpired:
+                try:
+                    os.killpg(proc.pid, signal.SIGKILL)
+                except OSError:
+                    proc.kill()
+        for log in self._logs:
+            log.close()
+
+
+class ResourceSampler:
+    """每秒采样一次各进程的 RSS，记录峰值与最后一次的值"""
+
+    def __init__(self, cluster: LocalCluster, interval: float = 1.0):
+        self.cluster = cluster
+        self.interval = interval
+        self.peak = defaultdict(float)
+        self.last = {}
+
+    async def run(self):
+        while True:
+            for name, pid in self.cluster.pids().items():
+                rss = _rss_mb(pid)
+                if rss is not None:
+                    self.peak[name] = max(self.peak[name], rss)
+                    self.last[name] = rss
+            await asyncio.sleep(self.interval)
+
+
+# ---------- 模拟用户 ----------
+def intake_text(idx: int, days: int) -> str:
+    return (
+        f"我是注册营养师 Load{idx}，想做一个 {days} 天的读书会。\n"
+        "书名：《你是你吃出来的》\n"
+        "身份：注册营养师\n"
+        "专业特长：临床营养\n"
+        "风格偏好：温情亲切\n"
+        f"交付周期：{days}天\n招募周期：7天"
+    )
+
+
+def make_client(agent_id: str):
+    from openagents.agents.worker_agent import WorkerAgent
+
+    class LoadClient(WorkerAgent):
+        """压测连接：代所有模拟用户发消息，按频道分发收到的回复"""
+
+        default_agent_id = agent_id
+
+        def __init__(self, **kwargs):
+            super().__init__(**kwargs)
+            self.inbox = {}  # 频道 -> asyncio.Queue[(收到时间, 发送者, 文本)]
+
+        async def on_channel_reply(self, context):
+            payload = context.incoming_event.payload or {}
+            queue = self.inbox.get(payload.get("channel"))
+            if queue is not None:
+                text = (payload.get("content", {}) or {}).get("text", "")
+                queue.put_nowait((time.time(), payload.get("sender_id", ""), text))
+
+    return LoadClient(agent_id=agent_id)
+
+
+async def run_club(client, idx: int, args, results: list):
+    channel = f"lt-{args.name}-{idx}"
+    queue = client.inbox.setdefault(channel, asyncio.Queue())
+    await asyncio.sleep(args.ramp * idx / max(1, args.clubs))
+
+    text = intake_text(idx, args.days)
+    for role in args.stages:
+        record = {"club": idx, "stage": role, "status": "timeout", "start": time.time()}
+        results.append(record)
+        response = await client.workspace().channel(channel).post(f"@bc-{role} {text}")
+        if not getattr(response, "success", False):
+            record["status"] = "post_failed"
+            return
+
+        deadline = record["start"] + args.timeout
+        while True:
+            try:
+                received_at, sender, body = await asyncio.wait_for(queue.get(), max(0.0, deadline - time.time()))
+            except asyncio.TimeoutError:
+                return
+            if not sender.startswith(f"bc-{role}"):
+                continue
+            record.setdefault("ack_s", received_at - record["start"])
+            if LLM_ERROR_MARKER in body:
+                record["llm_errors"] = record.get("llm_errors", 0) + 1
+            if FINAL_MARKERS[role] in body:
+                record["total_s"] = received_at - record["start"]
+                record["status"] = "error" if record.get("llm_errors") else "ok"
+                break
+        if record["status"] != "ok":
+            return
+        # 下一步的输入：本步输出（去掉回复里的保存路径说明），带上天数供 content 识别
+        output = body.split(FINAL_MARKERS[role], 1)[1].split("\n\n" + "━" * 50, 1)[0]
+        text = f"{args.days}天读书会\n{output.strip()}"
+
+
+# ---------- 报告 ----------
+def _dist(values):
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": values[-1] if values else 0.0,
+    }
+
+
+def build_report(args, results, elapsed: float, spans, health: dict, sampler: ResourceSampler, harness_lag: dict):
+    completed_clubs = {
+        r["club"] for r in results if r["stage"] == args.stages[-1] and r["status"] == "ok"
+    }
+    stages = {}
+    for role in args.stages:
+        records = [r for r in results if r["stage"] == role]
+        statuses = defaultdict(int)
+        for r in records:
+            statuses[r["status"]] += 1
+        stages[role] = {
+            "statuses": dict(statuses),
+            "total_s": _dist([r["total_s"] for r in records if r["status"] == "ok"]),
+            "ack_s": _dist([r["ack_s"] for r in records if "ack_s" in r]),
+        }
+
+    by_name = defaultdict(list)
+    span_errors = defaultdict(int)
+    for s in spans:
+        by_name[s["name"]].append(s["ms"])
+        span_errors[s["name"]] += s["error"]
+    span_stats = {name: {**_dist(v), "errors": span_errors[name]} for name, v in by_name.items()}
+
+    processes = {}
+    for name in sorted(sampler.peak):
+        processes[name] = {
+            "rss_peak_mb": round(sampler.peak[name], 1),
+            "rss_last_mb": round(sampler.last.get(name, 0.0), 1),
+            "loop_lag": (health.get(name) or {}).get("loop_lag"),
+        }
+    processes["loadgen"] = {"rss_peak_mb": round(_rss_mb(os.getpid()) or 0.0, 1), "loop_lag": harness_lag}
+
+    return {
+        "name": args.name,
+        "clubs": args.clubs,
+        "stages": list(args.stages),
+        "stub": {"latency": args.latency, "output_chars": args.output_chars, "error_rate": args.error_rate},
+        "elapsed_s": round(elapsed, 1),
+        "throughput": {
+            "clubs_completed": len(completed_clubs),
+            "clubs_per_min": round(len(completed_clubs) / elapsed * 60, 2) if elapsed else 0.0,
+        },
+        "stage_latency": stages,
+        "spans": span_stats,
+        "processes": processes,
+    }
+
+
+def print_report(report):
+    print(f"\n📊 压测结果：{report['clubs']} 个读书会，耗时 {report['elapsed_s']:.0f}s")
+    print(f"   桩后端：延迟 {report['stub']['latency']} | 输出约 {report['stub']['output_chars']} 字"
+          f" | 错误率 {report['stub']['error_rate']:.0%}")
+    t = report["throughput"]
+    print(f"   吞吐：完成 {t['clubs_completed']} 个读书会，{t['clubs_per_min']:.2f} 个/分钟")
+
+    print(f"\n⏱️ 各步骤耗时（秒）")
+    print(f"{'步骤':<10}{'结果':<28}{'首次回复 p50/p95/p99':>26}{'完成 p50/p95/p99':>26}")
+    for role, stage in report["stage_latency"].items():
+        statuses = " ".join(f"{k}={v}" for k, v in sorted(stage["statuses"].items()))
+        ack, total = stage["ack_s"], stage["total_s"]
+        print(f"{role:<10}{statuses:<28}"
+              f"{ack['p50']:>10.1f}{ack['p95']:>8.1f}{ack['p99']:>8.1f}"
+              f"{total['p50']:>10.1f}{total['p95']:>8.1f}{total['p99']:>8.1f}")
+
+    print(f"\n🧩 各阶段 span（毫秒）")
+    print(f"{'阶段':<20}{'次数':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'最大':>9}{'错误':>6}")
+    for name, s in sorted(report["spans"].items(), key=lambda kv: -kv[1]["p50"] * kv[1]["count"]):
+        print(f"{name:<20}{s['count']:>7}{s['p50']:>9.0f}{s['p95']:>9.0f}{s['p99']:>9.0f}{s['max']:>9.0f}{s['errors']:>6}")
+
+    print(f"\n🖥️ 进程资源")
+    print(f"{'进程':<16}{'RSS 峰值(MB)':>14}{'事件循环延迟 p50/p95/p99/最大(ms)':>40}")
+    for name, p in report["processes"].items():
+        lag = p.get("loop_lag")
+        lag_text = f"{lag['p50_ms']:.1f} / {lag['p95_ms']:.1f} / {lag['p99_ms']:.1f} / {lag['max_ms']:.1f}" if lag else "-"
+        print(f"{name:<16}{p['rss_peak_mb']:>14.1f}{lag_text:>40}")
+
+    blockers = [(name, b) for name, p in report["processes"].items()
+                for b in ((p.get("loop_lag") or {}).get("top_blockers") or [])]
+    if blockers:
+        print(f"\n🐢 事件循环阻塞点（按累计阻塞时长）")
+        for name, b in sorted(blockers, key=lambda nb: -nb[1]["total_ms"])[:10]:
+            print(f"{name:<16}{b['count']:>4} 次{b['total_ms']:>9.0f}ms（最长 {b['max_ms']:.0f}ms）  {b['where']}")
+
+
+# ---------- 主流程 ----------
+async def drive(args, cluster: LocalCluster):
+    harness_monitor = LoopLagMonitor(stall_ms=0)  # 压测端只统计延迟，不抓栈
+    harness_monitor.start()
+    sampler = ResourceSampler(cluster)
+    sampler_task = asyncio.create_task(sampler.run())
+
+    client = make_client(f"loadgen-{os.getpid()}")
+    await client.async_start(network_host="localhost", network_port=args.port)
+    results = []
+    start = time.time()
+    try:
+        await asyncio.gather(*(run_club(client, i, args, results) for i in range(args.clubs)))
+    finally:
+        elapsed = time.time() - start
+        await client.async_stop()
+        sampler_task.cancel()
+        harness_monitor.stop()
+
+    await asyncio.sleep(1)  # 等各进程把最后的 span 与健康状态写完
+    trace_path = os.path.join(cluster.env["TRACE_DIR"], "spans.jsonl")
+    spans = load_spans(trace_path) if os.path.exists(trace_path) else []
+    health = {name: cluster.health(name) for name in cluster.agent_ids}
+    if cluster.hosted:
+        # 托管进程内各 Agent 共用一个事件循环，循环延迟取其中任一 Agent 的统计
+        health["bc-host"] = next((h for h in health.values() if h), None)
+    return build_report(args, results, elapsed, spans, health, sampler, harness_monitor.stats())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BookClub 端到端压测（本地网络 + 桩 LLM）")
+    parser.add_argument("--clubs", type=int, default=10, help="同时进行的读书会数（默认 10）")
+    parser.add_argument("--ramp", type=float, default=10, help="在多少秒内陆续开始（默认 10）")
+    parser.add_argument("--stages", default=",".join(ROLES), help="要跑的步骤（默认 intake,content,ops）")
+    parser.add_argument("--days", type=int, default=3, help="每个读书会的交付天数（默认 3）")
+    parser.add_argument("--latency", default="lognormal:2:0.5", help="桩 LLM 延迟分布（见 src/logic/stub_llm.py）")
+    parser.add_argument("--output-chars", type=int, default=3000, help="桩 LLM 每次回复的平均字数")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="桩 LLM 调用失败的概率（0-1）")
+    parser.add_argument("--seed", type=int, help="桩 LLM 随机种子")
+    parser.add_argument("--content-replicas", type=int, default=1, help="content 副本数（>1 时按 REPLICA_ID 启动多个进程）")
+    parser.add_argument("--single-process", action="store_true",
+                        help="所有角色在一个进程里运行（scripts/multi_role_host.py），对比内存与启动耗时")
+    parser.add_argument("--timeout", type=float, default=900, help="单个步骤的超时（秒）")
+    parser.add_argument("--ready-timeout", type=float, default=120, help="等待 Agent 预热的超时（秒）")
+    parser.add_argument("--port", type=int, default=8700, help="网络端口（默认 8700，需空闲）")
+    parser.add_argument("--name", help="本次压测名称（默认当前时间）")
+    args = parser.parse_args()
+
+    os.chdir(PROJECT_ROOT)
+    args.stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = [s for s in args.stages if s not in ROLES]
+    if unknown:
+        parser.error(f"未知步骤: {', '.join(unknown)}")
+    if args.single_process and args.content_replicas > 1:
+        parser.error("--single-process 不支持 --content-replicas")
+    args.name = args.name or datetime.now().strftime("%Y%m%d-%H%M%S")
+
+    try:
+        with socket.create_connection(("localhost", args.port), timeout=1):
+            print(f"✗ 端口 {args.port} 已被占用（已有网络在运行？），请先停止或换 --port")
+            sys.exit(1)
+    except OSError:
+        pass
+
+    run_dir = os.path.abspath(os.path.join(LOADTEST_DIR, args.name))
+    os.makedirs(run_dir, exist_ok=True)
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join(filter(None, [PROJECT_ROOT, os.getenv("PYTHONPATH")])),
+        "PYTHONUNBUFFERED": "1",
+        "LLM_BACKEND": "stub",
+        "STUB_LATENCY": args.latency,
+        "STUB_OUTPUT_CHARS": str(args.output_chars),
+        "STUB_ERROR_RATE": str(args.error_rate),
+        "OUTPUT_DIR": os.path.join(run_dir, "output"),
+        "HEALTH_DIR": os.path.join(run_dir, "health"),
+        "TRACE_DIR": os.path.join(run_dir, "traces"),
+        "TRACE_ENABLED": "1",
+        "LOOP_LAG_MONITOR": "1",
+        # 每个读书会的需求几乎相同，不关掉的话后面的任务会直接复用前面的逐字稿
+        "REUSE_PRIOR_SCRIPTS": "off",
+    }
+    if args.seed is not None:
+        env["STUB_SEED"] = str(args.seed)
+
+    cluster = LocalCluster(run_dir, args.port, env)
+    # 被 kill / timeout 结束时也要回收网络与 Agent 进程
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(1))
+    try:
+        print(f"🚀 [LoadTest] 启动本地网络（端口 {args.port}）...", flush=True)
+        cluster.start_network()
+        if args.single_process:
+            agent_ids = cluster.start_host(args.stages)
+        else:
+            agent_ids = []
+            for role in args.stages:
+                if role == "content" and args.content_replicas > 1:
+                    agent_ids += [cluster.start_agent(role, str(i)) for i in range(1, args.content_replicas + 1)]
+                else:
+                    agent_ids.append(cluster.start_agent(role))
+        print(f"⏳ [LoadTest] 等待 {', '.join(agent_ids)} 预热...", flush=True)
+        cluster.wait_warm(agent_ids, args.ready_timeout)
+
+        print(f"👥 [LoadTest] {args.clubs} 个读书会在 {args.ramp:.0f}s 内陆续开始：{' → '.join(args.stages)}", flush=True)
+        report = asyncio.run(drive(args, cluster))
+    except RuntimeError as e:
+        print(f"💥 [LoadTest] {e}")
+        sys.exit(1)
+    finally:
+        cluster.stop()
+
+    with open(os.path.join(run_dir, "report.json"), "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print_report(report)
+    print(f"\n📁 报告、日志与全部输出：{run_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+单进程多角色托管 - intake / content / ops 在同一个进程、同一个事件循环里运行
+
+用法：
+    python scripts/multi_role_host.py                                # 三个角色，连接 agents/*.yaml 里配置的网络
+    python scripts/multi_role_host.py --roles content,ops            # 只托管部分角色
+    python scripts/multi_role_host.py --network-host 10.0.0.5 --network-port 8700
+
+与 supervisord 中每个角色一个进程相比：
+    - 只有一个 Python 解释器，共用 LLM 网关（genai.Client / 连接池 / LLM_MAX_CONCURRENCY 限流）
+    - 膳食规则 / 营养库 / PDF 索引在进程内只加载一次（见 src/logic/knowledge_cache.py），
+      content 与 ops 共用；热更新时也只重新加载一次
+    - 各角色仍是独立的 BookClubAgent（独立的网络连接、任务队列、健康状态文件 .health/<agent_id>.json），
+      并发按角色设置：JOB_CONCURRENCY_INTAKE / JOB_CONCURRENCY_CONTENT / JOB_CONCURRENCY_OPS
+    适合小规模部署；需要横向扩容 content 时仍按 supervisord.conf 的多副本方式部署。
+
+supervisord 中使用：把 agent_intake / agent_content / agent_ops 三段换成
+    [program:agent_host]
+    command=python scripts/multi_role_host.py
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+ROLES = ("intake", "content", "ops")
+
+
+def _connection_settings(config_path: str, args) -> dict:
+    """与 openagents agent start 一致：YAML 的 connection 段 + 命令行覆盖"""
+    import yaml
+
+    with open(config_path, "r", encoding="utf-8") as f:
+        settings = dict((yaml.safe_load(f) or {}).get("connection") or {})
+    if args.network_host:
+        settings["host"] = args.network_host
+    if args.network_port:
+        settings["port"] = args.network_port
+    if args.network_id:
+        settings["network_id"] = args.network_id
+    if not settings.get("network_id"):
+        settings.setdefault("host", "localhost")
+        settings.setdefault("port", 8570)
+    return settings
+
+
+async def host(roles, args):
+    from openagents.agents.runner import AgentRunner
+
+    started = time.time()
+    agents = []
+    try:
+        for role in roles:
+            config_path = os.path.join("agents", f"{role}.yaml")
+            agent = AgentRunner.from_yaml(config_path)
+            settings = _connection_settings(config_path, args)
+            await agent.async_start(
+                network_host=settings.get("host"),
+                network_port=settings.get("port"),
+                network_id=settings.get("network_id"),
+                metadata={"agent_type": type(agent).__name__, "config_file": config_path, "host_pid": str(os.getpid())},
+                password_hash=settings.get("password_hash"),
+            )
+            agents.append(agent)
+            print(f"✅ [Host] {agent.agent_id} 已连接网络", flush=True)
+        print(f"🏠 [Host] {len(agents)} 个角色运行在同一进程（pid {os.getpid()}，"
+              f"启动 {time.time() - started:.1f}s）", flush=True)
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop.set)
+        # 收到停止信号，或所有 Agent 都已断开时退出
+        while not stop.is_set() and any(getattr(agent, "_running", True) for agent in agents):
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=1)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        for agent in reversed(agents):
+            try:
+                await agent.async_stop()
+            except Exception as e:
+                print(f"⚠️ [Host] {agent.agent_id} 停止失败: {e}", flush=True)
+        print("👋 [Host] 已停止", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="在一个进程里托管多个 BookClub 角色")
+    parser.add_argument("--roles", default=",".join(ROLES), help="要托管的角色（默认 intake,content,ops）")
+    parser.add_argument("--network-host", help="网络地址（默认取 agents/<role>.yaml 的 connection.host）")
+    parser.add_argument("--network-port", type=int, help="网络端口（默认取 agents/<role>.yaml 的 connection.port）")
+    parser.add_argument("--network-id", help="网络 ID")
+    args = parser.parse_args()
+
+    os.chdir(PROJECT_ROOT)
+    roles = [r.strip() for r in args.roles.split(",") if r.strip()]
+    unknown = [r for r in roles if r not in ROLES]
+    if unknown or not roles:
+        parser.error(f"未知角色: {', '.join(unknown) or '（空）'}")
+
+    asyncio.run(host(roles, args))
+
+
+if __name__ == "__main__":
+    main()
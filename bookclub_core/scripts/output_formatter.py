@@ -1,24 +1,46 @@
+"""
+策划案渲染 - BookClubReport（预编译模板，支持批量）
+
+模块：output_formatter.py
+描述：把 Intake 输出的 inputs JSON 渲染为《你是你吃出来的》读书会策划案（Markdown）。
+
+性能要点：
+    - 模板在导入时预编译为 (字面量, 字段) 序列，渲染只做一次 "".join（线性时间，无 += 拼接）
+    - 每日大纲 + 结尾只取决于天数，按天数（1-21）缓存
+    - 默认写入不重名的 output/plans/<日期>/plan_<时间>_<随机>.md（不再覆盖 plan_v1.md）
+    - Word / 微信版复用 Agent 的导出器（src/logic/exporters.py），批量时放进进程池
+
+用法：
+    python scripts/output_formatter.py                               # 示例（7 天）
+    python scripts/output_formatter.py plans.jsonl                   # 批量：每行一个 inputs JSON
+    python scripts/output_formatter.py plans.jsonl --formats md,docx,wechat
+    python scripts/output_formatter.py plans.jsonl --stream > plans.md   # 全部写入一个流
+    python scripts/output_formatter.py --benchmark 20000             # 渲染吞吐基准
+"""
+
+import argparse
 import json
+import os
+import string
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from functools import lru_cache
+from typing import Iterable, Iterator
 
-class BookClubReport:
-    def __init__(self, inputs: dict):
-        self.inputs = inputs
-        self.timestamp = datetime.now().strftime("%Y-%m-%d")
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
 
-    def format_as_markdown(self) -> str:
-        """将 JSON 数据转化为夏萌老师风格的 Markdown 策划案"""
-        
-        # 提取核心参数，设置默认值以防万一
-        cycle = self.inputs.get("cycle_days", 3)
-        tone = self.inputs.get("tone", "温情专业")
-        format_type = self.inputs.get("format", "线上/线下混合")
-        
-        # 构建 Markdown 内容
-        md = f"""# 📚 《你是你吃出来的》读书会·深度研习策划案
+MAX_CYCLE_DAYS = 21
+PLANS_DIR = os.path.join("output", "plans")
+
+PLAN_TEMPLATE = """# 📚 《你是你吃出来的》读书会·深度研习策划案
 
 > **主理人风格：** 夏萌老师 (临床营养师)
-> **策划日期：** {self.timestamp}
+> **策划日期：** {timestamp}
 > **项目周期：** {cycle} 天深度营
 > **交付形式：** {format_type}
 
@@ -32,17 +54,18 @@ class BookClubReport:
 | :--- | :--- | :--- |
 | **读书模式** | {format_type} | 结合理论学习与实操 |
 | **内容基调** | {tone} | 兼具临床权威与人文关怀 |
-| **销转策略** | {"已开启" if self.inputs.get("conversion", {}).get("enabled") else "纯公益/不开启"} | 侧重价值交付 |
+| **销转策略** | {conversion} | 侧重价值交付 |
 
 ## 📅 三、 课程大纲 (初步构思)
 """
-        # 动态生成天数逻辑 (简单的逻辑推导)
-        for i in range(1, cycle + 1):
-            md += f"### 第 {i} 天：{'理论基础' if i==1 else '深度实践' if i<cycle else '总结与蜕变'}\n"
-            md += "- **阅读重点：** [待 Agent 根据缓存 PDF 自动填充]\n"
-            md += "- **餐桌建议：** [待调用本地食物成分表生成]\n\n"
 
-        md += """
+DAY_TEMPLATE = """### 第 {day} 天：{title}
+- **阅读重点：** [待 Agent 根据缓存 PDF 自动填充]
+- **餐桌建议：** [待调用本地食物成分表生成]
+
+"""
+
+FOOTER = """
 ---
 
 ## 🛠️ 四、 后续行动清单
@@ -53,21 +76,205 @@ class BookClubReport:
 ---
 *本策划案由 BookClub_Core 系统自动生成，版权所有：夏萌读书会项目组*
 """
-        return md
 
-    def save_report(self, filename: str = "output/plan_v1.md"):
-        content = self.format_as_markdown()
-        with open(filename, "w", encoding="utf-8") as f:
-            f.write(content)
-        print(f"✨ 策划案已导出至: {filename}")
 
-# 测试代码
-if __name__ == "__main__":
-    test_inputs = {
-        "cycle_days": 7,
-        "format": "hybrid",
-        "tone": "professional",
-        "conversion": {"enabled": False}
+def compile_template(template: str):
+    """预编译：拆成 ((字面量, 字段名), ...)，渲染时不再解析模板"""
+    return tuple((literal, field) for literal, field, _, _ in string.Formatter().parse(template))
+
+
+_PLAN_PARTS = compile_template(PLAN_TEMPLATE)
+_DAY_PARTS = compile_template(DAY_TEMPLATE)
+
+
+def _fill(parts, values: dict) -> list:
+    out = []
+    for literal, field in parts:
+        out.append(literal)
+        if field is not None:
+            out.append(values[field])
+    return out
+
+
+def _day_title(day: int, cycle: int) -> str:
+    if day == 1:
+        return "理论基础"
+    return "深度实践" if day < cycle else "总结与蜕变"
+
+
+@lru_cache(maxsize=MAX_CYCLE_DAYS)
+def _days_and_footer(cycle: int) -> str:
+    """每日大纲 + 结尾（只与天数有关，按天数缓存）"""
+    out = []
+    for day in range(1, cycle + 1):
+        out.extend(_fill(_DAY_PARTS, {"day": str(day), "title": _day_title(day, cycle)}))
+    out.append(FOOTER)
+    return "".join(out)
+
+
+def render_plan(inputs: dict, timestamp: str) -> str:
+    """渲染一份策划案（与原 format_as_markdown 输出逐字一致）"""
+    # 提取核心参数，设置默认值以防万一
+    cycle = int(inputs.get("cycle_days", 3))
+    if not 1 <= cycle <= MAX_CYCLE_DAYS:
+        raise ValueError(f"cycle_days 需在 1-{MAX_CYCLE_DAYS} 之间: {cycle}")
+    conversion = inputs.get("conversion") or {}
+    values = {
+        "timestamp": timestamp,
+        "cycle": str(cycle),
+        "tone": str(inputs.get("tone", "温情专业")),
+        "format_type": str(inputs.get("format", "线上/线下混合")),
+        "conversion": "已开启" if conversion.get("enabled") else "纯公益/不开启",
     }
-    reporter = BookClubReport(test_inputs)
-    reporter.save_report()
\ No newline at end of file
+    out = _fill(_PLAN_PARTS, values)
+    out.append(_days_and_footer(cycle))
+    return "".join(out)
+
+
+def render_many(inputs_list: Iterable[dict], timestamp: str = None) -> Iterator[str]:
+    """批量渲染（惰性生成，适合流式写出）"""
+    timestamp = timestamp or datetime.now().strftime("%Y-%m-%d")
+    for inputs in inputs_list:
+        yield render_plan(inputs, timestamp)
+
+
+def unique_plan_path(plan_id: str = None) -> str:
+    """output/plans/<日期>/plan_<时间>_<ID>（不含扩展名）"""
+    now = datetime.now()
+    plan_id = plan_id or uuid.uuid4().hex[:6]
+    return os.path.join(PLANS_DIR, now.strftime("%Y%m%d"), f"plan_{now.strftime('%H%M%S')}_{plan_id}")
+
+
+class BookClubReport:
+    def __init__(self, inputs: dict):
+        self.inputs = inputs
+        self.timestamp = datetime.now().strftime("%Y-%m-%d")
+
+    def format_as_markdown(self) -> str:
+        """将 JSON 数据转化为夏萌老师风格的 Markdown 策划案"""
+        return render_plan(self.inputs, self.timestamp)
+
+    def save_report(self, filename: str = None, formats=("md",)) -> str:
+        """
+        导出策划案
+
+        Args:
+            filename: Markdown 路径；为空时自动生成不重名路径（同时运行多次也不会互相覆盖）
+            formats: 需要的格式（md / docx / wechat），Word 与微信版与 Agent 输出使用同一套导出器
+
+        Returns:
+            Markdown 文件路径
+        """
+        from src.logic.exporters import render_outputs
+
+        base_path = os.path.splitext(filename)[0] if filename else unique_plan_path()
+        render_outputs(self.format_as_markdown(), base_path, formats=formats)
+        print(f"✨ 策划案已导出至: {base_path}.md")
+        return f"{base_path}.md"
+
+
+# ---------- 批量 / 基准 ----------
+def _load_inputs(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        if path.lower().endswith(".json"):
+            data = json.load(f)
+            return data if isinstance(data, list) else [data]
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _render_job(args):
+    """进程池任务：渲染 + 导出（参数可 pickle）"""
+    inputs, timestamp, base_path, formats = args
+    from src.logic.exporters import render_outputs
+
+    return render_outputs(render_plan(inputs, timestamp), base_path, formats=formats)
+
+
+def run_batch(inputs_list, formats, workers: int):
+    timestamp = datetime.now().strftime("%Y-%m-%d")
+    now = datetime.now()
+    out_dir = os.path.join(PLANS_DIR, now.strftime("%Y%m%d"), f"batch_{now.strftime('%H%M%S')}_{uuid.uuid4().hex[:6]}")
+    jobs = [
+        (inputs, timestamp, os.path.join(out_dir, f"plan_{inputs.get('id', i + 1)}"), formats)
+        for i, inputs in enumerate(inputs_list)
+    ]
+    start = time.perf_counter()
+    if formats == ("md",) or workers <= 1:
+        results = [_render_job(job) for job in jobs]
+    else:
+        # Word 渲染是 CPU 密集的，放进进程池
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_render_job, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+    elapsed = time.perf_counter() - start
+    errors = sum(1 for files in results for f in files if "error" in f)
+    print(f"✨ {len(jobs)} 份策划案已导出至 {out_dir}/（{elapsed:.2f}s，{len(jobs) / elapsed:.0f} 份/秒，失败 {errors} 个文件）")
+
+
+def run_stream(inputs_list, out):
+    """全部策划案依次写入一个流（标准输出或文件），每份以 <!-- plan N --> 分隔"""
+    for i, md in enumerate(render_many(inputs_list), 1):
+        out.write(f"<!-- plan {i} -->\n")
+        out.write(md)
+        out.write("\n")
+
+
+def run_benchmark(n: int):
+    tones = ["professional", "温情专业", "幽默风趣"]
+    formats = ["hybrid", "线上", "线下"]
+    inputs_list = [
+        {
+            "cycle_days": i % MAX_CYCLE_DAYS + 1,
+            "tone": tones[i % 3],
+            "format": formats[i % 3],
+            "conversion": {"enabled": i % 2 == 0},
+        }
+        for i in range(n)
+    ]
+    start = time.perf_counter()
+    total_chars = sum(len(md) for md in render_many(inputs_list))
+    elapsed = time.perf_counter() - start
+    print(f"⏱️  渲染 {n} 份（1-{MAX_CYCLE_DAYS} 天混合）：{elapsed:.3f}s | "
+          f"{n / elapsed:,.0f} 份/秒 | {total_chars / elapsed / 1e6:.1f}M 字符/秒")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="渲染读书会策划案（单份 / 批量 / 流式 / 基准）")
+    parser.add_argument("input", nargs="?", help="inputs 清单（.jsonl 每行一个，或 .json 数组）")
+    parser.add_argument("--formats", default="md", help="md,docx,wechat 的任意组合（默认 md）")
+    parser.add_argument("--stream", action="store_true", help="全部写入标准输出（或 --out 指定的文件）")
+    parser.add_argument("--out", help="--stream 时的输出文件")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1), help="导出进程数")
+    parser.add_argument("--benchmark", type=int, metavar="N", help="渲染 N 份并报告吞吐")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        run_benchmark(args.benchmark)
+        return
+
+    if not args.input:
+        # 测试代码
+        test_inputs = {
+            "cycle_days": 7,
+            "format": "hybrid",
+            "tone": "professional",
+            "conversion": {"enabled": False}
+        }
+        reporter = BookClubReport(test_inputs)
+        reporter.save_report()
+        return
+
+    inputs_list = _load_inputs(args.input)
+    if args.stream:
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                run_stream(inputs_list, f)
+        else:
+            run_stream(inputs_list, sys.stdout)
+        return
+
+    formats = tuple(f.strip() for f in args.formats.split(",") if f.strip())
+    run_batch(inputs_list, formats, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+输出目录管理（output/runs/，见 src/logic/output_store.py）
+
+用法：
+    python scripts/outputs.py list                       # 最近 20 个 run
+    python scripts/outputs.py list --role content -n 50
+    python scripts/outputs.py show 175038_content_1a2b3c # 查看某个 run 的 manifest
+    python scripts/outputs.py maintain --archive-after-days 7 --retention-days 90
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src.logic.output_store import output_store  # noqa: E402
+
+
+def _size(n: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if n < 1024:
+            return f"{n:.0f}{unit}"
+        n /= 1024
+    return f"{n:.1f}GB"
+
+
+def cmd_list(args):
+    runs = output_store.list_runs(limit=args.n, role=args.role)
+    if not runs:
+        print(f"  （{output_store.runs_dir} 下还没有任何 run）")
+        return
+    for r in runs:
+        created = datetime.fromtimestamp(r["created_at"]).strftime("%m-%d %H:%M:%S")
+        where = r.get("archived") or r["path"]
+        icon = "✓" if r.get("status") == "ok" else "✗"
+        print(f"  {icon} {created}  {r['role']:<8}{r['files']:>3} 个文件 {_size(r['bytes']):>8} "
+              f"{r['seconds']:>7.1f}s  {where}")
+
+
+def cmd_show(args):
+    manifest = output_store.load_manifest(args.run_id)
+    if manifest is None:
+        print(f"✗ 找不到 run {args.run_id}")
+        sys.exit(1)
+    print(json.dumps(manifest, ensure_ascii=False, indent=2))
+
+
+def cmd_maintain(args):
+    stats = output_store.maintain(args.archive_after_days, args.retention_days)
+    print(f"🗜️  压缩 {len(stats['archived'])} 天 | 🗑️ 删除 {len(stats['pruned'])} 天 | "
+          f"回收 {stats['blobs_freed']} 个重复内容块")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="管理 BookClub 输出目录")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_list = sub.add_parser("list", help="列出最近的 run")
+    p_list.add_argument("-n", type=int, default=20, help="条数（0 = 全部）")
+    p_list.add_argument("--role", choices=["intake", "content", "ops"])
+    p_list.set_defaults(func=cmd_list)
+
+    p_show = sub.add_parser("show", help="查看 run 的 manifest")
+    p_show.add_argument("run_id")
+    p_show.set_defaults(func=cmd_show)
+
+    p_maintain = sub.add_parser("maintain", help="压缩 / 删除过期 run，回收无引用内容")
+    p_maintain.add_argument("--archive-after-days", type=int, default=None,
+                            help="超过 N 天压缩为 .tar.gz（默认读 OUTPUT_ARCHIVE_AFTER_DAYS）")
+    p_maintain.add_argument("--retention-days", type=int, default=None,
+                            help="超过 N 天删除（默认读 OUTPUT_RETENTION_DAYS）")
+    p_maintain.set_defaults(func=cmd_maintain)
+
+    args = parser.parse_args()
+    os.chdir(PROJECT_ROOT)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+追踪汇总（读取 src/logic/tracing.py 导出的 spans.jsonl）
+
+用法：
+    python scripts/trace_summary.py                                # 默认 output/traces/spans.jsonl
+    python scripts/trace_summary.py output/traces/spans.jsonl --job <job_id>
+    python scripts/trace_summary.py --last 5                       # 只看最近 5 个任务的关键路径
+
+输出：
+    1. 各阶段耗时分布（次数 / 总耗时 / p50 / p95 / 最大）
+    2. 每个任务的关键路径：从根 span 开始，每层沿"最晚结束"的子 span 往下走，
+       即决定任务总时长的那条顺序链（例如 mention.receive → content.day → llm.generate）
+"""
+
+import argparse
+import json
+import os
+import sys
+from collections import defaultdict
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src.logic.env import ensure_env  # noqa: E402
+
+ensure_env()
+
+DEFAULT_PATH = os.path.join(os.getenv("TRACE_DIR", os.path.join("output", "traces")), "spans.jsonl")
+
+
+def load_spans(path):
+    spans = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                raw = json.loads(line)
+            except ValueError:
+                continue
+            attrs = {}
+            for item in raw.get("attributes", []):
+                value = item.get("value", {})
+                attrs[item["key"]] = next(iter(value.values()), "") if value else ""
+            start, end = int(raw["startTimeUnixNano"]), int(raw["endTimeUnixNano"])
+            spans.append({
+                "trace": raw["traceId"],
+                "id": raw["spanId"],
+                "parent": raw.get("parentSpanId") or None,
+                "name": raw["name"],
+                "start": start,
+                "end": end,
+                "ms": (end - start) / 1e6,
+                "attrs": attrs,
+                "error": raw.get("status", {}).get("code") == "STATUS_CODE_ERROR",
+            })
+    return spans
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, int(round(p / 100 * (len(sorted_values) - 1)))))
+    return sorted_values[k]
+
+
+def stage_table(spans):
+    by_name = defaultdict(list)
+    for s in spans:
+        by_name[s["name"]].append(s["ms"])
+
+    lines = [f"{'阶段':<20}{'次数':>6}{'总计(s)':>10}{'p50(ms)':>10}{'p95(ms)':>10}{'最大(ms)':>10}"]
+    for name, values in sorted(by_name.items(), key=lambda kv: -sum(kv[1])):
+        values.sort()
+        lines.append(
+            f"{name:<20}{len(values):>6}{sum(values) / 1000:>10.2f}"
+            f"{percentile(values, 50):>10.0f}{percentile(values, 95):>10.0f}{values[-1]:>10.0f}"
+        )
+    return lines
+
+
+def critical_path(trace_spans):
+    """
+    Returns:
+        (root, [(depth, span)])：每层从父 span 结束处往回找，依次取"在上一个之前最晚结束"的子 span，
+        串起来就是该层决定总时长的顺序链；再对链上每个 span 递归
+    """
+    children = defaultdict(list)
+    root = None
+    for s in trace_spans:
+        if s["parent"] is None:
+            root = s
+        else:
+            children[s["parent"]].append(s)
+    if root is None:
+        return None, []
+
+    path = []
+
+    def walk(node, depth):
+        path.append((depth, node))
+        chain = []
+        cursor = node["end"]
+        for kid in sorted(children.get(node["id"], []), key=lambda c: c["end"], reverse=True):
+            if kid["end"] <= cursor:
+                chain.append(kid)
+                cursor = kid["start"]
+        for kid in reversed(chain):
+            walk(kid, depth + 1)
+
+    walk(root, 0)
+    return root, path
+
+
+def _label(span):
+    extra = []
+    for key in ("day", "suffix", "model"):
+        if span["attrs"].get(key):
+            extra.append(f"{key}={span['attrs'][key]}")
+    return span["name"] + (f"({', '.join(extra)})" if extra else "")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="汇总 BookClub 追踪数据：阶段耗时 + 关键路径")
+    parser.add_argument("path", nargs="?", default=DEFAULT_PATH, help="spans.jsonl 路径")
+    parser.add_argument("--job", help="只看指定 job.id")
+    parser.add_argument("--last", type=int, default=3, help="展示最近 N 个任务的关键路径（默认 3）")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        print(f"✗ 找不到 {args.path}（是否设置了 TRACE_ENABLED=0？）")
+        sys.exit(1)
+
+    spans = load_spans(args.path)
+    if args.job:
+        spans = [s for s in spans if s["attrs"].get("job.id") == args.job]
+    if not spans:
+        print("✗ 没有任何 span")
+        sys.exit(1)
+
+    print(f"📊 各阶段耗时（{len(spans)} 个 span）")
+    print("\n".join(stage_table(spans)))
+
+    traces = defaultdict(list)
+    for s in spans:
+        traces[s["trace"]].append(s)
+    ordered = sorted(traces.values(), key=lambda ts: min(s["start"] for s in ts))
+
+    print(f"\n🧭 关键路径（最近 {min(args.last, len(ordered))} / {len(ordered)} 个任务）")
+    for trace_spans in ordered[-args.last:]:
+        root, path = critical_path(trace_spans)
+        if root is None:
+            continue
+        errors = sum(1 for s in trace_spans if s["error"])
+        print(f"\n  job={root['attrs'].get('job.id')} 总耗时 {root['ms'] / 1000:.1f}s"
+              f"{f'  ⚠️ {errors} 个错误 span' if errors else ''}")
+        for depth, s in path:
+            share = s["ms"] / root["ms"] * 100 if root["ms"] else 0
+            print(f"  {'  ' * depth}└ {_label(s):<40} {s['ms']:>9.0f}ms {share:>5.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+# 包导入时先加载 .env：各模块的配置常量在 import 时读取，必须在此之前生效
+from src.logic.env import ensure_env
+
+ensure_env()
@@ -29,49 +29,187 @@ BookClub AI Agent - 多智能体读书会全案生成系统
 import os
 import sys
 import re
-from datetime import datetime
-from dotenv import load_dotenv
-from google import genai
-
-try:
-    from docx import Document
-    from docx.shared import Pt, RGBColor
-    from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
-    DOCX_AVAILABLE = True
-except ImportError:
-    DOCX_AVAILABLE = False
-    print("⚠️ python-docx 未安装，Word 输出功能不可用", flush=True)
+import asyncio
+import time
 
 from openagents.agents.worker_agent import (
     WorkerAgent as Agent,
     ChannelMessageContext,
-    EventContext,
-    on_event,
+    ReplyMessageContext,
 )
 
-load_dotenv()
-sys.path.append(os.getcwd())
+from src.logic.llm_gateway import llm_gateway
+from src.logic.readiness import Readiness
+from src.logic.pdf_index import PdfPassageIndex, format_passages
+from src.logic.mention_router import MENTION_RE, MentionRouter, IdempotencyStore, is_agent_source, parse_command
+from src.logic.tracing import tracer, debug
+from src.logic.exporters import DOCX_AVAILABLE, markdown_to_docx, markdown_to_wechat
+from src.logic.output_store import output_store
+from src.logic.generation_index import generation_index
+from src.logic.replicas import REPLICA_ID, ReplicaCoordinator
+from src.logic.jobs import JOB_CONCURRENCY, Job, JobRegistry
+from src.logic.loop_monitor import LOOP_LAG_ENABLED, loop_monitor
+from src.logic.hot_reload import HOT_RELOAD_INTERVAL, FileWatcher, KnowledgeHolder, SnapshotField
+from src.logic.knowledge_cache import knowledge_cache
+from src.logic.intake_session import (
+    control_word, extract_fields, follow_up, format_form, intake_sessions, missing_fields, render_request, session_key,
+)
+from src.logic.outline import format_entry, neighbour_context, outline_topic, parse_outline, summarize_intake
+from src.logic.revisions import (
+    OUTLINE_FILE, REQUEST_FILE, extract_outline, find_section, section_headings, splice_section,
+)
+from src.tools.food_store import FoodStore
 
-# 输出目录（自动保存 Agent 生成的内容）
-OUTPUT_DIR = "output"
+sys.path.append(os.getcwd())
 
 
 EVENT_TO_CONTENT = "bookclub.pipeline.to_content"
 EVENT_TO_OPS = "bookclub.pipeline.to_ops"
 
+# PDF 相关生成最多等待知识库预热多久（秒），超时后不带 PDF 继续
+PDF_READY_TIMEOUT = float(os.getenv("PDF_READY_TIMEOUT", "60"))
+
+# 本地 PDF 检索：每次生成只放入 top-k 相关段落（PDF_ATTACH_FULL=1 时仍上传整本 PDF）
+PDF_TOP_K = int(os.getenv("PDF_TOP_K", "6"))
+
+# 营养数据：每次生成只附带大纲 / 主题 / 书中段落里提到的食物，最多 N 种
+NUTRITION_MAX_FOODS = int(os.getenv("NUTRITION_MAX_FOODS", "40"))
+
+# 同一事件 ID 在该时间窗口内只处理一次（秒）
+EVENT_DEDUPE_TTL = float(os.getenv("EVENT_DEDUPE_TTL", "3600"))
+
+# _execute_reasoning 调用失败时不抛异常，而是返回以这些前缀开头的提示（频道模式下直接回复给用户）
+FAILURE_PREFIXES = ("❌", "⚠️ 无回复")
+
+
+def is_failure(text: str) -> bool:
+    """模型调用是否失败（返回的是错误提示而不是生成内容）"""
+    return (text or "").startswith(FAILURE_PREFIXES)
+
+
+class GenerationError(RuntimeError):
+    """strict 模式下某一步生成失败（大纲 / 某一天），消息里带上失败的步骤"""
+
+# ops 物料包结构（整包生成与"重写 Part N.M"共用，局部重写时按编号截取对应要求）
+OPS_STRUCTURE = """# Part 3：时间轴与 SOP（约 1000 字）
+
+## 3.1 总体时间线
+| 阶段 | 时间 | 主要任务 |
+|------|------|----------|
+| 招募期 | D-7 至 D-1（7天） | ... |
+| 交付期 | D1 至 D3（3天） | ... |
+| 结营 | D3 下午 | ... |
+
+## 3.2 招募期详细 SOP（7天）
+| 日期 | 时间 | 动作 | 内容要点 |
+|------|------|------|----------|
+| D-7 | 08:00 | 朋友圈1 | ... |
+...
+
+## 3.3 交付期详细 SOP（3天）
+...
+
+# Part 4：招募期文案（21条，约 4000 字）
+
+## 4.1 朋友圈文案（17条）
+
+### D-7 第1条（预告）
+---
+[完整文案，可直接复制使用]
+---
+
+### D-7 第2条（痛点共鸣）
+---
+[完整文案]
+---
+
+... [继续写完 17 条]
+
+## 4.2 公众号推文（2篇）
+[完整标题+开头段落]
+
+## 4.3 短视频脚本（7条）
+[每条包含：画面描述+口播文案]
+
+# Part 5：交付期文案（约 2000 字）
+
+## 5.1 开营文案
+[完整的欢迎语、群规、福利说明]
+
+## 5.2 每日运营文案
+### Day 1
+- 早安问候：[完整文案]
+- 作业引导：[完整文案]
+- 晚安总结：[完整文案]
+
+### Day 2
+...
+
+### Day 3
+...
+
+## 5.3 结营文案
+[感谢语、成果回顾、销讲引导]
+
+# Part 6：资源清单（约 500 字）
+
+## 6.1 需要准备的图片素材
+- [ ] 海报 x 3
+- [ ] 产品图 x 5
+...
+
+## 6.2 需要准备的文档
+...
+
+## 6.3 时间投入估算
+...
+
+# Part 7：销讲资源包（约 1500 字）
+
+## 7.1 销讲逐字稿
+[完整的 10 分钟销讲脚本：痛点共情 → 科学解释 → 用户见证 → 产品介绍 → 促单 → 行动指令]
+
+## 7.2 异议处理话术（5个）
+| 常见异议 | 回应话术 |
+|----------|----------|
+| "太贵了" | ... |
+...
+
+## 7.3 接龙模板
+[可直接复制的接龙格式]
+
+## 7.4 成交后服务模板
+[感谢语、使用指南、售后承诺]
+"""
+
 
 class BookClubAgent(Agent):
+    # 知识字段存放在 self.knowledge 的快照里：任务内读取固定版本，赋值即发布新版本（支持热更新）
+    instruction = SnapshotField()
+    file_ref = SnapshotField()
+    pdf_index = SnapshotField()
+    rules_content = SnapshotField()
+    food_store = SnapshotField()
+
     def __init__(self, *args, **kwargs):
+        # 多副本模式：各副本以 <agent_id>-<REPLICA_ID> 连接网络（网络内 ID 唯一），仍响应逻辑 ID 的 @
+        logical_id = kwargs.get('agent_id')
+        if REPLICA_ID and logical_id:
+            kwargs['agent_id'] = f"{logical_id}-{REPLICA_ID}"
+
         # 先调用父类初始化
         super().__init__(*args, **kwargs)
 
         # OpenAgents 使用 agent_config 和 agent_id（不是 config 和 id）
-        agent_id = kwargs.get('agent_id') or getattr(self, '_agent_id', 'unknown')
+        agent_id = logical_id or getattr(self, '_agent_id', 'unknown')
         agent_config = kwargs.get('agent_config') or getattr(self, '_agent_config', {})
         
         # 获取 config 部分（agent_config 可能包含多个部分）
         if isinstance(agent_config, dict):
             self.raw_config = agent_config.get('config', agent_config)
+        elif hasattr(agent_config, "model_dump"):
+            # YAML 加载器传入的是 AgentConfig（pydantic，允许额外字段），role_type 等自定义字段也在其中
+            self.raw_config = agent_config.model_dump()
         else:
             self.raw_config = {}
 
@@ -88,20 +226,53 @@ class BookClubAgent(Agent):
                 self.role_type = "ops"
 
         # 从配置读取模型名，支持不同 Agent 使用不同模型
-        self.model_name = self.raw_config.get("model_name", "gemini-2.0-flash-exp")
-        self.instruction = self.raw_config.get("instruction", "你是一位专业的临床营养专家助手。")
+        self.model_name = self.raw_config.get("model_name") or "gemini-2.0-flash-exp"
+        self.knowledge = KnowledgeHolder(is_ready=lambda: self.readiness.warm)
+        self.instruction = self.raw_config.get("instruction") or "你是一位专业的临床营养专家助手。"
 
-        api_key = os.getenv("GOOGLE_API_KEY")
-        self.genai_client = genai.Client(
-            api_key=api_key,
-            http_options={"api_version": "v1beta"},
-        ) if api_key else None
+        # 模型句柄由进程级网关统一管理（共享 genai.Client + 连接池）
+        self.llm = llm_gateway.model(self.model_name)
 
         self.file_ref = None
+        self.pdf_index = None  # 本地 PDF 段落索引（BM25，带页码）
         self.rules_content = None  # 膳食指南规则（Markdown 文本）
-        self.nutrition_content = None  # 食物营养速查表（Markdown 文本）
+        self.food_store = None  # 食物营养库（速查表 + 成分表，按提及截取）
+
+        # 各角色需要预热的知识组件（后台并发加载，按需等待）
+        components = {
+            "intake": [],
+            "content": ["rules", "nutrition", "pdf"],
+            "ops": ["rules"],
+        }.get(self.role_type, [])
+        self.readiness = Readiness(str(kwargs.get('agent_id') or agent_id), components)
+
+        # @ 路由（精确匹配别名，忽略引用内容）+ 事件去重
+        self.mention_router = MentionRouter(self.role_type, agent_id=str(agent_id))
+        self.processed_events = IdempotencyStore(ttl_seconds=EVENT_DEDUPE_TTL)
+        # 多副本之间按租约分配任务（未设置 REPLICA_ID 时不做协调）
+        self.replicas = ReplicaCoordinator(self.role_type)
+        # @ 任务在后台排队执行，消息处理不被长任务阻塞（"取消"随时可处理）
+        # 各角色可单独设置并发（JOB_CONCURRENCY_CONTENT=2 等，多角色同进程时尤其有用）
+        self.jobs = JobRegistry(int(os.getenv(f"JOB_CONCURRENCY_{self.role_type.upper()}", JOB_CONCURRENCY)))
+        # 事件循环延迟采样 + 阻塞看门狗（进程内共用，LOOP_LAG_MONITOR=1 开启；统计写入健康状态文件）
+        self.loop_monitor = loop_monitor if LOOP_LAG_ENABLED else None
+        if self.loop_monitor is not None:
+            self.readiness.metrics["loop_lag"] = self.loop_monitor.stats
+        self.readiness.metrics["knowledge"] = lambda: {"version": self.knowledge.current.version}
+        # 追踪的服务名（同一进程托管多个角色时，各 Agent 的 trace 按它区分）
+        self.service_name = str(kwargs.get('agent_id') or agent_id)
+        tracer.configure(service=self.service_name)
+        self._warmup_task = None
+        self._watcher = None
+        if not DOCX_AVAILABLE:
+            print("⚠️ python-docx 未安装，Word 输出功能不可用", flush=True)
         print(f"✅ [Ready] {self.role_type.upper()} 就绪 | 引擎: {self.model_name}", flush=True)
 
+    @property
+    def genai_client(self):
+        """共享的 genai.Client（未配置 API Key 时为 None）"""
+        return llm_gateway.client if llm_gateway.available else None
+
     async def on_startup(self):
         """
         Agent 启动时加载知识库并发送欢迎消息
@@ -114,18 +285,103 @@ class BookClubAgent(Agent):
         - 涉及医学逻辑时 → 优先检索 you_are_what_you_eat.pdf
         - 涉及定量标准时 → 必须核对 dietary_rules.md
         """
-        # content 和 ops 都需要膳食规则
-        if self.role_type in ("content", "ops"):
-            await self._load_dietary_rules()
-        
-        # content 需要 PDF 知识库 + 营养速查表
-        if self.role_type == "content":
-            await self._setup_knowledge_base()
-            await self._load_nutrition_data()
+        # 知识库在后台并发预热，不阻塞消息处理
+        # （不依赖 PDF 的消息立即可处理，依赖 PDF 的生成在 _execute_reasoning 中等待）
+        self.readiness.write()
+        self._warmup_task = asyncio.create_task(self._warm_up())
+        if HOT_RELOAD_INTERVAL > 0:
+            asyncio.create_task(self._watch_knowledge())
+        self.replicas.start()
+        if self.loop_monitor is not None:
+            self.loop_monitor.start(on_report=self.readiness.write)
+
+        # 配置了压缩 / 保留策略时，后台整理过期的输出分片
+        if output_store.archive_after_days or output_store.retention_days:
+            asyncio.create_task(asyncio.to_thread(output_store.maintain))
         
         # intake 发送欢迎消息到 #general 频道
         if self.role_type == "intake":
             await self._send_welcome_message()
+
+    async def _warm_up(self):
+        """并发加载膳食规则 / 营养速查表 / PDF，全部结束后打印预热完成"""
+        loaders = {
+            "rules": self._load_dietary_rules,
+            "nutrition": self._load_nutrition_data,
+            "pdf": self._setup_knowledge_base,
+        }
+        tasks = [loaders[c]() for c in self.readiness.components]
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        elapsed = time.time() - self.readiness.started_at
+        print(f"✅ [Warm] {self.role_type.upper()} 知识库预热完成（{elapsed:.1f}s）", flush=True)
+        self.readiness.write()
+
+    async def _watch_knowledge(self):
+        """
+        热更新：每 HOT_RELOAD_INTERVAL 秒检查 instruction / 知识文件，内容变化时重新加载
+        （预热开始前记录文件基线，预热期间的改动也会在预热结束后补上）
+        """
+        store = FoodStore()
+        groups = {
+            "instruction": [os.path.join("agents", f"{self.role_type}.yaml")],
+            "rules": ["data/dietary_rules.md"],
+            "nutrition": [store.reference_path, store.excel_path],
+            "pdf": ["data/you_are_what_you_eat.pdf"],
+        }
+        groups = {k: v for k, v in groups.items() if k == "instruction" or k in self.readiness.components}
+        try:
+            self._watcher = await asyncio.to_thread(FileWatcher, groups)
+            await self._warmup_task
+        except Exception as e:
+            print(f"⚠️ [Reload] 热更新未启动: {e}", flush=True)
+            return
+
+        while True:
+            await asyncio.sleep(HOT_RELOAD_INTERVAL)
+            try:
+                changed = await asyncio.to_thread(self._watcher.poll)
+                if changed:
+                    await self._reload_knowledge(changed)
+            except Exception as e:
+                print(f"⚠️ [Reload] 热更新检查失败: {e}", flush=True)
+
+    async def _reload_knowledge(self, components):
+        """
+        重新加载变化的组件，全部完成后一次性切换到新快照
+        - 进行中的任务继续使用开始时的快照，之后开始的任务（含排队中的）使用新版本
+        - 加载失败的组件保留旧内容
+        """
+        print(f"🔄 [Reload] 检测到变更: {', '.join(components)}，后台重新加载...", flush=True)
+        loaders = {
+            "instruction": self._load_instruction,
+            "rules": self._load_dietary_rules,
+            "nutrition": self._load_nutrition_data,
+            "pdf": lambda: self._setup_knowledge_base(reuse_uploaded=False),
+        }
+        with self.knowledge.transaction() as staged:
+            await asyncio.gather(*(loaders[c]() for c in components), return_exceptions=True)
+        if staged["published"]:
+            running = sum(1 for job in self.jobs.active() if job.state == "running")
+            print(f"✅ [Reload] 已切换到知识版本 v{self.knowledge.current.version}"
+                  f"（进行中的 {running} 个任务继续使用旧版本）", flush=True)
+        else:
+            print("ℹ️ [Reload] 内容未变或加载失败，继续使用当前版本", flush=True)
+
+    async def _load_instruction(self):
+        """从 agents/<role>.yaml 重新读取 config.instruction（model_name 等其他字段需重启生效）"""
+        import yaml
+
+        path = os.path.join("agents", f"{self.role_type}.yaml")
+        try:
+            text = await asyncio.to_thread(self._read_text, path)
+            instruction = ((yaml.safe_load(text) or {}).get("config") or {}).get("instruction")
+        except Exception as e:
+            print(f"💥 [Reload] {path} 解析失败，保留原 instruction: {e}", flush=True)
+            return
+        if instruction and instruction != self.instruction:
+            self.instruction = instruction
+            print(f"✅ [Reload] instruction 已更新（{len(instruction)} 字符）", flush=True)
     
     async def _send_welcome_message(self):
         """
@@ -186,9 +442,12 @@ Step 3: 引用 Content 消息 → @bc-ops → 生成执行物料
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
 💡 提示
-- 所有输出会自动保存到 output/ 目录（3种格式）
+- 所有输出会自动保存到 output/runs/ 目录（每次任务一个文件夹，3种格式）
 - Word 格式可直接复制到微信公众号编辑器
 - 微信版文本适合朋友圈逐条复制
+- 信息不全时 intake 会逐个追问，直接回复 "@bc-intake ..." 补充即可（不用重贴之前的内容）；回复 "@bc-intake 就这些" 按现有信息出需求单
+- 天数写错了？在任务话题里回复 "@bc-content 取消" 即可停止生成
+- 某一天不满意？在任务话题里回复 "@bc-content 重写 Day 2 语气再轻松些"（ops 用 "重写 Part 4.1"），只重新生成这一部分
 
 🔗 详细文档：使用指南.md
 
@@ -213,319 +472,182 @@ Step 3: 引用 Content 消息 → @bc-ops → 生成执行物料
         rules_path = "data/dietary_rules.md"
         if not os.path.exists(rules_path):
             print(f"⚠️ [System] 膳食规则文件不存在: {rules_path}", flush=True)
+            self.readiness.mark("rules", ok=False, detail="文件不存在")
             return
         
         try:
-            with open(rules_path, "r", encoding="utf-8") as f:
-                self.rules_content = f.read()
+            self.rules_content = await knowledge_cache.load("rules", [rules_path], lambda: self._read_text(rules_path))
             print(f"✅ [System] 膳食规则已加载（{len(self.rules_content)} 字符）", flush=True)
+            self.readiness.mark("rules", detail=f"{len(self.rules_content)} 字符")
         except Exception as e:
             print(f"💥 [System] 膳食规则加载失败: {e}", flush=True)
+            self.readiness.mark("rules", ok=False, detail=str(e))
+
+    @staticmethod
+    def _read_text(path: str) -> str:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
 
     async def _load_nutrition_data(self):
         """
-        加载食物营养速查表（Markdown 文本）
-        规则文件：data/nutrition_reference.md
+        加载食物营养库（速查表 + 成分表合并索引，见 src/tools/food_store.py）
+        数据文件：data/nutrition_reference.md、data/nutrition.xlsx
         
         【数据调用优先级】
         - 涉及具体克数（g/ml）时 → 优先检索此表
         - 涉及医学逻辑时 → 优先检索 PDF
         - 涉及定量标准时 → 必须核对 dietary_rules.md
         """
-        nutrition_path = "data/nutrition_reference.md"
-        if not os.path.exists(nutrition_path):
-            print(f"⚠️ [System] 营养速查表不存在: {nutrition_path}", flush=True)
-            return
-        
+        store = FoodStore()
         try:
-            with open(nutrition_path, "r", encoding="utf-8") as f:
-                self.nutrition_content = f.read()
-            print(f"✅ [System] 营养速查表已加载（{len(self.nutrition_content)} 字符）", flush=True)
+            store = await knowledge_cache.load(
+                "nutrition", [store.reference_path, store.excel_path], store.build_or_load
+            )
         except Exception as e:
-            print(f"💥 [System] 营养速查表加载失败: {e}", flush=True)
+            print(f"💥 [System] 食物营养库加载失败: {e}", flush=True)
+            self.readiness.mark("nutrition", ok=False, detail=str(e))
+            return
 
-    def _save_output(self, content: str, suffix: str = "") -> str:
+        if not store.ready:
+            print("⚠️ [System] 营养数据不存在: data/nutrition_reference.md / data/nutrition.xlsx", flush=True)
+            self.readiness.mark("nutrition", ok=False, detail="文件不存在")
+            return
+        self.food_store = store
+        print(f"✅ [System] 食物营养库已加载（{len(store)} 种食物）", flush=True)
+        self.readiness.mark("nutrition", detail=f"{len(store)} 种食物")
+
+    def _save_output(self, content: str, suffix: str = "", run=None, meta: dict = None) -> str:
         """
         自动保存 Agent 输出到多种格式
         - .md：Markdown 原文（开发者查看）
         - .docx：Word 文档（微信公众号编辑器）
         - _wechat.txt：微信友好纯文本（朋友圈复制）
         
+        文件写入本次任务的 run 目录（output/runs/<日期>/<run_id>/），并登记到 manifest.json
+        
         Args:
             content: 要保存的内容（Markdown 格式）
             suffix: 可选后缀（如 "day1"）
+            run: 所属任务的 Run（为空时单独建一个 run）
+            meta: 写入历史索引的元数据（如 {"day": 2, "total_days": 5}）
         
         Returns:
             Markdown 文件路径（作为主路径）
         """
-        # 确保 output 目录存在
-        os.makedirs(OUTPUT_DIR, exist_ok=True)
-        
-        # 生成基础文件名：角色_日期时间_后缀
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        base_filename = f"{self.role_type}_{timestamp}"
-        if suffix:
-            base_filename += f"_{suffix}"
+        if run is None:
+            with output_store.run(self.role_type, inputs=content) as single_run:
+                return self._save_output(content, suffix, run=single_run, meta=meta)
+
+        # 基础文件名：角色[_后缀]（run 目录本身已带时间戳和随机 ID，不会撞名）
+        base_filename = f"{self.role_type}_{suffix}" if suffix else self.role_type
         
         saved_files = []
+
+        def _record(name, start):
+            run.add_file(name, time.perf_counter() - start)
+            saved_files.append(name)
         
         # 1. 保存 Markdown 原文
-        md_filepath = os.path.join(OUTPUT_DIR, f"{base_filename}.md")
-        try:
-            with open(md_filepath, "w", encoding="utf-8") as f:
-                f.write(content)
-            saved_files.append(f"{base_filename}.md")
-        except Exception as e:
-            print(f"💥 [Save] Markdown 保存失败: {e}", flush=True)
+        md_filepath = run.file_path(f"{base_filename}.md")
+        with tracer.span("save.md", suffix=suffix, chars=len(content)):
+            start = time.perf_counter()
+            try:
+                with open(md_filepath, "w", encoding="utf-8") as f:
+                    f.write(content)
+                _record(f"{base_filename}.md", start)
+            except Exception as e:
+                print(f"💥 [Save] Markdown 保存失败: {e}", flush=True)
+
+        # 增量写入历史生成索引（供后续相同主题复用）
+        with tracer.span("save.index", suffix=suffix):
+            generation_index.add(md_filepath, content, role=self.role_type, run_id=run.run_id, **(meta or {}))
         
         # 2. 生成 Word 文档
         if DOCX_AVAILABLE:
-            docx_filepath = os.path.join(OUTPUT_DIR, f"{base_filename}.docx")
-            try:
-                self._markdown_to_docx(content, docx_filepath)
-                saved_files.append(f"{base_filename}.docx")
-            except Exception as e:
-                print(f"💥 [Save] Word 转换失败: {e}", flush=True)
+            docx_filepath = run.file_path(f"{base_filename}.docx")
+            with tracer.span("save.docx", suffix=suffix, chars=len(content)):
+                start = time.perf_counter()
+                try:
+                    markdown_to_docx(content, docx_filepath)
+                    _record(f"{base_filename}.docx", start)
+                except Exception as e:
+                    print(f"💥 [Save] Word 转换失败: {e}", flush=True)
         
         # 3. 生成微信友好版
-        wechat_filepath = os.path.join(OUTPUT_DIR, f"{base_filename}_wechat.txt")
-        try:
-            wechat_content = self._markdown_to_wechat(content)
-            with open(wechat_filepath, "w", encoding="utf-8") as f:
-                f.write(wechat_content)
-            saved_files.append(f"{base_filename}_wechat.txt")
-        except Exception as e:
-            print(f"💥 [Save] 微信版转换失败: {e}", flush=True)
+        wechat_filepath = run.file_path(f"{base_filename}_wechat.txt")
+        with tracer.span("save.wechat", suffix=suffix, chars=len(content)):
+            start = time.perf_counter()
+            try:
+                wechat_content = markdown_to_wechat(content)
+                with open(wechat_filepath, "w", encoding="utf-8") as f:
+                    f.write(wechat_content)
+                _record(f"{base_filename}_wechat.txt", start)
+            except Exception as e:
+                print(f"💥 [Save] 微信版转换失败: {e}", flush=True)
         
         # 输出保存结果
         if saved_files:
             print(f"💾 [Save] 已生成 {len(saved_files)} 个文件:", flush=True)
             for f in saved_files:
-                print(f"  - output/{f}", flush=True)
+                print(f"  - {os.path.join(run.path, f)}", flush=True)
         
         return md_filepath
     
-    def _markdown_to_docx(self, markdown_text: str, output_path: str):
-        """
-        将 Markdown 转换为 Word 文档（微信公众号编辑器友好）
-        
-        支持：
-        - # 标题（一级到六级）
-        - **粗体**
-        - - 列表
-        - | 表格 |
-        - 分隔线
-        """
-        doc = Document()
-        
-        # 设置默认字体（微软雅黑，微信编辑器友好）
-        style = doc.styles['Normal']
-        style.font.name = '微软雅黑'
-        style.font.size = Pt(12)
-        
-        lines = markdown_text.split('\n')
-        i = 0
-        
-        while i < len(lines):
-            line = lines[i].rstrip()
-            
-            # 跳过空行
-            if not line:
-                i += 1
-                continue
-            
-            # 一级标题 (# )
-            if line.startswith('# ') and not line.startswith('## '):
-                text = line[2:].strip()
-                p = doc.add_heading(text, level=1)
-                p.runs[0].font.name = '微软雅黑'
-                p.runs[0].font.bold = True
-            
-            # 二级标题 (## )
-            elif line.startswith('## ') and not line.startswith('### '):
-                text = line[3:].strip()
-                p = doc.add_heading(text, level=2)
-                p.runs[0].font.name = '微软雅黑'
-            
-            # 三级标题 (### )
-            elif line.startswith('### '):
-                text = line[4:].strip()
-                p = doc.add_heading(text, level=3)
-                p.runs[0].font.name = '微软雅黑'
-            
-            # 列表项 (- 或 * 开头)
-            elif line.startswith('- ') or line.startswith('* '):
-                text = line[2:].strip()
-                # 处理粗体 **text**
-                text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)
-                p = doc.add_paragraph(text, style='List Bullet')
-            
-            # 数字列表 (1. 开头)
-            elif re.match(r'^\d+\.\s', line):
-                text = re.sub(r'^\d+\.\s', '', line).strip()
-                text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)
-                p = doc.add_paragraph(text, style='List Number')
-            
-            # 表格（简单检测 | 开头）
-            elif line.startswith('|'):
-                # 收集连续的表格行
-                table_lines = []
-                while i < len(lines) and lines[i].strip().startswith('|'):
-                    table_lines.append(lines[i].strip())
-                    i += 1
-                i -= 1  # 回退一行
-                
-                # 过滤掉分隔行 (|---|---|)
-                table_lines = [l for l in table_lines if not re.match(r'^\|[\s\-:]+\|', l)]
-                
-                if table_lines:
-                    # 解析表格
-                    rows = []
-                    for tl in table_lines:
-                        cells = [c.strip() for c in tl.split('|')[1:-1]]  # 去掉首尾空元素
-                        rows.append(cells)
-                    
-                    if rows:
-                        table = doc.add_table(rows=len(rows), cols=len(rows[0]))
-                        table.style = 'Light Grid Accent 1'
-                        
-                        for row_idx, row_data in enumerate(rows):
-                            for col_idx, cell_text in enumerate(row_data):
-                                table.rows[row_idx].cells[col_idx].text = cell_text
-            
-            # 分隔线
-            elif re.match(r'^[\-=─]{3,}$', line):
-                doc.add_paragraph('─' * 30)
-            
-            # 普通段落
-            else:
-                # 处理粗体和内联格式
-                p = doc.add_paragraph()
-                self._add_formatted_text(p, line)
-            
-            i += 1
-        
-        # 保存文档
-        doc.save(output_path)
-    
-    def _add_formatted_text(self, paragraph, text):
-        """
-        在段落中添加格式化文本（支持 **粗体**）
-        """
-        # 简单的粗体处理
-        parts = re.split(r'(\*\*.*?\*\*)', text)
-        
-        for part in parts:
-            if part.startswith('**') and part.endswith('**'):
-                run = paragraph.add_run(part[2:-2])
-                run.bold = True
-            else:
-                paragraph.add_run(part)
-    
-    def _markdown_to_wechat(self, markdown_text: str) -> str:
-        """
-        将 Markdown 转换为微信友好的纯文本
-        
-        转换规则：
-        - # 标题 → 📌【标题】（加粗用emoji）
-        - ## 标题 → ▸ 标题
-        - **粗体** → 【粗体】
-        - - 列表 → · 列表
-        - 表格 → 保留简单格式
-        - 代码块 → 移除
-        """
-        lines = markdown_text.split('\n')
-        result = []
-        
-        in_code_block = False
-        
-        for line in lines:
-            # 跳过代码块
-            if line.startswith('```'):
-                in_code_block = not in_code_block
-                continue
-            if in_code_block:
-                continue
-            
-            # 一级标题
-            if line.startswith('# ') and not line.startswith('## '):
-                text = line[2:].strip()
-                result.append(f"\n━━━━━━━━━━━━━━━━")
-                result.append(f"📌【{text}】")
-                result.append("━━━━━━━━━━━━━━━━\n")
-            
-            # 二级标题
-            elif line.startswith('## ') and not line.startswith('### '):
-                text = line[3:].strip()
-                result.append(f"\n▸ {text}")
-            
-            # 三级标题
-            elif line.startswith('### '):
-                text = line[4:].strip()
-                result.append(f"\n» {text}")
-            
-            # 列表
-            elif line.startswith('- ') or line.startswith('* '):
-                text = line[2:].strip()
-                # 转换粗体
-                text = re.sub(r'\*\*(.*?)\*\*', r'【\1】', text)
-                result.append(f"  · {text}")
-            
-            # 数字列表
-            elif re.match(r'^\d+\.\s', line):
-                text = re.sub(r'^\d+\.\s', '', line).strip()
-                text = re.sub(r'\*\*(.*?)\*\*', r'【\1】', text)
-                result.append(f"  {text}")
-            
-            # 分隔线
-            elif re.match(r'^[\-=─]{3,}$', line):
-                result.append("\n──────────────────────────────\n")
-            
-            # 表格行（保持原样，或简化）
-            elif line.startswith('|'):
-                # 跳过分隔行
-                if not re.match(r'^\|[\s\-:]+\|', line):
-                    result.append(line)
-            
-            # 普通文本
-            else:
-                # 转换粗体
-                text = re.sub(r'\*\*(.*?)\*\*', r'【\1】', line)
-                if text.strip():
-                    result.append(text)
-        
-        return '\n'.join(result)
-
-    async def _setup_knowledge_base(self):
+    async def _setup_knowledge_base(self, reuse_uploaded: bool = True):
         """
         挂载 PDF 知识库（赠金账户优化版）
-        策略：尝试复用已上传的文件，失败时重新上传
+        策略：尝试复用已上传的文件，失败时重新上传（热更新时 PDF 已变，reuse_uploaded=False）
         """
         pdf_path = "data/you_are_what_you_eat.pdf"
-        if not os.path.exists(pdf_path) or not self.genai_client:
+        if not os.path.exists(pdf_path):
+            self.readiness.mark("pdf", ok=False, detail="PDF 不存在")
+            return
+
+        # 优先：本地抽取 + BM25 索引（PDF 未变时直接加载磁盘索引）
+        try:
+            self.pdf_index = await knowledge_cache.load("pdf_index", [pdf_path], PdfPassageIndex(pdf_path).build_or_load)
+        except ImportError:
+            print("⚠️ [System] pypdf 未安装，回退为上传整本 PDF", flush=True)
+        except Exception as e:
+            print(f"⚠️ [System] 本地 PDF 索引失败（{e}），回退为上传整本 PDF", flush=True)
+
+        if os.getenv("PDF_ATTACH_FULL") == "1":
+            self.pdf_index = None  # 兼容模式：仍附带整本 PDF
+        elif self.pdf_index and self.pdf_index.ready:
+            self.readiness.mark("pdf", detail=f"本地检索 {len(self.pdf_index.chunks)} 段")
+            return
+
+        if not self.genai_client:
+            self.readiness.mark("pdf", ok=False, detail="API Key 缺失")
             return
         
         try:
             # 尝试从环境变量获取已上传的 file_ref（减少重复上传）
-            cached_file_name = os.getenv("PDF_FILE_REF")
+            cached_file_name = os.getenv("PDF_FILE_REF") if reuse_uploaded else None
             
             if cached_file_name:
                 try:
                     print(f"🔍 [System] 尝试复用已上传的 PDF: {cached_file_name}...", flush=True)
-                    self.file_ref = self.genai_client.files.get(name=cached_file_name)
+                    # files.get / files.upload 是阻塞调用，放到线程池里执行，避免卡住事件循环
+                    self.file_ref = await asyncio.to_thread(self.genai_client.files.get, name=cached_file_name)
                     print(f"✅ [System] PDF 复用成功！无需重新上传。", flush=True)
+                    self.readiness.mark("pdf", detail=f"复用 {self.file_ref.name}")
                     return
                 except Exception as reuse_error:
                     print(f"⚠️ [System] 无法复用（{reuse_error}），将重新上传...", flush=True)
             
             # 重新上传（赠金账户每次上传都计费，但无法使用 Cache API）
             print("📤 [System] 正在上传 PDF 知识库（约 4MB，需 10-30 秒）...", flush=True)
-            self.file_ref = self.genai_client.files.upload(file=pdf_path)
+            self.file_ref = await knowledge_cache.load(
+                "pdf_upload", [pdf_path], lambda: self.genai_client.files.upload(file=pdf_path)
+            )
             print(f"✅ [System] PDF 上传成功！ID: {self.file_ref.name}", flush=True)
             print(f"💡 [提示] 可设置环境变量以复用: export PDF_FILE_REF='{self.file_ref.name}'", flush=True)
+            self.readiness.mark("pdf", detail=f"上传 {self.file_ref.name}")
             
         except Exception as e:
             print(f"💥 [System] PDF 挂载失败: {e}", flush=True)
+            self.readiness.mark("pdf", ok=False, detail=str(e))
 
     # ========== 关键 1：@ 消息入口（用户 @ agent 时触发）==========
     async def on_channel_mention(self, context: ChannelMessageContext):
@@ -533,7 +655,7 @@ Step 3: 引用 Content 消息 → @bc-ops → 生成执行物料
         处理 @ 消息（用户 @bc-intake 时触发）
         这是主要的消息处理入口！
         """
-        print(f"🔔 [MENTION] on_channel_mention called, role={self.role_type}", flush=True)
+        debug(lambda: f"[MENTION] on_channel_mention called, role={self.role_type}")
         await self._process_channel_message(context)
     
     # ========== 关键 2：普通频道消息入口（不 @ 时触发）==========
@@ -542,10 +664,35 @@ Step 3: 引用 Content 消息 → @bc-ops → 生成执行物料
         处理普通频道消息（不 @ agent 时触发）
         通常不会用到，因为我们要求用户 @ agent
         """
-        print(f"🔔 [POST] on_channel_post called, role={self.role_type}", flush=True)
-        # 普通消息也可以处理，但我们跳过
-        # await self._process_channel_message(context)
-        pass
+        debug(lambda: f"[POST] on_channel_post called, role={self.role_type}")
+        # 多副本时网络按副本 ID（bc-content-2）判断是否 @ 了自己，"@bc-content" 会作为普通消息投递，
+        # 交给 MentionRouter 按逻辑 ID 判断；单实例时普通消息跳过
+        if self.replicas.enabled:
+            await self._process_channel_message(context)
+
+    # ========== 关键 3：话题内回复（控制指令，如"@bc-content 取消"）==========
+    async def on_channel_reply(self, context: ReplyMessageContext):
+        """
+        处理话题内的回复：只响应 @ 当前 Agent 的控制指令，按话题找到对应任务
+        （话题里的普通回复不会触发新的生成；intake 例外，@bc-intake 的回复是在回答追问）
+        """
+        payload = getattr(context.incoming_event, "payload", {}) or {}
+        user_text = (payload.get("content", {}) or {}).get("text", "").strip()
+        if not user_text or is_agent_source(getattr(context, "source_id", None)):
+            return
+        if not self.mention_router.is_for_me(user_text, quoted_text=context.quoted_text):
+            return
+        command = parse_command(user_text, context.quoted_text)
+        if command:
+            # 与频道消息相同的幂等检查：重复投递的"重写"不再触发一次新的生成
+            event_key = self._event_key(context)
+            if not self.processed_events.check_and_add(event_key):
+                print(f"⏭️  [Channel] 重复事件 {event_key}，跳过", flush=True)
+                return
+            await self._handle_command(context, command, thread_id=context.reply_to_id)
+        elif self.role_type == "intake":
+            # intake 的追问在话题里回答：与频道里的 @ 同样处理（按话题归到原来的会话）
+            await self._process_channel_message(context)
     
     # ========== 核心消息处理逻辑 ==========
     async def _process_channel_message(self, context: ChannelMessageContext):
@@ -555,73 +702,324 @@ Step 3: 引用 Content 消息 → @bc-ops → 生成执行物料
         - content：基于 PDF + 膳食规则生成讲书内容
         - ops：生成可执行物料包
         """
-        print(f"🔔 [PROCESS] _process_channel_message called, role={self.role_type}", flush=True)
+        debug(lambda: f"[PROCESS] _process_channel_message called, role={self.role_type}")
         try:
             incoming = getattr(context, "incoming_event", None)
-            print(f"🔔 [DEBUG] incoming={incoming is not None}", flush=True)
-            
             payload = getattr(incoming, "payload", {}) or {}
-            print(f"🔔 [DEBUG] payload={payload}", flush=True)
+            # 调试日志默认关闭（BOOKCLUB_LOG_LEVEL=DEBUG 时按采样输出），不再每条消息都打印完整 payload
+            debug(lambda: f"payload={payload}")
             
             user_text = (payload.get("content", {}) or {}).get("text", "").strip()
-            print(f"🔔 [DEBUG] user_text length={len(user_text)}, text={user_text[:100] if user_text else 'EMPTY'}", flush=True)
+            debug(lambda: f"user_text length={len(user_text)}, text={user_text[:100] if user_text else 'EMPTY'}")
             
             if not user_text:
-                print(f"⚠️ [DEBUG] user_text is empty, returning", flush=True)
+                debug("user_text is empty, returning")
+                return
+
+            # 其他 Agent 发的消息不触发生成（欢迎消息里的 "@bc-content" 只是使用示例）
+            if is_agent_source(getattr(context, "source_id", None)):
                 return
 
+            # 检查消息是否 @ 了当前 Agent：解析 @ 目标并精确匹配（引用内容里的 @ 不算）
+            if not self.mention_router.is_for_me(
+                user_text,
+                mentioned_agent_id=getattr(context, "mentioned_agent_id", None),
+                quoted_text=getattr(context, "quoted_text", None),
+            ):
+                print(f"⏭️  [Channel] 消息未 @ 当前 Agent，跳过", flush=True)
+                return
+
+            # 幂等：同一事件重复投递时直接丢弃，不再触发新的生成
+            event_key = self._event_key(context)
+            if not self.processed_events.check_and_add(event_key):
+                print(f"⏭️  [Channel] 重复事件 {event_key}，跳过", flush=True)
+                return
+
+            # 控制指令（"@bc-content 取消"）不生成内容
+            command = parse_command(user_text, getattr(context, "quoted_text", None))
+            if command:
+                await self._handle_command(context, command)
+                return
+
+            # 任务在后台执行，同时执行的任务数受 JOB_CONCURRENCY 限制，其余排队
+            job = self._submit_job(
+                context, event_key, lambda takeover=False: self._run_job(context, user_text, event_key, takeover)
+            )
+            ahead = self.jobs.queue_position(job)
+            if ahead and not self.replicas.enabled:
+                await self._reply(
+                    self.workspace(), context.channel, incoming.id,
+                    f"⏳ 前面还有 {ahead} 个任务，已排队（回复 \"@{self.mention_router.agent_id} 取消\" 可撤销）",
+                )
+        except Exception as e:
+            print(f"💥 [Channel] 错误: {e}", flush=True)
+
+    def _submit_job(self, context, event_key: str, work, thread_ids=(), takeover: bool = False) -> Job:
+        """
+        登记后台任务：work(takeover) 为实际执行的协程函数
+        多副本时先认领租约，没认领到的副本盯着租约，持有者失联时（有空闲名额的副本）接管重跑
+        """
+        job = Job(event_key, channel=getattr(context, "channel", None) or "", source_id=context.source_id,
+                  thread_ids=(context.incoming_event.id, *thread_ids))
+        if takeover:
+            return self.jobs.submit(job, lambda: work(True))
+
+        async def claim_and_run():
+            if not await self.replicas.claim(event_key):
+                print(f"⏭️  [Replica] 任务 {event_key} 已由其他副本认领", flush=True)
+
+                async def takeover_job():
+                    self._submit_job(context, event_key, work, thread_ids, takeover=True)
+
+                self.replicas.watch(event_key, takeover_job, can_take=self.jobs.has_capacity)
+                return
+            await work(False)
+
+        return self.jobs.submit(job, claim_and_run)
+
+    @staticmethod
+    def _event_key(context) -> str:
+        """
+        消息的全局 ID：网络给每个接收方各发一份通知（事件 ID 各不相同），
+        original_event_id 在各副本上一致，用作去重与租约的键
+        """
+        incoming = context.incoming_event
+        payload = getattr(incoming, "payload", {}) or {}
+        return payload.get("original_event_id") or payload.get("message_id") or incoming.id
+
+    async def _handle_command(self, context, command, thread_id: str = None):
+        """
+        控制指令（按话题找任务；直接在频道里发时取该用户最近的任务 / 该用户在本频道最近的方案）
+        - 取消：停止排队中或执行中的任务
+        - 重写：content 重写某一天，ops 重写某个 Part，结果拼回原方案
+        """
+        action, args = command
+        channel = getattr(context, "channel", None) or ""
+        reply_to = context.incoming_event.id
+        ws = self.workspace()
+
+        if action == "cancel":
+            job = self.jobs.find(thread_id=thread_id, channel=channel, source_id=context.source_id)
+            was_running = job is not None and job.state == "running"
+            if job is None or not self.jobs.cancel(job):
+                # 多副本时任务可能在别的副本上，由持有者回复
+                if not self.replicas.enabled:
+                    await self._reply(ws, channel, reply_to, "ℹ️ 没有找到进行中的任务（可能已经完成）。")
+                return
+            print(f"🛑 [Jobs] 已取消任务 {job.job_id}（{'执行中' if was_running else '排队中'}）", flush=True)
+            if not was_running:
+                # 多副本时每个副本都排着同一个任务，只由写入 cancelled 租约的副本回复
+                if self.replicas.mark_cancelled(job.job_id):
+                    await self._reply(ws, channel, reply_to, "🛑 已取消（任务尚未开始）。")
+                return
+            await asyncio.wait({job.task}, timeout=5)
+            run = job.meta.get("run")
+            saved = [f["name"] for f in run.manifest["files"]] if run is not None else []
+            text = "🛑 已取消任务，剩余部分不再生成。"
+            if saved:
+                text += f"\n已完成的部分保留在 {run.path}（清单状态：cancelled）：\n" + "\n".join(f"  - {n}" for n in saved)
+            await self._reply(ws, channel, reply_to, text)
+            return
+
+        if action == "rewrite":
+            expected = {"content": "day", "ops": "part"}.get(self.role_type)
+            if args["unit"] != expected:
+                if not self.replicas.enabled:
+                    usage = {"day": "重写 Day N", "part": "重写 Part N / 重写 Part N.M"}.get(expected)
+                    await self._reply(ws, channel, reply_to, f"ℹ️ 当前 Agent 支持的重写指令：{usage}" if usage
+                                      else "ℹ️ 当前 Agent 不支持局部重写。")
+                return
+            event_key = self._event_key(context)
+            self._submit_job(
+                context, event_key,
+                lambda takeover=False: self._run_rewrite(context, args, thread_id, event_key),
+                thread_ids=(thread_id,) if thread_id else (),
+            )
+
+    async def _run_rewrite(self, context, args: dict, thread_id: str, event_key: str):
+        """
+        局部重写：基于该话题最新的方案（原任务或之前的修订版），只重新生成指定的天 / Part，
+        写入新的 run（job_id 沿用原任务，便于同一话题继续重写）
+        """
+        channel = getattr(context, "channel", None) or ""
+        reply_to = context.incoming_event.id
+        ws = self.workspace()
+        label = f"Day {args['id']}" if args["unit"] == "day" else f"Part {args['id']}"
+        try:
+            # 话题里回复时按原任务找；直接在频道里发时只找同一频道、同一用户最近的方案
+            if thread_id:
+                source = output_store.find_run(self.role_type, job_id=thread_id)
+            else:
+                source = output_store.find_run(self.role_type, channel=channel, requester=context.source_id)
+            request_path = os.path.join(source["path"], REQUEST_FILE) if source else ""
+            if not os.path.exists(request_path):
+                await self._reply(ws, channel, reply_to, "ℹ️ 没有找到可重写的方案（请在原任务的话题里回复）。")
+                return
+            request = self._read_text(request_path)
+
+            with self.replicas.hold(event_key), self.knowledge.pin(), \
+                    tracer.job(event_key, "rewrite.receive", service=self.service_name, role=self.role_type, unit=label), \
+                    output_store.run(self.role_type, inputs=request, job_id=source.get("job_id"),
+                                     channel=source.get("channel"), requester=source.get("requester")) as run:
+                run.manifest.update(revision_of=source["run_id"], rewrite=label)
+                job = self.jobs.get(event_key)
+                if job is not None:
+                    job.meta["run"] = run
+                await self._reply(ws, channel, reply_to, f"✍️ 正在重写 {label}（其余部分沿用 {source['run_id']}）...")
+
+                if self.role_type == "content":
+                    saved_path = await self._rewrite_day(run, source["path"], request, int(args["id"]), args["note"])
+                else:
+                    saved_path = await self._rewrite_part(run, source["path"], request, args["id"], args["note"])
+                if saved_path is None:
+                    await self._reply(ws, channel, reply_to, f"ℹ️ 方案里没有 {label}，未做修改。")
+                    return
+
+            base_name = os.path.splitext(saved_path)[0]
+            guide = "\n\n" + "━" * 50 + "\n"
+            guide += f"💾 {label} 已重写并拼回完整方案：\n"
+            guide += f"  📄 Markdown: {base_name}.md\n"
+            guide += f"  📘 Word文档: {base_name}.docx\n"
+            guide += f"  📱 微信版: {base_name}_wechat.txt\n"
+            guide += f"（其余部分未重新生成；原方案仍保留在 {source['path']}）"
+            await self._reply(ws, channel, reply_to, f"✅【{label} 重写完成】{guide}")
+        except Exception as e:
+            print(f"💥 [Rewrite] 错误: {e}", flush=True)
+            await self._reply(ws, channel, reply_to, f"💥 {label} 重写失败，原方案未改动：{e}")
+
+    async def _rewrite_day(self, run, source_dir: str, request: str, day: int, note: str = ""):
+        """只为这一天调用 LLM；其余天的三种格式直接硬链接，最后重新合并全文"""
+        total_days = self._total_days(request)
+        if not 1 <= day <= total_days:
+            return None
+        outline_path = os.path.join(source_dir, OUTLINE_FILE)
+        if os.path.exists(outline_path):
+            outline = self._read_text(outline_path)
+        else:
+            outline = extract_outline(self._read_text(os.path.join(source_dir, f"{self.role_type}.md")))
+        run.write_text(REQUEST_FILE, request)
+        run.write_text(OUTLINE_FILE, outline)
+
+        day_contents = {}
+        for other in range(1, total_days + 1):
+            if other == day:
+                continue
+            base = os.path.join(source_dir, f"{self.role_type}_day{other}")
+            if not os.path.exists(f"{base}.md"):
+                continue  # 原任务被取消时可能缺天
+            day_contents[other] = self._read_text(f"{base}.md")
+            for ext in (".md", ".docx", "_wechat.txt"):
+                run.link_file(f"{base}{ext}")
+
+        plan = self._day_plan(request, outline)
+        day_contents[day] = await self.generate_day(plan, day, total_days, note=note, allow_reuse=False)
+        if is_failure(day_contents[day]):
+            raise RuntimeError(day_contents[day])
+        self._save_output(day_contents[day], suffix=f"day{day}", run=run,
+                          meta={"day": day, "total_days": total_days})
+        combined = self._combine_content(outline, total_days, [day_contents[d] for d in sorted(day_contents)])
+        return self._save_output(combined, run=run)
+
+    async def _rewrite_part(self, run, source_dir: str, request: str, number: str, note: str = ""):
+        """只重写物料包中编号对应的小节，按标题定位替换，其余小节原样保留"""
+        document = self._read_text(os.path.join(source_dir, f"{self.role_type}.md"))
+        located = find_section(document, number)
+        if located is None:
+            return None
+        heading = located[2]
+        spec = find_section(OPS_STRUCTURE, number)
+        requirement = OPS_STRUCTURE[spec[0]:spec[1]].strip() if spec else heading
+
+        prompt = f"""
+{request}
+
+【当前任务】只重写物料包中的「{heading}」
+其余部分已经定稿，不要输出；本部分从标题行开始输出，保持原有编号。
+
+【物料包结构】
+{chr(10).join(section_headings(document))}
+
+【本部分要求】
+{requirement}
+"""
+        if note:
+            prompt += f"\n【修改要求】\n{note}\n"
+        with tracer.span("ops.part", part=number):
+            section = await self._execute_reasoning(prompt)
+        if is_failure(section):
+            raise RuntimeError(section)
+        run.write_text(REQUEST_FILE, request)
+        return self._save_output(splice_section(document, number, section), run=run)
+
+    async def _run_job(self, context: ChannelMessageContext, user_text: str, event_key: str, takeover: bool = False):
+        """执行一次 @ 任务（takeover=True 表示接管了失联副本的任务）"""
+        try:
             ws = self.workspace()
             channel = context.channel
-            reply_to = incoming.id
+            reply_to = context.incoming_event.id
             source_id = context.source_id
 
             print(f"🧭 [Channel] role={self.role_type} ch={channel} from={source_id}", flush=True)
             
-            # 检查消息是否 @ 了当前 Agent（关键修复！）
-            agent_mentions = [
-                f"@bc-{self.role_type}",  # @bc-intake, @bc-content, @bc-ops
-                f"@{self.role_type}",      # @intake, @content, @ops
-            ]
-            
-            # 如果消息没有 @ 当前 Agent，忽略
-            if not any(mention in user_text for mention in agent_mentions):
-                print(f"⏭️  [Channel] 消息未 @ 当前 Agent，跳过", flush=True)
-                return
-            
             print(f"✅ [Channel] 消息 @ 了当前 Agent，开始处理", flush=True)
-
-            # intake：收集需求，输出结构化文档
-            if self.role_type == "intake":
-                await ws.channel(channel).reply(reply_to, "✅【INTAKE】已收到。我正在整理需求...")
-
-                intake_out = await self._execute_reasoning(user_text)
+            if takeover:
+                await self._reply(ws, channel, reply_to, f"♻️ 原处理副本已失联，由 {self.replicas.replica_id} 号副本重新生成。")
+
+            # 整个任务一个 trace：根 span 带上 job.id（事件 ID），下游各阶段自动挂为子 span
+            # 本次任务的所有输出写入同一个 run 目录（结束时写入 manifest 并登记索引）
+            with self.replicas.hold(event_key), self.knowledge.pin(), \
+                    tracer.job(event_key, "mention.receive", service=self.service_name, role=self.role_type, channel=str(channel)), \
+                    output_store.run(self.role_type, inputs=user_text, job_id=event_key,
+                                     channel=channel or "", requester=source_id) as run:
+                job = self.jobs.get(event_key)
+                if job is not None:
+                    job.meta["run"] = run
+                # intake：收集需求，输出结构化文档
+                if self.role_type == "intake":
+                    # 多轮会话：表单未填完时只回复追问，填完（或用户说"就这些"）后由表单生成需求单
+                    if intake_sessions.enabled:
+                        intake_out = await self._intake_turn(ws, channel, reply_to, source_id, user_text, event_key,
+                                                             parent_id=getattr(context, "reply_to_id", None))
+                        if intake_out is None:
+                            return
+                    else:
+                        await self._reply(ws, channel, reply_to, "✅【INTAKE】已收到。我正在整理需求...")
+                        intake_out = await self._execute_reasoning(user_text)
                 
-                # 自动保存到文件（三种格式）
-                saved_path = self._save_output(intake_out)
-                base_name = os.path.splitext(os.path.basename(saved_path))[0]
+                    # 自动保存到文件（三种格式）
+                    saved_path = self._save_output(intake_out, run=run)
+                    base_name = os.path.splitext(saved_path)[0]
                 
-                guide = "\n\n" + "━" * 50 + "\n"
-                guide += "💾 已生成多格式输出：\n"
-                guide += f"  📄 Markdown: output/{base_name}.md\n"
-                guide += f"  📘 Word文档: output/{base_name}.docx\n"
-                guide += f"  📱 微信版: output/{base_name}_wechat.txt\n\n"
-                guide += "📋 下一步：打开任一文件，复制内容，@bc-content 并粘贴。"
+                    guide = "\n\n" + "━" * 50 + "\n"
+                    guide += "💾 已生成多格式输出：\n"
+                    guide += f"  📄 Markdown: {base_name}.md\n"
+                    guide += f"  📘 Word文档: {base_name}.docx\n"
+                    guide += f"  📱 微信版: {base_name}_wechat.txt\n\n"
+                    guide += "📋 下一步：打开任一文件，复制内容，@bc-content 并粘贴。"
                 
-                await ws.channel(channel).reply(reply_to, f"🧾【INTAKE 输出】\n{intake_out}{guide}")
-                return
+                    await self._reply(ws, channel, reply_to, f"🧾【INTAKE 输出】\n{intake_out}{guide}")
+                    return
 
-            # content：基于 PDF + 膳食规则生成讲书内容（分天处理）
-            if self.role_type == "content":
-                rules_status = "✅ 膳食规则已加载" if self.rules_content else "⚠️ 膳食规则未加载"
-                pdf_status = "✅ PDF 已挂载" if self.file_ref else "⚠️ PDF 未挂载"
-                nutrition_status = "✅ 营养速查表已加载" if self.nutrition_content else "⚠️ 营养速查表未加载"
+                # content：基于 PDF + 膳食规则生成讲书内容（分天处理）
+                if self.role_type == "content":
+                    rules_status = "✅ 膳食规则已加载" if self.rules_content else "⚠️ 膳食规则未加载"
+                    pdf_state = self.readiness.components.get("pdf", {}).get("state")
+                    if self.pdf_index is not None and self.pdf_index.ready:
+                        pdf_status = f"✅ PDF 本地检索已就绪（{len(self.pdf_index.chunks)} 段，按页码引用）"
+                    elif self.file_ref:
+                        pdf_status = "✅ PDF 已挂载"
+                    elif pdf_state == "pending":
+                        pdf_status = "⏳ PDF 预热中（就绪后自动使用）"
+                    else:
+                        pdf_status = "⚠️ PDF 未挂载"
+                    if self.food_store is not None:
+                        nutrition_status = f"✅ 食物营养库已加载（{len(self.food_store)} 种，按提及附带）"
+                    else:
+                        nutrition_status = "⚠️ 食物营养库未加载"
                 
-                # 从用户输入中提取天数
-                import re
-                days_match = re.search(r'(\d+)\s*天', user_text)
-                total_days = int(days_match.group(1)) if days_match else 3
+                    total_days = self._total_days(user_text)
                 
-                await ws.channel(channel).reply(reply_to, f"""🧠【CONTENT】已接单，开始分天生成逐字稿。
+                    await self._reply(ws, channel, reply_to, f"""🧠【CONTENT】已接单，开始分天生成逐字稿。
 {rules_status}
 {pdf_status}
 {nutrition_status}
@@ -630,8 +1028,187 @@ Step 3: 引用 Content 消息 → @bc-ops → 生成执行物料
 ⏱️ 预计耗时：{total_days * 1} - {total_days * 2} 分钟
 🔄 每天生成完成后会实时更新进度...""")
 
-                # 第一步：生成主题大纲
-                outline_prompt = f"""
+                    # 需求单与大纲单独保存，之后"重写 Day N"只需为那一天调用 LLM
+                    run.write_text(REQUEST_FILE, user_text)
+                    content_out = await self.generate_content(
+                        user_text,
+                        total_days,
+                        notify=lambda text: self._reply(ws, channel, reply_to, text),
+                        on_day=lambda day, text: self._save_output(
+                            text, suffix=f"day{day}", run=run, meta={"day": day, "total_days": total_days}
+                        ),
+                        on_outline=lambda outline: run.write_text(OUTLINE_FILE, outline),
+                    )
+                
+                    # 自动保存到文件（三种格式，内容可能很长！）
+                    saved_path = self._save_output(content_out, run=run)
+                    base_name = os.path.splitext(saved_path)[0]
+                
+                    guide = "\n\n" + "━" * 50 + "\n"
+                    guide += "💾 已生成多格式输出（内容较长）：\n"
+                    guide += f"  📄 Markdown: {base_name}.md\n"
+                    guide += f"  📘 Word文档: {base_name}.docx ← 可直接复制到微信公众号\n"
+                    guide += f"  📱 微信版: {base_name}_wechat.txt ← 朋友圈专用\n\n"
+                    guide += "📋 下一步：打开上述文件（推荐 Word），复制内容，@bc-ops 并粘贴。"
+                
+                    await self._reply(ws, channel, reply_to, f"📄【CONTENT 输出】\n{content_out}{guide}")
+                    return
+            
+                # ops：生成可执行物料包
+                if self.role_type == "ops":
+                    rules_status = "✅ 膳食规则已加载" if self.rules_content else "⚠️ 膳食规则未加载"
+                    await self._reply(ws, channel, reply_to, f"🧩【OPS】已接单。\n{rules_status}\n正在生成完整物料包（可能需要 1-2 分钟）...")
+
+                    run.write_text(REQUEST_FILE, user_text)
+                    ops_out = await self.generate_ops(user_text)
+                
+                    # 自动保存到文件（三种格式）
+                    saved_path = self._save_output(ops_out, run=run)
+                    base_name = os.path.splitext(saved_path)[0]
+                
+                    final_guide = "\n\n" + "━" * 50 + "\n"
+                    final_guide += "💾 已生成多格式输出：\n"
+                    final_guide += f"  📄 Markdown: {base_name}.md\n"
+                    final_guide += f"  📘 Word文档: {base_name}.docx ← 直接在微信编辑器打开\n"
+                    final_guide += f"  📱 微信版: {base_name}_wechat.txt ← 逐条复制到朋友圈\n\n"
+                    final_guide += "✅ 全部完成！打开上述文件夹，根据用途选择格式。\n"
+                    final_guide += "💡 使用建议：\n"
+                    final_guide += "  - 微信公众号：打开 .docx，直接复制到编辑器\n"
+                    final_guide += "  - 朋友圈文案：打开 _wechat.txt，逐条复制\n"
+                    final_guide += "  - 存档/修改：使用 .md 文件"
+                
+                    await self._reply(ws, channel, reply_to, f"📌【OPS 最终版 - 可直接使用的物料包】\n{ops_out}{final_guide}")
+                    return
+
+        except Exception as e:
+            print(f"💥 [Channel] 错误: {e}", flush=True)
+
+    async def _intake_turn(self, ws, channel: str, reply_to, source_id: str, user_text: str, event_key: str,
+                           parent_id: str = None):
+        """
+        intake 会话的一轮：本地解析本轮写下的字段，只把本轮内容 + 当前表单交给模型识别其余字段并追问
+        会话按话题区分：频道里新的 @ 以这条消息为话题根开新会话，话题里的回复（parent_id）沿用所属会话
+
+        Returns:
+            必填字段齐全（或用户说"就这些"）时返回由表单生成的需求单（会话随之结束），否则 None（已回复追问）
+        """
+        if parent_id:
+            key = intake_sessions.resolve(channel, source_id, parent_id)
+        else:
+            key = session_key(channel, source_id, event_key)
+        intake_sessions.link(key, event_key, reply_to)
+        delta = MENTION_RE.sub("", user_text).strip()
+        control = control_word(delta)
+        if control == "reset":
+            intake_sessions.delete(key)
+            await self._reply(ws, channel, reply_to, "🧹 已清空之前填写的需求，请重新告诉我读书会的情况。")
+            return None
+
+        session = intake_sessions.open(key)
+        session["turns"] += 1
+        fields = session["fields"]
+        with tracer.span("intake.turn", turn=session["turns"], delta_chars=len(delta)) as turn_span:
+            fields.update(extract_fields(delta))
+            question = ""
+            if control != "finish" and missing_fields(fields):
+                await self._reply(ws, channel, reply_to, "✅【INTAKE】已收到。我正在整理需求...")
+                reply = await self._execute_reasoning(self._intake_prompt(fields, delta))
+                if is_failure(reply):
+                    intake_sessions.save(session)  # 本地识别出的字段保留，下一轮继续
+                    await self._reply(ws, channel, reply_to, reply)
+                    return None
+                fields.update(extract_fields(reply))
+                question = follow_up(reply)
+            missing = missing_fields(fields)
+            if turn_span:
+                turn_span.set(filled=len(fields), missing=len(missing), llm=bool(question))
+
+        if missing and control != "finish":
+            intake_sessions.save(session)
+            pending = "、".join(missing)
+            await self._reply(ws, channel, reply_to, f"💬【INTAKE 追问】\n{question or f'还需要补充：{pending}'}\n\n"
+                              f"📝 还差：{pending}（在本话题里回复即可，说\"就这些\"可按现有信息生成需求单）")
+            return None
+        intake_sessions.delete(key)
+        return render_request(fields)
+
+    @staticmethod
+    def _intake_prompt(fields: dict, delta: str) -> str:
+        """intake 单轮 prompt：当前表单 + 本轮新内容（不再重复之前几轮的原文）"""
+        return f"""
+【当前需求表单】（之前几轮已收集的信息）
+{format_form(fields)}
+
+【用户本轮新增的内容】
+{delta or "（空）"}
+
+【本轮输出要求】
+需求单由系统根据表单生成，本轮不要输出完整需求单，只按以下格式回复：
+【表单更新】
+- 字段名：值（只列出从本轮内容中识别出的字段，字段名与表单一致；没有则不写）
+【追问】
+针对仍待补充的字段，用温情的语气只追问一个问题，并给出示例。
+"""
+
+    # ========== 生成核心（频道处理与离线批量共用，不依赖网络） ==========
+    @staticmethod
+    def _total_days(user_text: str) -> int:
+        """从用户输入中提取天数（默认 3 天）"""
+        days_match = re.search(r'(\d+)\s*天', user_text)
+        return int(days_match.group(1)) if days_match else 3
+
+    @staticmethod
+    async def _notify(notify, text: str):
+        if notify:
+            await notify(text)
+
+    async def generate_content(self, user_text: str, total_days: int, notify=None, on_day=None,
+                               on_outline=None, strict: bool = False) -> str:
+        """
+        分天生成讲书逐字稿：先出大纲，再逐天生成，最后合并
+
+        Args:
+            user_text: Intake 需求单
+            total_days: 天数
+            notify: 可选的进度回调 async (text) -> None（频道模式下为频道回复）
+            on_day: 可选的单天完成回调 (day, day_content) -> None
+            on_outline: 可选的大纲完成回调 (outline) -> None（保存大纲，供之后局部重写）
+            strict: 大纲或某一天生成失败时抛出 GenerationError（离线批量用于判定失败）；
+                默认把错误提示当作该天内容继续合并（频道模式下用户能看到哪一天失败）
+
+        Returns:
+            合并后的完整 Markdown
+        """
+        # 第一步：生成主题大纲
+        outline_prompt = self._outline_prompt(user_text, total_days)
+        with tracer.span("content.outline", total_days=total_days):
+            outline = await self._execute_reasoning(outline_prompt)
+        if strict and is_failure(outline):
+            raise GenerationError(f"大纲生成失败：{outline[:200]}")
+        if on_outline:
+            on_outline(outline)
+        await self._notify(notify, f"📋 【大纲已生成】\n{outline}\n\n🔄 开始逐天生成详细逐字稿...")
+
+        # 第二步：逐天生成内容（需求摘要与结构化大纲只算一次，每天只带自己的条目）
+        plan = self._day_plan(user_text, outline)
+        day_contents = []
+        for day in range(1, total_days + 1):
+            day_content = await self.generate_day(plan, day, total_days, notify=notify)
+            if strict and is_failure(day_content):
+                raise GenerationError(f"Day {day} 生成失败：{day_content[:200]}")
+            day_contents.append(day_content)
+
+            # 单天结果回调（频道模式下保存单天文件）
+            if on_day:
+                on_day(day, day_content)
+            await self._notify(notify, f"✅ Day {day}/{total_days} 完成！（约 {len(day_content)} 字）")
+
+        return self._combine_content(outline, total_days, day_contents)
+
+    @staticmethod
+    def _outline_prompt(user_text: str, total_days: int) -> str:
+        """主题大纲的 prompt（只要每天一行的主题，不要详细内容）"""
+        return f"""
 {user_text}
 
 请为这个 {total_days} 天的读书会生成【主题大纲】。
@@ -647,35 +1224,59 @@ Day 2：[主题名称] - [一句话描述]
 ...
 Day {total_days}：[主题名称] - [一句话描述 + 销讲专场]
 """
-                outline = await self._execute_reasoning(outline_prompt)
-                await ws.channel(channel).reply(reply_to, f"📋 【大纲已生成】\n{outline}\n\n🔄 开始逐天生成详细逐字稿...")
-                
-                # 第二步：逐天生成内容
-                all_content = [f"# 《你是你吃出来的》{total_days} 天读书会逐字稿\n\n{outline}\n\n---\n"]
-                
-                for day in range(1, total_days + 1):
-                    # 确定第四部分的内容类型
-                    if day == 1:
-                        part4_type = "🌱 产品种草"
-                        part4_desc = "轻描淡写，激发好奇，不要硬推"
-                    elif day == total_days:
-                        part4_type = "🎯 产品差异化 + 销讲"
-                        part4_desc = "对比竞品，强调独特优势，完整销讲：痛点共情→科学解释→用户见证→产品介绍→促单→行动指令"
-                    else:
-                        part4_type = "💬 用户见证"
-                        part4_desc = "真实案例，用户使用产品后的反馈和改变"
-                    
-                    day_prompt = f"""
-{user_text}
 
-【当前任务】生成 Day {day} 的完整逐字稿
+    @staticmethod
+    def _combine_content(outline: str, total_days: int, day_contents) -> str:
+        """合并全文：标题 + 大纲 + 各天逐字稿（分隔线隔开）"""
+        all_content = [f"# 《你是你吃出来的》{total_days} 天读书会逐字稿\n\n{outline}\n\n---\n"]
+        for day_content in day_contents:
+            all_content.append(day_content)
+            all_content.append("\n\n---\n\n")
+        return "\n".join(all_content)
+
+    @staticmethod
+    def _day_plan(user_text: str, outline: str) -> dict:
+        """逐天生成共用的上下文：需求摘要 + 结构化大纲（原大纲文本留作解析不到某天时的兜底）"""
+        return {"brief": summarize_intake(user_text), "entries": parse_outline(outline), "outline": outline}
+
+    @staticmethod
+    def _day_prompt(plan: dict, day: int, total_days: int) -> str:
+        """
+        单天逐字稿的 prompt（第四部分的类型由天的位置决定）
+        只带需求摘要、本天大纲条目和前后两天的主题，不重复完整需求单与整份大纲
+        """
+        # 确定第四部分的内容类型
+        if day == 1:
+            part4_type = "🌱 产品种草"
+            part4_desc = "轻描淡写，激发好奇，不要硬推"
+        elif day == total_days:
+            part4_type = "🎯 产品差异化 + 销讲"
+            part4_desc = "对比竞品，强调独特优势，完整销讲：痛点共情→科学解释→用户见证→产品介绍→促单→行动指令"
+        else:
+            part4_type = "💬 用户见证"
+            part4_desc = "真实案例，用户使用产品后的反馈和改变"
+
+        entry = plan["entries"].get(day)
+        if entry:
+            neighbours = neighbour_context(plan["entries"], day)
+            outline_block = f"【本天主题】\n{format_entry(entry)}\n"
+            if neighbours:
+                outline_block += "\n【前后衔接】（承上启下，不要重复相邻两天的内容）\n" + "\n".join(neighbours) + "\n"
+            title = entry["theme"]
+        else:
+            outline_block = f"【主题大纲参考】\n{plan['outline']}\n"
+            title = "[从大纲中选择对应主题]"
+
+        day_prompt = f"""
+【需求摘要】
+{plan["brief"]}
 
-【主题大纲参考】
-{outline}
+【当前任务】生成 Day {day} 的完整逐字稿
 
+{outline_block}
 【输出结构 - 严格遵守】
 
-# Day {day}：[从大纲中选择对应主题]
+# Day {day}：{title}
 
 ## 2.1 书中精华（15分钟逐字稿，约 1500 字）
 - 像老师讲课一样，有开场白、过渡句
@@ -706,136 +1307,65 @@ Day {total_days}：[主题名称] - [一句话描述 + 销讲专场]
 - 涉及医学逻辑/原理时 → 优先检索 PDF
 - 涉及定量标准时 → 必须核对膳食指南（鸡蛋≤1个/天，盐<5g/天等）
 """
-                    
-                    await ws.channel(channel).reply(reply_to, f"⏳ 正在生成 Day {day}/{total_days}...")
-                    day_content = await self._execute_reasoning(day_prompt)
-                    all_content.append(day_content)
-                    all_content.append("\n\n---\n\n")
-                    
-                    # 保存单天文件
-                    self._save_output(day_content, suffix=f"day{day}")
-                    await ws.channel(channel).reply(reply_to, f"✅ Day {day}/{total_days} 完成！（约 {len(day_content)} 字）")
-                
-                # 合并完整内容
-                content_out = "\n".join(all_content)
-                
-                # 自动保存到文件（三种格式，内容可能很长！）
-                saved_path = self._save_output(content_out)
-                base_name = os.path.splitext(os.path.basename(saved_path))[0]
-                
-                guide = "\n\n" + "━" * 50 + "\n"
-                guide += "💾 已生成多格式输出（内容较长）：\n"
-                guide += f"  📄 Markdown: output/{base_name}.md\n"
-                guide += f"  📘 Word文档: output/{base_name}.docx ← 可直接复制到微信公众号\n"
-                guide += f"  📱 微信版: output/{base_name}_wechat.txt ← 朋友圈专用\n\n"
-                guide += "📋 下一步：打开上述文件（推荐 Word），复制内容，@bc-ops 并粘贴。"
-                
-                await ws.channel(channel).reply(reply_to, f"📄【CONTENT 输出】\n{content_out}{guide}")
-                return
-            
-            # ops：生成可执行物料包
-            if self.role_type == "ops":
-                rules_status = "✅ 膳食规则已加载" if self.rules_content else "⚠️ 膳食规则未加载"
-                await ws.channel(channel).reply(reply_to, f"🧩【OPS】已接单。\n{rules_status}\n正在生成完整物料包（可能需要 1-2 分钟）...")
+        return day_prompt
+
+    async def generate_day(self, plan: dict, day: int, total_days: int, notify=None,
+                           note: str = "", allow_reuse: bool = True) -> str:
+        """
+        生成单天逐字稿（整套生成与"重写 Day N"共用）
+
+        Args:
+            plan: _day_plan() 的结果（需求摘要 + 结构化大纲）
+            note: 附加修改要求（重写时由用户给出）
+            allow_reuse: 是否允许直接复用历史逐字稿（重写时为 False，只作参考稿）
+        """
+        day_prompt = self._day_prompt(plan, day, total_days)
+        if note:
+            day_prompt += f"\n【修改要求】\n{note}\n"
+
+        # 历史上生成过相同 / 相近主题时：直接复用，或作为参考稿改写
+        topic = outline_topic(plan["entries"], day, fallback=plan["outline"])
+        prior = generation_index.closest_day_script(topic, day, total_days)
+        if prior and not allow_reuse:
+            prior = {**prior, "mode": "seed"}
+        if prior and prior["mode"] == "seed":
+            day_prompt += f"""
+【参考稿 - 历史相近主题逐字稿（主题相似度 {prior['similarity']:.0%}）】
+请在这份逐字稿的基础上改写：保留结构和可用的书中引用（页码），
+按本次主理人、目标人群、产品信息和本天第四部分的要求调整，不要照抄。
+
+{prior['body']}
+"""
 
-                # 强制要求输出完整物料包结构
-                ops_prompt = f"""
+        with tracer.span("content.day", day=day, total_days=total_days,
+                         reuse=prior["mode"] if prior else "none") as day_span:
+            if prior and prior["mode"] == "reuse":
+                await self._notify(
+                    notify, f"♻️ Day {day}/{total_days} 复用历史逐字稿（主题相似度 {prior['similarity']:.0%}）"
+                )
+                day_content = re.sub(r"^#\s*Day\s*\d+", f"# Day {day}", prior["body"], count=1, flags=re.M)
+            else:
+                await self._notify(notify, f"⏳ 正在生成 Day {day}/{total_days}...")
+                day_content = await self._execute_reasoning(day_prompt, retrieval_query=topic)
+            if day_span:
+                day_span.set(output_chars=len(day_content))
+        return day_content
+
+    async def generate_ops(self, user_text: str) -> str:
+        """生成完整执行物料包（Part 3-7）"""
+        return await self._execute_reasoning(self._ops_prompt(user_text))
+
+    @staticmethod
+    def _ops_prompt(user_text: str) -> str:
+        """物料包的 prompt（强制要求输出完整物料包结构）"""
+        return f"""
 {user_text}
 
 【强制输出要求 - 必须严格遵守】
 
 请输出完整的执行物料包，包含以下 5 个 Part：
 
-# Part 3：时间轴与 SOP（约 1000 字）
-
-## 3.1 总体时间线
-| 阶段 | 时间 | 主要任务 |
-|------|------|----------|
-| 招募期 | D-7 至 D-1（7天） | ... |
-| 交付期 | D1 至 D3（3天） | ... |
-| 结营 | D3 下午 | ... |
-
-## 3.2 招募期详细 SOP（7天）
-| 日期 | 时间 | 动作 | 内容要点 |
-|------|------|------|----------|
-| D-7 | 08:00 | 朋友圈1 | ... |
-...
-
-## 3.3 交付期详细 SOP（3天）
-...
-
-# Part 4：招募期文案（21条，约 4000 字）
-
-## 4.1 朋友圈文案（17条）
-
-### D-7 第1条（预告）
----
-[完整文案，可直接复制使用]
----
-
-### D-7 第2条（痛点共鸣）
----
-[完整文案]
----
-
-... [继续写完 17 条]
-
-## 4.2 公众号推文（2篇）
-[完整标题+开头段落]
-
-## 4.3 短视频脚本（7条）
-[每条包含：画面描述+口播文案]
-
-# Part 5：交付期文案（约 2000 字）
-
-## 5.1 开营文案
-[完整的欢迎语、群规、福利说明]
-
-## 5.2 每日运营文案
-### Day 1
-- 早安问候：[完整文案]
-- 作业引导：[完整文案]
-- 晚安总结：[完整文案]
-
-### Day 2
-...
-
-### Day 3
-...
-
-## 5.3 结营文案
-[感谢语、成果回顾、销讲引导]
-
-# Part 6：资源清单（约 500 字）
-
-## 6.1 需要准备的图片素材
-- [ ] 海报 x 3
-- [ ] 产品图 x 5
-...
-
-## 6.2 需要准备的文档
-...
-
-## 6.3 时间投入估算
-...
-
-# Part 7：销讲资源包（约 1500 字）
-
-## 7.1 销讲逐字稿
-[完整的 10 分钟销讲脚本：痛点共情 → 科学解释 → 用户见证 → 产品介绍 → 促单 → 行动指令]
-
-## 7.2 异议处理话术（5个）
-| 常见异议 | 回应话术 |
-|----------|----------|
-| "太贵了" | ... |
-...
-
-## 7.3 接龙模板
-[可直接复制的接龙格式]
-
-## 7.4 成交后服务模板
-[感谢语、使用指南、售后承诺]
-
+{OPS_STRUCTURE}
 【总字数要求】
 - 总计至少 9000 字
 - 每条文案必须是完整可用的，不是占位符
@@ -845,35 +1375,19 @@ Day {total_days}：[主题名称] - [一句话描述 + 销讲专场]
 - 所有营养数据符合膳食指南
 - 文案可直接复制使用，无需二次编辑
 """
-                ops_out = await self._execute_reasoning(ops_prompt)
-                
-                # 自动保存到文件（三种格式）
-                saved_path = self._save_output(ops_out)
-                base_name = os.path.splitext(os.path.basename(saved_path))[0]
-                
-                final_guide = "\n\n" + "━" * 50 + "\n"
-                final_guide += "💾 已生成多格式输出：\n"
-                final_guide += f"  📄 Markdown: output/{base_name}.md\n"
-                final_guide += f"  📘 Word文档: output/{base_name}.docx ← 直接在微信编辑器打开\n"
-                final_guide += f"  📱 微信版: output/{base_name}_wechat.txt ← 逐条复制到朋友圈\n\n"
-                final_guide += "✅ 全部完成！打开 output/ 文件夹，根据用途选择格式。\n"
-                final_guide += "💡 使用建议：\n"
-                final_guide += "  - 微信公众号：打开 .docx，直接复制到编辑器\n"
-                final_guide += "  - 朋友圈文案：打开 _wechat.txt，逐条复制\n"
-                final_guide += "  - 存档/修改：使用 .md 文件"
-                
-                await ws.channel(channel).reply(reply_to, f"📌【OPS 最终版 - 可直接使用的物料包】\n{ops_out}{final_guide}")
-                return
 
-        except Exception as e:
-            print(f"💥 [Channel] 错误: {e}", flush=True)
+    async def _reply(self, ws, channel: str, reply_to, text: str):
+        """频道回复（每条回复一个 span，便于看出回复本身是否在关键路径上）"""
+        with tracer.span("channel.reply", channel=str(channel), chars=len(text)):
+            await ws.channel(channel).reply(reply_to, text)
 
     # ========== 推理（增强版：包含膳食规则约束） ==========
-    async def _execute_reasoning(self, user_text: str) -> str:
+    async def _execute_reasoning(self, user_text: str, retrieval_query: str = None) -> str:
         """
         执行 AI 推理
         - 自动注入膳食规则（如果已加载）
-        - content 角色附带 PDF 知识库 + 营养速查表
+        - content 角色附带 PDF 知识库 + 本次提到的食物的营养数据
+        - 有本地 PDF 索引时，只放入与 retrieval_query 最相关的段落（含页码）
         
         【数据调用优先级】
         - 涉及具体克数（g/ml）时 → 优先检索 nutrition_reference.md
@@ -883,6 +1397,13 @@ Day {total_days}：[主题名称] - [一句话描述 + 销讲专场]
         if not self.genai_client:
             return "❌ API Key 缺失（GOOGLE_API_KEY）。"
 
+        # 只有依赖知识库的生成才等待预热（intake 不受影响）
+        if self.role_type in ("content", "ops"):
+            await self.readiness.wait("rules", timeout=5)
+        if self.role_type == "content":
+            await self.readiness.wait("nutrition", timeout=5)
+            await self.readiness.wait("pdf", timeout=PDF_READY_TIMEOUT)
+
         try:
             # 构建 prompt
             prompt_parts = [self.instruction]
@@ -904,23 +1425,40 @@ Day {total_days}：[主题名称] - [一句话描述 + 销讲专场]
 """
                 prompt_parts.append(rules_prompt)
             
-            # 注入营养速查表（content 角色）
-            if self.nutrition_content and self.role_type == "content":
-                nutrition_prompt = f"""
-【食物营养速查表 - 用于精确数据引用】
+            # 书中相关段落（content 角色，本地检索）
+            use_passages = self.role_type == "content" and self.pdf_index is not None and self.pdf_index.ready
+            passages = self.pdf_index.search(retrieval_query or user_text, k=PDF_TOP_K) if use_passages else []
+            passages_text = format_passages(passages) if passages else ""
+
+            # 注入营养数据（content 角色）：只附带本次大纲 / 主题 / 段落里提到的食物
+            if self.food_store is not None and self.role_type == "content":
+                mention_text = "\n".join(filter(None, (user_text, retrieval_query, passages_text)))
+                foods = self.food_store.extract(mention_text, limit=NUTRITION_MAX_FOODS)
+                if foods:
+                    nutrition_prompt = f"""
+【食物营养速查表 - 本次相关食物（{len(foods)} 种）】
 当你需要引用具体的营养数据（如"100g 鸡蛋含蛋白质 12.7g"）时，请使用以下数据：
 
-{self.nutrition_content}
+{self.food_store.table(foods)}
+"""
+                    prompt_parts.append(nutrition_prompt)
+
+            if passages_text:
+                passages_prompt = f"""
+【书中相关段落 - 《你是你吃出来的》原文摘录（含页码）】
+引用书中原话时，只能引用以下段落，并标注对应页码（如：PDF P22）：
+
+{passages_text}
 """
-                prompt_parts.append(nutrition_prompt)
+                prompt_parts.append(passages_prompt)
             
             prompt_parts.append(f"\n当前任务内容：{user_text}")
             prompt_content = "\n".join(prompt_parts)
             
             contents = [prompt_content]
 
-            # content 角色可附带 PDF
-            if self.role_type == "content" and self.file_ref:
+            # content 角色可附带 PDF（仅在没有本地索引时）
+            if self.role_type == "content" and self.file_ref and not use_passages:
                 contents = [self.file_ref, prompt_content]
 
             # 根据角色设置不同的输出长度
@@ -930,14 +1468,31 @@ Day {total_days}：[主题名称] - [一句话描述 + 销讲专场]
             else:
                 max_tokens = 2048  # intake 只需要简短输出
             
-            resp = self.genai_client.models.generate_content(
+            with tracer.span(
+                "llm.generate",
                 model=self.model_name,
-                contents=contents,
-                config={
-                    "max_output_tokens": max_tokens,
-                    "temperature": 0.7,  # 适度创意
-                }
-            )
-            return resp.text if resp and getattr(resp, "text", None) else "⚠️ 无回复。"
+                role=self.role_type,
+                prompt_chars=len(prompt_content),
+                max_output_tokens=max_tokens,
+            ) as llm_span:
+                resp = await self.llm.generate(
+                    contents,
+                    config={
+                        "max_output_tokens": max_tokens,
+                        "temperature": 0.7,  # 适度创意
+                    }
+                )
+                text = resp.text if resp and getattr(resp, "text", None) else ""
+                if llm_span:
+                    usage = getattr(resp, "usage_metadata", None)
+                    candidates = getattr(resp, "candidates", None) or []
+                    finish_reason = getattr(candidates[0], "finish_reason", None) if candidates else None
+                    llm_span.set(
+                        output_chars=len(text),
+                        prompt_tokens=getattr(usage, "prompt_token_count", None) or 0,
+                        output_tokens=getattr(usage, "candidates_token_count", None) or 0,
+                        finish_reason=str(getattr(finish_reason, "name", finish_reason) or ""),
+                    )
+            return text or "⚠️ 无回复。"
         except Exception as e:
             return f"❌ 引擎报错: {str(e)}"
@@ -7,22 +7,27 @@
 """
 
 import os
-import datetime
-import google.generativeai as genai
-from google.generativeai import caching # 统一使用这个库进行缓存管理
-from dotenv import load_dotenv
 
-load_dotenv()
+class CacheManager:
+    def __init__(self):
+        self._genai = None
 
-# 配置全局 API KEY
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+    def _client(self):
+        """首次使用时才导入 google.generativeai 并配置 API KEY（不再在 import 时执行）"""
+        if self._genai is None:
+            import google.generativeai as genai
+            genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+            self._genai = genai
+        return self._genai
 
-class CacheManager:
     def create_or_get_cache(self, file_path, cache_name):
         """
         核心逻辑：检查是否存在同名缓存，若无则上传并创建。
         支撑 Pack 2 的内容产出。
         """
+        genai = self._client()
+        from google.generativeai import caching # 统一使用这个库进行缓存管理
+
         # 1. 逻辑检查：列出所有现有缓存并查找匹配项
         for c in caching.CachedContent.list():
             if c.display_name == cache_name:
@@ -0,0 +1,22 @@
+"""
+环境变量加载
+
+原先各模块在 import 时各自调用 load_dotenv()，加载时机取决于导入顺序。
+现在由 src/__init__.py 在包导入时统一调用 ensure_env()（只加载一次），
+之后各模块在 import 时读取的配置常量（PDF_TOP_K、OUTPUT_DIR、REPLICA_* 等）都能看到 .env 中的值。
+"""
+
+_loaded = False
+
+
+def ensure_env():
+    """加载 .env（幂等；未安装 python-dotenv 时只使用进程环境变量）"""
+    global _loaded
+    if _loaded:
+        return
+    _loaded = True
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
+    load_dotenv()
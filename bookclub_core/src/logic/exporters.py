@@ -0,0 +1,287 @@
+"""
+多格式导出 - Markdown → Word / 微信纯文本
+
+模块：exporters.py
+描述：原 BookClubAgent._markdown_to_docx / _markdown_to_wechat，抽成模块级纯函数，
+      供 Agent 保存输出、批量生成（进程池渲染）共用。
+
+核心功能：
+    1. markdown_to_docx：Word 文档（微软雅黑，标题/列表/表格，微信公众号编辑器友好；
+       默认流式写出，见 docx_stream.py，python-docx 作为备选后端）
+    2. markdown_to_wechat：微信友好纯文本（朋友圈逐条复制）
+    3. render_outputs：一次写出 .md / .docx / _wechat.txt 三种格式（可在子进程中执行）
+"""
+
+import importlib.util
+import io
+import os
+import re
+import time
+from typing import Dict, Iterator, List, Tuple
+
+# Word 后端：stream = 流式写出 OOXML（默认，仅标准库）；python-docx = 内存中构建后保存
+DOCX_BACKEND = os.getenv("DOCX_BACKEND", "stream").strip().lower()
+
+# python-docx 只探测是否安装，真正导入推迟到第一次生成 Word 时（加快启动）
+PYTHON_DOCX_INSTALLED = importlib.util.find_spec("docx") is not None
+DOCX_AVAILABLE = DOCX_BACKEND != "python-docx" or PYTHON_DOCX_INSTALLED
+
+FORMATS = ("md", "docx", "wechat")
+
+
+def iter_markdown_blocks(markdown_text: str) -> Iterator[Tuple]:
+    """
+    按行解析 Markdown，逐块产出（两个 Word 后端共用，解析规则保持一致）：
+    ("heading", level, text) / ("bullet", text) / ("number", text) /
+    ("table", rows) / ("divider",) / ("paragraph", text)
+
+    逐行读取，不预先切分整篇文档；只有当前表格的行会被缓存
+    """
+    table_lines: List[str] = []
+
+    def _flush_table():
+        # 过滤掉分隔行 (|---|---|)，去掉首尾空元素
+        rows = [
+            [c.strip() for c in tl.split('|')[1:-1]]
+            for tl in table_lines if not re.match(r'^\|[\s\-:]+\|', tl)
+        ]
+        table_lines.clear()
+        return ("table", rows) if rows else None
+
+    for raw in io.StringIO(markdown_text):
+        line = raw.rstrip()
+
+        # 表格：收集连续的表格行（首行须顶格以 | 开头）
+        if table_lines:
+            if line.strip().startswith('|'):
+                table_lines.append(line.strip())
+                continue
+            table = _flush_table()
+            if table:
+                yield table
+
+        # 跳过空行
+        if not line:
+            continue
+
+        if line.startswith('# ') and not line.startswith('## '):
+            yield ("heading", 1, line[2:].strip())
+        elif line.startswith('## ') and not line.startswith('### '):
+            yield ("heading", 2, line[3:].strip())
+        elif line.startswith('### '):
+            yield ("heading", 3, line[4:].strip())
+        # 列表项 (- 或 * 开头)，去掉 **粗体** 标记
+        elif line.startswith('- ') or line.startswith('* '):
+            yield ("bullet", re.sub(r'\*\*(.*?)\*\*', r'\1', line[2:].strip()))
+        # 数字列表 (1. 开头)
+        elif re.match(r'^\d+\.\s', line):
+            text = re.sub(r'^\d+\.\s', '', line).strip()
+            yield ("number", re.sub(r'\*\*(.*?)\*\*', r'\1', text))
+        elif line.startswith('|'):
+            table_lines.append(line.strip())
+        elif re.match(r'^[\-=─]{3,}$', line):
+            yield ("divider",)
+        else:
+            yield ("paragraph", line)
+
+    if table_lines:
+        table = _flush_table()
+        if table:
+            yield table
+
+
+def markdown_to_docx(markdown_text: str, output_path: str):
+    """
+    将 Markdown 转换为 Word 文档（微信公众号编辑器友好）
+
+    支持：
+    - # 标题（一级到三级）
+    - **粗体**
+    - - 列表 / 1. 编号列表
+    - | 表格 |
+    - 分隔线
+
+    默认使用流式写出（docx_stream，内存恒定、不依赖 python-docx）；
+    DOCX_BACKEND=python-docx 时使用 python-docx，流式写出失败时也自动回退到它（已安装时）
+    """
+    if DOCX_BACKEND != "python-docx":
+        from src.logic.docx_stream import write_docx
+
+        try:
+            write_docx(iter_markdown_blocks(markdown_text), output_path)
+            return
+        except Exception as e:
+            if not PYTHON_DOCX_INSTALLED:
+                raise
+            print(f"⚠️ [Export] 流式 Word 写出失败（{e}），回退到 python-docx", flush=True)
+    _markdown_to_docx_python_docx(markdown_text, output_path)
+
+
+def _markdown_to_docx_python_docx(markdown_text: str, output_path: str):
+    """python-docx 后端：整篇文档在内存中构建对象树后保存"""
+    from docx import Document
+    from docx.shared import Pt
+
+    doc = Document()
+
+    # 设置默认字体（微软雅黑，微信编辑器友好）
+    style = doc.styles['Normal']
+    style.font.name = '微软雅黑'
+    style.font.size = Pt(12)
+
+    for block in iter_markdown_blocks(markdown_text):
+        kind = block[0]
+        if kind == "heading":
+            _, level, text = block
+            p = doc.add_heading(text, level=level)
+            p.runs[0].font.name = '微软雅黑'
+            if level == 1:
+                p.runs[0].font.bold = True
+        elif kind == "bullet":
+            doc.add_paragraph(block[1], style='List Bullet')
+        elif kind == "number":
+            doc.add_paragraph(block[1], style='List Number')
+        elif kind == "table":
+            rows = block[1]
+            table = doc.add_table(rows=len(rows), cols=len(rows[0]))
+            table.style = 'Light Grid Accent 1'
+            for row_idx, row_data in enumerate(rows):
+                for col_idx, cell_text in enumerate(row_data[:len(rows[0])]):
+                    table.rows[row_idx].cells[col_idx].text = cell_text
+        elif kind == "divider":
+            doc.add_paragraph('─' * 30)
+        else:
+            # 处理粗体和内联格式
+            p = doc.add_paragraph()
+            _add_formatted_text(p, block[1])
+
+    # 保存文档
+    doc.save(output_path)
+
+
+def _add_formatted_text(paragraph, text):
+    """
+    在段落中添加格式化文本（支持 **粗体**）
+    """
+    # 简单的粗体处理
+    parts = re.split(r'(\*\*.*?\*\*)', text)
+
+    for part in parts:
+        if part.startswith('**') and part.endswith('**'):
+            run = paragraph.add_run(part[2:-2])
+            run.bold = True
+        else:
+            paragraph.add_run(part)
+
+
+def markdown_to_wechat(markdown_text: str) -> str:
+    """
+    将 Markdown 转换为微信友好的纯文本
+
+    转换规则：
+    - # 标题 → 📌【标题】（加粗用emoji）
+    - ## 标题 → ▸ 标题
+    - **粗体** → 【粗体】
+    - - 列表 → · 列表
+    - 表格 → 保留简单格式
+    - 代码块 → 移除
+    """
+    lines = markdown_text.split('\n')
+    result = []
+
+    in_code_block = False
+
+    for line in lines:
+        # 跳过代码块
+        if line.startswith('```'):
+            in_code_block = not in_code_block
+            continue
+        if in_code_block:
+            continue
+
+        # 一级标题
+        if line.startswith('# ') and not line.startswith('## '):
+            text = line[2:].strip()
+            result.append(f"\n━━━━━━━━━━━━━━━━")
+            result.append(f"📌【{text}】")
+            result.append("━━━━━━━━━━━━━━━━\n")
+
+        # 二级标题
+        elif line.startswith('## ') and not line.startswith('### '):
+            text = line[3:].strip()
+            result.append(f"\n▸ {text}")
+
+        # 三级标题
+        elif line.startswith('### '):
+            text = line[4:].strip()
+            result.append(f"\n» {text}")
+
+        # 列表
+        elif line.startswith('- ') or line.startswith('* '):
+            text = line[2:].strip()
+            # 转换粗体
+            text = re.sub(r'\*\*(.*?)\*\*', r'【\1】', text)
+            result.append(f"  · {text}")
+
+        # 数字列表
+        elif re.match(r'^\d+\.\s', line):
+            text = re.sub(r'^\d+\.\s', '', line).strip()
+            text = re.sub(r'\*\*(.*?)\*\*', r'【\1】', text)
+            result.append(f"  {text}")
+
+        # 分隔线
+        elif re.match(r'^[\-=─]{3,}$', line):
+            result.append("\n──────────────────────────────\n")
+
+        # 表格行（保持原样，或简化）
+        elif line.startswith('|'):
+            # 跳过分隔行
+            if not re.match(r'^\|[\s\-:]+\|', line):
+                result.append(line)
+
+        # 普通文本
+        else:
+            # 转换粗体
+            text = re.sub(r'\*\*(.*?)\*\*', r'【\1】', line)
+            if text.strip():
+                result.append(text)
+
+    return '\n'.join(result)
+
+
+def render_outputs(content: str, base_path: str, formats=FORMATS) -> List[Dict]:
+    """
+    写出三种格式：{base_path}.md / {base_path}.docx / {base_path}_wechat.txt
+    （formats 可只选其中几种，如 ("md", "wechat")）
+
+    纯函数、参数可 pickle，适合放进 ProcessPoolExecutor（Word 渲染是 CPU 密集的）
+
+    Returns:
+        [{"file", "bytes", "seconds"}]（失败的格式带 "error"）
+    """
+    os.makedirs(os.path.dirname(base_path) or ".", exist_ok=True)
+    results = []
+
+    def _write_text(path, text):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    steps = []
+    if "md" in formats:
+        steps.append((f"{base_path}.md", lambda path: _write_text(path, content)))
+    if "docx" in formats and DOCX_AVAILABLE:
+        steps.append((f"{base_path}.docx", lambda path: markdown_to_docx(content, path)))
+    if "wechat" in formats:
+        steps.append((f"{base_path}_wechat.txt", lambda path: _write_text(path, markdown_to_wechat(content))))
+
+    for path, write in steps:
+        start = time.perf_counter()
+        entry = {"file": path}
+        try:
+            write(path)
+            entry["bytes"] = os.path.getsize(path)
+        except Exception as e:
+            entry["error"] = str(e)
+        entry["seconds"] = round(time.perf_counter() - start, 4)
+        results.append(entry)
+    return results
@@ -0,0 +1,235 @@
+"""
+历史生成全文索引 - 复用相同主题的逐字稿
+
+模块：generation_index.py
+描述：把所有生成过的 Markdown（intake / content 单天 / ops）写入 SQLite FTS5 索引，
+      带角色 / 第几天 / 主题等元数据。_save_output 每保存一份就增量写入一条，
+      开启复用时（REUSE_PRIOR_SCRIPTS=seed / reuse），content 逐天生成前先查"主题最接近的历史单天逐字稿"：
+        - 主题几乎相同且位置一致（首日种草 / 中间见证 / 末日销讲）→ 直接复用
+        - 主题相近 → 作为参考稿放进 prompt，改写而不是从零写 3500 字
+      默认关闭：参考稿整篇（约 3500 字）追加到每天的 prompt 里，token 明显增加，
+      且稿中其他读书会的主理人 / 产品可能被带进新方案。
+      只有带天数元数据的单天文件（content_dayN）才作为单天逐字稿入索引；
+      合并全文也以 "# Day 1：" 开头，不按标题推断天数。
+
+分词与 PDF 检索一致（中文 bigram + 英文单词，见 pdf_index.tokenize），
+预先切好词再交给 FTS5，不依赖 SQLite 的中文分词扩展。
+
+索引文件：output/.index/generations.sqlite
+补建历史索引：python scripts/generations.py backfill
+
+环境变量：
+    REUSE_PRIOR_SCRIPTS=off      off = 不查询（默认）；seed = 只作参考稿；reuse = 允许直接复用
+    REUSE_SEED_THRESHOLD=0.35    主题相似度 ≥ 该值时作为参考稿
+    REUSE_DIRECT_THRESHOLD=0.85  主题相似度 ≥ 该值（且位置一致）时直接复用
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+from src.logic.output_store import OUTPUT_ROOT
+from src.logic.pdf_index import tokenize
+
+INDEX_PATH = os.path.join(OUTPUT_ROOT, ".index", "generations.sqlite")
+
+REUSE_MODE = os.getenv("REUSE_PRIOR_SCRIPTS", "off")
+REUSE_SEED_THRESHOLD = float(os.getenv("REUSE_SEED_THRESHOLD", "0.35"))
+REUSE_DIRECT_THRESHOLD = float(os.getenv("REUSE_DIRECT_THRESHOLD", "0.85"))
+
+_DAY_HEADING_RE = re.compile(r"^#\s*Day\s*(\d+)\s*[：:]\s*(.+)$", re.M)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS generations (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE,
+    sha256 TEXT,
+    role TEXT,
+    day INTEGER,
+    total_days INTEGER,
+    position TEXT,
+    topic TEXT,
+    run_id TEXT,
+    created_at REAL,
+    chars INTEGER,
+    body TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_generations_role_day ON generations(role, day);
+CREATE VIRTUAL TABLE IF NOT EXISTS generations_fts USING fts5(topic_tokens, body_tokens);
+"""
+
+
+def day_position(day: Optional[int], total_days: Optional[int]) -> Optional[str]:
+    """第四部分的类型由天的位置决定：首日种草 / 中间见证 / 末日销讲"""
+    if not day or not total_days:
+        return None
+    if day == total_days:
+        return "last"
+    return "first" if day == 1 else "middle"
+
+
+def parse_day_heading(text: str):
+    """从 "# Day 2：主题" 标题中取出 (day, topic)"""
+    match = _DAY_HEADING_RE.search(text)
+    if not match:
+        return None, None
+    return int(match.group(1)), match.group(2).strip()
+
+
+def clean_topic(topic: str) -> str:
+    """去掉大纲行里的方括号和 " - 一句话描述"，只保留主题名"""
+    topic = topic.replace("[", "").replace("]", "").strip()
+    return re.split(r"\s+[-—–]+\s+", topic, maxsplit=1)[0].strip()
+
+
+def topic_similarity(a: str, b: str) -> float:
+    """主题 bigram 集合的 Jaccard 相似度"""
+    ta, tb = set(tokenize(clean_topic(a))), set(tokenize(clean_topic(b)))
+    if not ta or not tb:
+        return 0.0
+    return len(ta & tb) / len(ta | tb)
+
+
+class GenerationIndex:
+    def __init__(self, path: str = INDEX_PATH):
+        self.path = path
+        self._available: Optional[bool] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if self._available is False:
+            return None
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10)
+            if self._available is None:
+                with self._lock:
+                    conn.execute("PRAGMA journal_mode=WAL")  # 三个 Agent 进程同时读写
+                    conn.executescript(_SCHEMA)
+                    self._available = True
+            return conn
+        except sqlite3.Error as e:
+            print(f"⚠️ [GenIndex] 历史索引不可用（{e}），跳过复用", flush=True)
+            self._available = False
+            return None
+
+    # ---------- 写入 ----------
+    def add(self, path: str, text: str, role: str, day: Optional[int] = None,
+            total_days: Optional[int] = None, topic: Optional[str] = None,
+            run_id: Optional[str] = None) -> bool:
+        """
+        增量写入一份生成结果（同一路径内容未变时跳过）
+
+        Returns:
+            True 表示有写入
+        """
+        conn = self._connect()
+        if conn is None:
+            return False
+        # 主题取自单天文件的 "# Day N：主题" 标题；没有天数元数据的文件（如合并全文）不算单天逐字稿
+        heading_day, heading_topic = parse_day_heading(text) if day else (None, None)
+        topic = topic or (heading_topic if heading_day == day else None) or ""
+        sha = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        try:
+            with conn:
+                row = conn.execute("SELECT id, sha256 FROM generations WHERE path = ?", (path,)).fetchone()
+                if row and row[1] == sha:
+                    return False
+                if row:
+                    conn.execute("DELETE FROM generations WHERE id = ?", (row[0],))
+                    conn.execute("DELETE FROM generations_fts WHERE rowid = ?", (row[0],))
+                cur = conn.execute(
+                    "INSERT INTO generations (path, sha256, role, day, total_days, position, topic, run_id,"
+                    " created_at, chars, body) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (path, sha, role, day, total_days, day_position(day, total_days), topic, run_id,
+                     time.time(), len(text), text),
+                )
+                conn.execute(
+                    "INSERT INTO generations_fts (rowid, topic_tokens, body_tokens) VALUES (?, ?, ?)",
+                    (cur.lastrowid, " ".join(tokenize(topic)), " ".join(tokenize(text))),
+                )
+            return True
+        except sqlite3.Error as e:
+            print(f"⚠️ [GenIndex] 写入失败: {e}", flush=True)
+            return False
+        finally:
+            conn.close()
+
+    # ---------- 查询 ----------
+    def search(self, query: str, role: Optional[str] = None, k: int = 10, days_only: bool = False) -> List[Dict]:
+        """FTS5 BM25 检索（主题列权重更高），返回元数据 + 正文"""
+        conn = self._connect()
+        terms = sorted(set(tokenize(query)))
+        if conn is None or not terms:
+            return []
+        match = " OR ".join(f'"{t}"' for t in terms)
+        sql = (
+            "SELECT g.id, g.path, g.role, g.day, g.total_days, g.position, g.topic, g.run_id, g.created_at,"
+            " g.chars, g.body, bm25(generations_fts, 5.0, 1.0) AS score"
+            " FROM generations_fts JOIN generations g ON g.id = generations_fts.rowid"
+            " WHERE generations_fts MATCH ?"
+        )
+        params: list = [match]
+        if role:
+            sql += " AND g.role = ?"
+            params.append(role)
+        if days_only:
+            sql += " AND g.day IS NOT NULL"
+        sql += " ORDER BY score LIMIT ?"
+        params.append(k)
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        except sqlite3.Error as e:
+            print(f"⚠️ [GenIndex] 查询失败: {e}", flush=True)
+            return []
+        finally:
+            conn.close()
+        keys = ("id", "path", "role", "day", "total_days", "position", "topic", "run_id", "created_at",
+                "chars", "body", "score")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def closest_day_script(self, topic: str, day: int, total_days: int, k: int = 10) -> Optional[Dict]:
+        """
+        主题最接近的历史单天逐字稿
+
+        Returns:
+            候选 dict（附 similarity 与 mode："reuse" / "seed"），没有足够接近的返回 None
+        """
+        if REUSE_MODE == "off" or not topic:
+            return None
+        position = day_position(day, total_days)
+        best = None
+        for candidate in self.search(topic, role="content", k=k, days_only=True):
+            similarity = topic_similarity(topic, candidate["topic"] or "")
+            # 位置一致（第四部分同类型）的稿子优先
+            rank = (similarity, candidate["position"] == position, candidate["created_at"])
+            if best is None or rank > best[0]:
+                best = (rank, {**candidate, "similarity": round(similarity, 3)})
+        if best is None or best[1]["similarity"] < REUSE_SEED_THRESHOLD:
+            return None
+        candidate = best[1]
+        direct = (
+            REUSE_MODE == "reuse"
+            and candidate["similarity"] >= REUSE_DIRECT_THRESHOLD
+            and candidate["position"] == position
+        )
+        candidate["mode"] = "reuse" if direct else "seed"
+        return candidate
+
+    def stats(self) -> Dict:
+        conn = self._connect()
+        if conn is None:
+            return {}
+        try:
+            rows = conn.execute("SELECT role, COUNT(*), SUM(chars) FROM generations GROUP BY role").fetchall()
+        finally:
+            conn.close()
+        return {role: {"count": count, "chars": chars or 0} for role, count, chars in rows}
+
+
+# 导出实例供 Agent 调用
+generation_index = GenerationIndex()
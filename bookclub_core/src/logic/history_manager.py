@@ -0,0 +1,158 @@
+"""
+对话历史管理器 - 带 Token 预算的滚动压缩
+
+模块：history_manager.py
+描述：为旧版单体 run_orchestrator 提供有界的对话历史
+
+压缩策略：
+    1. 最近 N 轮原文保留（保证上下文连贯；一轮 = 一次用户提问及其后的模型回复 / 工具往返）
+    2. 超出预算时，更早的轮次整轮折叠进「滚动摘要」（增量追加，已折叠部分不再重算）
+    3. 过期的工具输出连同发起调用的那条模型回复一起丢弃（查表结果只对当轮推理有用，
+       成对丢弃保证剩下的历史仍是 user / model 交替）
+
+这样每轮发送给 API 的 prompt 大小有上限，长会话的单轮延迟保持平稳。
+"""
+
+import re
+from typing import Callable, List, Optional
+
+# 中日韩字符大约 1 字 ≈ 1 token，其他字符大约 4 字符 ≈ 1 token
+_CJK_RE = re.compile(r"[　-〿一-鿿＀-￯]")
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数（无需调用 count_tokens 接口）"""
+    if not text:
+        return 0
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+class Turn:
+    """一条历史记录：role 为 user/model，kind 为 chat/tool"""
+
+    __slots__ = ("role", "text", "kind", "tokens")
+
+    def __init__(self, role: str, text: str, kind: str = "chat"):
+        self.role = role
+        self.text = text
+        self.kind = kind
+        self.tokens = estimate_tokens(text)
+
+
+def _extractive_summary(turns: List[Turn]) -> str:
+    """默认摘要器：每轮保留首行前 80 字（本地处理，0 Token 消耗）"""
+    lines = []
+    for t in turns:
+        first_line = t.text.strip().split("\n", 1)[0][:80]
+        speaker = "用户" if t.role == "user" else "夏萌老师"
+        lines.append(f"- {speaker}：{first_line}")
+    return "\n".join(lines)
+
+
+class HistoryManager:
+    def __init__(
+        self,
+        token_budget: int = 6000,
+        keep_recent_turns: int = 6,
+        summary_budget: int = 800,
+        summarizer: Optional[Callable[[List[Turn]], str]] = None,
+    ):
+        """
+        Args:
+            token_budget: 历史（摘要 + 原文轮次）的总 token 上限
+            keep_recent_turns: 至少原文保留的最近轮数（按整轮计，超出预算也不折叠这几轮）
+            summary_budget: 滚动摘要自身的 token 上限（超出时丢弃最早的摘要行）
+            summarizer: 自定义摘要函数，默认使用本地抽取式摘要
+        """
+        self.token_budget = token_budget
+        self.keep_recent_turns = keep_recent_turns
+        self.summary_budget = summary_budget
+        self.summarizer = summarizer or _extractive_summary
+
+        self.turns: List[Turn] = []
+        self.summary = ""
+        self._contents_cache = None
+
+    # ---------- 写入 ----------
+    def add_user(self, text: str):
+        self._append(Turn("user", text))
+
+    def add_model(self, text: str):
+        self._append(Turn("model", text))
+
+    def add_tool_result(self, text: str):
+        self._append(Turn("user", text, kind="tool"))
+
+    def _append(self, turn: Turn):
+        # 新的用户提问到来时，之前的工具输出已过期
+        if turn.role == "user" and turn.kind == "chat":
+            self._drop_tool_turns()
+        self.turns.append(turn)
+        self._compact()
+        self._contents_cache = None
+
+    # ---------- 压缩 ----------
+    @property
+    def total_tokens(self) -> int:
+        return estimate_tokens(self.summary) + sum(t.tokens for t in self.turns)
+
+    def _drop_tool_turns(self):
+        """丢弃工具输出，以及紧挨在它前面、发起这次调用的模型回复"""
+        kept: List[Turn] = []
+        for t in self.turns:
+            if t.kind == "tool":
+                if kept and kept[-1].role == "model":
+                    kept.pop()
+                continue
+            kept.append(t)
+        self.turns = kept
+
+    def _rounds(self) -> List[List[Turn]]:
+        """按轮分组：每轮从一条用户提问开始"""
+        rounds: List[List[Turn]] = []
+        for t in self.turns:
+            if not rounds or (t.role == "user" and t.kind == "chat"):
+                rounds.append([])
+            rounds[-1].append(t)
+        return rounds
+
+    def _compact(self):
+        """超出预算时，把最早的整轮折叠进摘要，直到回到预算内（最近 keep_recent_turns 轮始终保留）"""
+        rounds = self._rounds()
+        folded: List[Turn] = []
+        while len(rounds) > self.keep_recent_turns and self.total_tokens > self.token_budget:
+            folded.extend(t for t in rounds.pop(0) if t.kind != "tool")
+            self.turns = [t for r in rounds for t in r]
+
+        if folded:
+            addition = self.summarizer(folded)
+            self.summary = f"{self.summary}\n{addition}".strip() if self.summary else addition
+            self._trim_summary()
+
+    def _trim_summary(self):
+        lines = self.summary.split("\n")
+        while len(lines) > 1 and estimate_tokens("\n".join(lines)) > self.summary_budget:
+            lines.pop(0)
+        self.summary = "\n".join(lines)
+
+    # ---------- 读取 ----------
+    def as_contents(self):
+        """转换为 google.genai 的 Content 列表（结果缓存到下一次写入）"""
+        if self._contents_cache is not None:
+            return self._contents_cache
+
+        from google.genai import types
+
+        contents = []
+        if self.summary:
+            contents.append(types.Content(role="user", parts=[types.Part(text=f"【此前对话摘要】\n{self.summary}")]))
+            contents.append(types.Content(role="model", parts=[types.Part(text="好的，我已了解之前的沟通内容。")]))
+        for t in self.turns:
+            contents.append(types.Content(role=t.role, parts=[types.Part(text=t.text)]))
+
+        self._contents_cache = contents
+        return contents
+
+    def __len__(self):
+        return len(self.turns)
@@ -0,0 +1,187 @@
+"""
+热更新 - 改 agents/*.yaml 的 instruction 或 data/ 下的知识文件后无需重启
+
+模块：hot_reload.py
+描述：Agent 的知识（instruction / 膳食规则 / 营养库 / PDF 索引）放在一个不可变快照里：
+    - 替换时整体换成新对象（一次赋值，原子），多个文件同时改动时全部加载完再一起发布
+    - 每个任务开始时 pin() 一次，任务内读到的始终是同一份快照（第一次读取时确定，
+      预热期间不固定，避免锁定在知识还没加载完的状态）；进行中的任务不受热更新影响，
+      排队中的任务开始时拿到新版本
+    FileWatcher 轮询文件的 (mtime, size)，变化且连续两次一致（写完）后再比较内容哈希，
+    内容确实变了才触发重新加载；重新加载在线程池里完成，不占用事件循环。
+
+仅热更新知识内容；model_name、连接配置等仍需重启。
+
+环境变量：
+    HOT_RELOAD_INTERVAL=2    轮询间隔（秒），0 = 关闭热更新
+"""
+
+import contextvars
+import hashlib
+import os
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+HOT_RELOAD_INTERVAL = float(os.getenv("HOT_RELOAD_INTERVAL", "2"))
+
+
+class KnowledgeSnapshot:
+    """一份知识快照：字段只读，修改时生成新对象"""
+
+    def __init__(self, version: int = 0, **fields):
+        self.version = version
+        self.fields = dict(fields)
+
+    def replace(self, **changes) -> "KnowledgeSnapshot":
+        return KnowledgeSnapshot(self.version, **{**self.fields, **changes})
+
+
+class KnowledgeHolder:
+    def __init__(self, is_ready: Callable[[], bool] = lambda: True, **fields):
+        """
+        Args:
+            is_ready: 预热是否已结束（结束前任务不固定快照）
+        """
+        self.current = KnowledgeSnapshot(**fields)
+        self.is_ready = is_ready
+        # 每个 Holder 一组 ContextVar：同一进程里有多个 Agent 时互不干扰
+        # _pinned：任务固定的快照；_staged：transaction() 内尚未发布的修改（只对执行加载的协程可见）
+        self._pinned: contextvars.ContextVar = contextvars.ContextVar(f"knowledge_pin_{id(self)}", default=None)
+        self._staged: contextvars.ContextVar = contextvars.ContextVar(f"knowledge_staged_{id(self)}", default=None)
+
+    def get(self) -> KnowledgeSnapshot:
+        """当前任务应使用的快照（不在任务内时为最新版本）"""
+        staged = self._staged.get()
+        if staged is not None:
+            return staged["snapshot"]
+        slot = self._pinned.get()
+        if slot is None:
+            return self.current
+        if "snapshot" not in slot:
+            if not self.is_ready():
+                return self.current
+            slot["snapshot"] = self.current
+        return slot["snapshot"]
+
+    @contextmanager
+    def pin(self):
+        """任务开始时调用：此后该任务（及其子协程）读到的都是同一份快照"""
+        token = self._pinned.set({})
+        try:
+            yield
+        finally:
+            self._pinned.reset(token)
+
+    def update(self, **changes):
+        """修改字段：在 transaction() 内先暂存，否则立即发布为新版本"""
+        staged = self._staged.get()
+        if staged is not None:
+            staged["snapshot"] = staged["snapshot"].replace(**changes)
+        else:
+            self._publish(self.current.replace(**changes))
+
+    @contextmanager
+    def transaction(self):
+        """
+        批量修改，退出时一次性发布（有字段变化时版本号 +1）
+
+        Yields:
+            dict，退出后 ["published"] 表示是否发布了新版本
+        """
+        base = self.current
+        staged = {"snapshot": base, "published": False}
+        token = self._staged.set(staged)
+        try:
+            yield staged
+        finally:
+            self._staged.reset(token)
+            # 只提交本次改过的字段（期间其他地方发布的新版本不被覆盖）
+            changes = {k: v for k, v in staged["snapshot"].fields.items() if v is not base.fields.get(k)}
+            if changes:
+                self._publish(self.current.replace(**changes))
+                staged["published"] = True
+
+    def _publish(self, snapshot: KnowledgeSnapshot):
+        snapshot.version = self.current.version + 1
+        self.current = snapshot
+
+
+class SnapshotField:
+    """
+    把 Agent 属性映射到知识快照中的同名字段：
+    读取 = 当前任务固定的快照中的值；赋值 = 发布新快照（原有的 self.rules_content = ... 写法不变）
+    """
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        return obj.knowledge.get().fields.get(self.name)
+
+    def __set__(self, obj, value):
+        obj.knowledge.update(**{self.name: value})
+
+
+def file_signature(path: str) -> Optional[Tuple[int, int]]:
+    """(mtime_ns, size)，文件不存在时为 None"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _content_hash(path: str) -> Optional[str]:
+    h = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+    except OSError:
+        return None
+    return h.hexdigest()
+
+
+class FileWatcher:
+    """
+    按组轮询文件（同步方法，调用方放在线程池中执行）
+
+    groups：组名 -> 文件列表，如 {"rules": ["data/dietary_rules.md"]}；poll() 返回内容有变化的组名
+    """
+
+    def __init__(self, groups: Dict[str, Iterable[str]]):
+        self.groups = {name: list(paths) for name, paths in groups.items()}
+        self._stat: Dict[str, Optional[Tuple[int, int]]] = {}
+        self._hash: Dict[str, Optional[str]] = {}
+        self._pending: Dict[str, Optional[Tuple[int, int]]] = {}
+        for paths in self.groups.values():
+            for path in paths:
+                self._stat[path] = file_signature(path)
+                self._hash[path] = _content_hash(path) if self._stat[path] else None
+
+    def _changed(self, path: str) -> bool:
+        sig = file_signature(path)
+        if sig == self._stat[path]:
+            self._pending.pop(path, None)
+            return False
+        # 文件可能还在写：等下一轮 (mtime, size) 不再变化时再读
+        if self._pending.get(path, ...) != sig:
+            self._pending[path] = sig
+            return False
+        self._pending.pop(path, None)
+        self._stat[path] = sig
+        digest = _content_hash(path) if sig else None
+        if digest == self._hash[path]:
+            return False  # 只是 touch / 另存为相同内容
+        self._hash[path] = digest
+        return True
+
+    def poll(self) -> List[str]:
+        changed = []
+        for name, paths in self.groups.items():
+            # 同组文件都要检查（更新各自的记录），不能短路
+            if any([self._changed(path) for path in paths]):
+                changed.append(name)
+        return changed
@@ -0,0 +1,300 @@
+"""
+intake 多轮会话 - 按频道 + 用户 + 话题保存填到一半的需求表单
+
+模块：intake_session.py
+描述：intake 的指令要求"逐个追问"，但每次 @ 都是独立处理的，用户只能每轮重新粘贴全部需求，
+      模型也每轮重读一遍。这里把需求单拆成结构化字段，按 (频道, 用户, 话题根消息) 保存在本地 SQLite 中：
+        - 每轮先在本地解析用户写下的「字段：值」，再只把本轮新增内容 + 当前表单发给模型
+        - 模型只回复本轮识别出的字段和下一个追问，字段合并进表单
+        - 必填字段齐全（或用户说"就这些"）时，需求单直接由表单生成，不再调用模型
+      频道里新的 @ 开启一个新会话（以这条消息为话题根），在它的话题里回复属于同一个会话，
+      同一用户在同一频道里的两份需求互不串扰；超过 INTAKE_SESSION_TTL 未更新的会话自动作废。
+      网络只告诉我们回复的是哪条消息（不是话题根），所以每轮都把消息 ID 登记到所属会话；
+      回复的是没登记过的消息（如 Agent 自己的追问）时，归到该用户在本频道最近更新的会话。
+
+会话文件：output/.index/intake_sessions.sqlite
+
+环境变量：
+    INTAKE_SESSION_TTL=7200   会话有效期（秒），0 = 不保存会话（每次 @ 独立处理）
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+from src.logic.output_store import OUTPUT_ROOT
+
+SESSION_PATH = os.path.join(OUTPUT_ROOT, ".index", "intake_sessions.sqlite")
+INTAKE_SESSION_TTL = float(os.getenv("INTAKE_SESSION_TTL", "7200"))
+
+# 需求单结构（与 agents/intake.yaml 的输出格式一致）
+FORM_SECTIONS = (
+    ("书籍信息", ("书名", "作者", "PDF路径")),
+    ("主理人信息", ("身份", "专业特长", "风格偏好")),
+    ("项目参数", ("交付周期", "招募周期", "实施形式")),
+    ("产品信息", ("产品名称", "核心功效", "产品定位", "价格")),
+)
+OPTIONAL_SECTIONS = {"产品信息"}
+FIELDS = {name for _, names in FORM_SECTIONS for name in names}
+DEFAULTS = {
+    "书名": "《你是你吃出来的》",
+    "作者": "夏萌",
+    "PDF路径": "data/you_are_what_you_eat.pdf",
+    "招募周期": "7天",
+    "实施形式": "线上社群+文字",
+}
+# 用户常用的简写（scripts/batch_generate.py 的需求文本也用这些写法）
+ALIASES = {
+    "书": "书名", "书籍": "书名", "PDF": "PDF路径", "pdf": "PDF路径",
+    "特长": "专业特长", "专长": "专业特长", "风格": "风格偏好",
+    "周期": "交付周期", "天数": "交付周期",
+    "产品": "产品名称", "产品名": "产品名称", "功效": "核心功效", "定位": "产品定位",
+}
+
+# 整条消息就是这些词时：按现有表单直接出需求单 / 清空会话重新开始
+FINISH_WORDS = {"就这些", "完成", "生成需求单", "出需求单", "没有了", "可以了", "done"}
+RESET_WORDS = {"重新开始", "重来", "新需求", "reset"}
+
+_FIELD_LINE_RE = re.compile(r"^[\s\-*•·]*(?:\*\*)?([A-Za-z一-鿿]{1,6})(?:\*\*)?\s*[：:]\s*(.+?)\s*$")
+_PLACEHOLDERS = {"", "无", "暂无", "未知", "未提供", "待补充", "（待补充）", "待定", "-", "—", "？", "?"}
+_WORD_STRIP_RE = re.compile(r"[\s，。,.!！？?~～]+")
+_QUESTION_MARK = "【追问】"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS intake_sessions (
+    key TEXT PRIMARY KEY,
+    fields TEXT,
+    turns INTEGER,
+    created_at REAL,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_intake_sessions_updated ON intake_sessions(updated_at);
+CREATE TABLE IF NOT EXISTS intake_threads (
+    message_id TEXT PRIMARY KEY,
+    key TEXT,
+    updated_at REAL
+);
+"""
+
+
+def session_key(channel: str, source_id: str, thread_root: str = "") -> str:
+    return f"{channel or ''}:{source_id or ''}:{thread_root or ''}"
+
+
+def extract_fields(text: str) -> Dict[str, str]:
+    """解析文本中的「字段：值」行（只认需求单里的字段名及常用简写，跳过占位值）"""
+    fields = {}
+    for line in (text or "").split("\n"):
+        match = _FIELD_LINE_RE.match(line)
+        if not match:
+            continue
+        name = ALIASES.get(match.group(1), match.group(1))
+        value = match.group(2).strip().strip("*").strip()
+        # "专业严谨 / 温情亲切" 是欢迎消息模板里的备选项，用户没有选定
+        if name in FIELDS and value not in _PLACEHOLDERS and "（待补充）" not in value and " / " not in value:
+            fields[name] = value
+    return fields
+
+
+def control_word(text: str) -> Optional[str]:
+    """整条消息是否为"就这些" / "重新开始"：返回 "finish" / "reset"，否则 None"""
+    word = _WORD_STRIP_RE.sub("", text or "").lower()
+    if word in FINISH_WORDS:
+        return "finish"
+    if word in RESET_WORDS:
+        return "reset"
+    return None
+
+
+def missing_fields(fields: Dict[str, str]) -> List[str]:
+    """尚未填写、也没有默认值的必填字段（按需求单顺序）"""
+    return [
+        name
+        for section, names in FORM_SECTIONS if section not in OPTIONAL_SECTIONS
+        for name in names if not fields.get(name) and name not in DEFAULTS
+    ]
+
+
+def format_form(fields: Dict[str, str]) -> str:
+    """发给模型的当前表单（已填 / 默认 / 待补充）"""
+    lines = []
+    for section, names in FORM_SECTIONS:
+        lines.append(f"【{section}】{'（可选）' if section in OPTIONAL_SECTIONS else ''}")
+        for name in names:
+            if fields.get(name):
+                value = fields[name]
+            elif name in DEFAULTS:
+                value = f"{DEFAULTS[name]}（默认）"
+            else:
+                value = "（待补充）"
+            lines.append(f"- {name}：{value}")
+    return "\n".join(lines)
+
+
+def render_request(fields: Dict[str, str]) -> str:
+    """
+    由表单直接生成需求单（未填的可选字段留"无"，未填的必填字段标"待补充"）
+    必填字段没填齐时（用户说"就这些"）结尾列出缺哪些，不写"信息收集完成"
+    """
+    rule = "═" * 35
+    lines = [rule, "📋 读书会策划需求单", rule, ""]
+    for section, names in FORM_SECTIONS:
+        lines.append(f"【{section}】")
+        for name in names:
+            fallback = "无" if section in OPTIONAL_SECTIONS else "（待补充）"
+            lines.append(f"- {name}：{fields.get(name) or DEFAULTS.get(name) or fallback}")
+        lines.append("")
+    missing = missing_fields(fields)
+    if missing:
+        lines += [rule, f"⚠️ 信息尚未收集完整，以下必填项待补充：{'、'.join(missing)}", rule]
+    else:
+        lines += [rule, "✅ 信息收集完成，可传递给 @bc-content", rule]
+    return "\n".join(lines)
+
+
+def follow_up(reply: str) -> str:
+    """模型回复中给用户看的部分：【追问】之后的内容；没有按格式回复时去掉字段行后原样使用"""
+    if _QUESTION_MARK in reply:
+        return reply.split(_QUESTION_MARK, 1)[1].strip()
+    kept = [line for line in reply.split("\n") if not extract_fields(line) and "【表单更新】" not in line]
+    return "\n".join(kept).strip()
+
+
+class IntakeSessionStore:
+    def __init__(self, path: str = SESSION_PATH, ttl: float = INTAKE_SESSION_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._available: Optional[bool] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if self._available is False or not self.enabled:
+            return None
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10)
+            if self._available is None:
+                with self._lock:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.executescript(_SCHEMA)
+                    self._available = True
+            return conn
+        except sqlite3.Error as e:
+            print(f"⚠️ [Intake] 会话存储不可用（{e}），每次 @ 独立处理", flush=True)
+            self._available = False
+            return None
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Returns:
+            {"key", "fields", "turns", "created_at", "updated_at"}；没有或已过期时返回 None
+        """
+        conn = self._connect()
+        if conn is None:
+            return None
+        try:
+            with conn:
+                conn.execute("DELETE FROM intake_sessions WHERE updated_at < ?", (time.time() - self.ttl,))
+                conn.execute("DELETE FROM intake_threads WHERE updated_at < ?", (time.time() - self.ttl,))
+                row = conn.execute(
+                    "SELECT fields, turns, created_at, updated_at FROM intake_sessions WHERE key = ?", (key,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"⚠️ [Intake] 读取会话失败: {e}", flush=True)
+            return None
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        return {"key": key, "fields": json.loads(row[0]), "turns": row[1], "created_at": row[2], "updated_at": row[3]}
+
+    def resolve(self, channel: str, source_id: str, parent_id: str) -> str:
+        """
+        话题内回复所属的会话（只在该用户自己的会话里找）：被回复的消息登记过时取它的会话，
+        否则取该用户在本频道最近更新的会话，都没有时以被回复的消息为话题根新建
+        """
+        conn = self._connect()
+        if conn is None:
+            return session_key(channel, source_id, parent_id)
+        prefix = session_key(channel, source_id)
+        try:
+            row = conn.execute(
+                "SELECT key FROM intake_threads WHERE message_id = ? AND substr(key, 1, ?) = ? AND updated_at >= ?",
+                (parent_id, len(prefix), prefix, time.time() - self.ttl),
+            ).fetchone()
+            if row is None:
+                row = conn.execute(
+                    "SELECT key FROM intake_sessions WHERE substr(key, 1, ?) = ? AND updated_at >= ?"
+                    " ORDER BY updated_at DESC LIMIT 1",
+                    (len(prefix), prefix, time.time() - self.ttl),
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"⚠️ [Intake] 查找会话失败: {e}", flush=True)
+            row = None
+        finally:
+            conn.close()
+        return row[0] if row else session_key(channel, source_id, parent_id)
+
+    def link(self, key: str, *message_ids: str):
+        """登记属于该会话的消息（之后在话题里回复这些消息时归到同一个会话）"""
+        conn = self._connect()
+        if conn is None:
+            return
+        now = time.time()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO intake_threads (message_id, key, updated_at) VALUES (?, ?, ?)",
+                    [(message_id, key, now) for message_id in dict.fromkeys(message_ids) if message_id],
+                )
+        except sqlite3.Error as e:
+            print(f"⚠️ [Intake] 登记话题消息失败: {e}", flush=True)
+        finally:
+            conn.close()
+
+    def open(self, key: str) -> Dict:
+        """取现有会话，没有时新建（新建的会话在 save 之前不落盘）"""
+        now = time.time()
+        return self.get(key) or {"key": key, "fields": {}, "turns": 0, "created_at": now, "updated_at": now}
+
+    def save(self, session: Dict):
+        conn = self._connect()
+        if conn is None:
+            return
+        session["updated_at"] = time.time()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO intake_sessions (key, fields, turns, created_at, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (session["key"], json.dumps(session["fields"], ensure_ascii=False), session["turns"],
+                     session["created_at"], session["updated_at"]),
+                )
+        except sqlite3.Error as e:
+            print(f"⚠️ [Intake] 保存会话失败: {e}", flush=True)
+        finally:
+            conn.close()
+
+    def delete(self, key: str):
+        conn = self._connect()
+        if conn is None:
+            return
+        try:
+            with conn:
+                conn.execute("DELETE FROM intake_sessions WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            print(f"⚠️ [Intake] 删除会话失败: {e}", flush=True)
+        finally:
+            conn.close()
+
+
+# 导出实例供 Agent 调用
+intake_sessions = IntakeSessionStore()
@@ -0,0 +1,139 @@
+"""
+任务队列 - 后台执行 @ 任务，支持按话题取消
+
+模块：jobs.py
+描述：OpenAgents 的事件循环逐条 await 消息处理函数，一个 7 天的 content 任务会把后续消息
+      （包括"取消"）全部挡在后面。改为：消息处理函数只负责登记任务，任务在后台 Task 中执行，
+      同时执行的任务数 ≤ JOB_CONCURRENCY（默认 1，与原先串行处理一致），其余排队。
+
+取消：按话题（用户原消息 ID / 事件 ID）找到任务，
+    - 排队中：直接移出队列
+    - 执行中：Task.cancel()，在当前 await 点（LLM 调用、频道回复）抛出 CancelledError，
+      LLM 网关的并发名额随之释放；已保存的单天文件保留，run 清单状态记为 cancelled
+    名额释放后，排在后面的任务立即开始。
+
+环境变量：
+    JOB_CONCURRENCY=1    每个 Agent 进程同时执行的任务数
+"""
+
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "1"))
+
+# 已结束的任务保留多久（秒），便于对"刚结束的任务"回复准确的提示
+FINISHED_KEEP_SECONDS = 600
+
+
+class Job:
+    def __init__(self, job_id: str, channel: str = "", source_id: str = "", thread_ids: Iterable[str] = ()):
+        self.job_id = job_id
+        self.channel = channel
+        self.source_id = source_id
+        self.thread_ids = {str(t) for t in thread_ids if t} | {str(job_id)}
+        self.state = "queued"  # queued / running / done / error / cancelled
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.meta: Dict = {}  # 执行过程中登记的信息（如 run 目录）
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def active(self) -> bool:
+        return self.state in ("queued", "running")
+
+
+class JobRegistry:
+    def __init__(self, concurrency: int = JOB_CONCURRENCY):
+        self.concurrency = max(1, concurrency)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._jobs: Dict[str, Job] = {}
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    def submit(self, job: Job, run: Callable[[], Awaitable]) -> Job:
+        """
+        登记任务并在后台执行（立即返回）
+        同一 job_id 的任务仍在进行时不再登记（重复投递的事件），返回已有的任务
+        """
+        self._expire()
+        existing = self._jobs.get(job.job_id)
+        if existing is not None and existing.active:
+            print(f"⏭️  [Jobs] 任务 {job.job_id} 已在进行中，忽略重复提交", flush=True)
+            return existing
+        self._jobs[job.job_id] = job
+
+        async def _runner():
+            try:
+                async with self.semaphore:
+                    job.state = "running"
+                    await run()
+                job.state = "done"
+            except asyncio.CancelledError:
+                job.state = "cancelled"
+            except Exception as e:
+                job.state = "error"
+                print(f"💥 [Jobs] 任务 {job.job_id} 失败: {e}", flush=True)
+            finally:
+                job.finished_at = time.time()
+
+        job.task = asyncio.get_running_loop().create_task(_runner())
+        return job
+
+    def has_capacity(self) -> bool:
+        """还有空闲的执行名额（没有任务在排队）"""
+        return len(self.active()) < self.concurrency
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def queue_position(self, job: Job) -> int:
+        """排在该任务前面的任务数（执行中 + 更早排队的）"""
+        return sum(
+            1 for other in self._jobs.values()
+            if other is not job and other.active and other.created_at <= job.created_at
+        )
+
+    def find(self, thread_id: Optional[str] = None, channel: Optional[str] = None,
+             source_id: Optional[str] = None) -> Optional[Job]:
+        """
+        按话题找任务；没有话题 ID（直接在频道里发"取消"）时取该频道内该用户最近的进行中任务
+        给出话题 ID 但没有对应任务时返回 None（不退回到频道内的其他任务，以免取消别人的任务）
+        """
+        if thread_id:
+            # 同一话题里可能有多个任务（原任务 + 后续重写），进行中的优先，其次最新的
+            in_thread = [job for job in self._jobs.values() if str(thread_id) in job.thread_ids]
+            return max(in_thread, key=lambda j: (j.active, j.created_at)) if in_thread else None
+        candidates = [
+            job for job in self._jobs.values()
+            if job.active and (not channel or job.channel == channel)
+            and (not source_id or job.source_id == source_id)
+        ]
+        return max(candidates, key=lambda j: j.created_at) if candidates else None
+
+    def cancel(self, job: Job) -> bool:
+        """取消排队中或执行中的任务；任务已结束时返回 False"""
+        if not job.active or job.task is None:
+            return False
+        job.task.cancel()
+        if job.state == "queued":
+            # 任务协程可能还没开始执行（取消发生在提交后的同一轮事件循环里），不会走到 _runner 的 except
+            job.state = "cancelled"
+            job.finished_at = time.time()
+        return True
+
+    def active(self) -> List[Job]:
+        return [job for job in self._jobs.values() if job.active]
+
+    def _expire(self):
+        now = time.time()
+        for job_id in [
+            j.job_id for j in self._jobs.values()
+            if j.finished_at and now - j.finished_at > FINISHED_KEEP_SECONDS
+        ]:
+            del self._jobs[job_id]
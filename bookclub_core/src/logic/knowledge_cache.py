@@ -0,0 +1,50 @@
+"""
+进程级知识缓存 - 同一进程内多个 Agent 共用一份膳食规则 / 营养库 / PDF 索引
+
+模块：knowledge_cache.py
+描述：按 (类别, 源文件签名) 缓存加载结果。同一进程托管多个角色时（scripts/multi_role_host.py），
+      content 与 ops 的膳食规则、营养库、PDF 索引 / 上传只加载一次，并发的加载请求等待同一个结果；
+      源文件变化（热更新）后签名不同，自动重新加载，旧结果随之丢弃（每个类别只保留最新一份）。
+      每个角色一个进程时只有一个使用者，行为与直接加载相同。
+"""
+
+import asyncio
+from typing import Callable, Dict, Iterable, Tuple, TypeVar
+
+from src.logic.hot_reload import file_signature
+
+T = TypeVar("T")
+
+
+class KnowledgeCache:
+    def __init__(self):
+        self._entries: Dict[str, Tuple[tuple, asyncio.Future]] = {}
+
+    async def load(self, kind: str, paths: Iterable[str], loader: Callable[[], T]) -> T:
+        """
+        取缓存或在线程池中执行 loader（阻塞的读文件 / 建索引 / 上传）
+
+        Args:
+            kind: 类别（如 "rules"），同一类别只保留最新签名的结果
+            paths: 决定结果的源文件，任一文件 (mtime, size) 变化即视为新版本
+        """
+        key = tuple((path, file_signature(path)) for path in paths)
+        cached = self._entries.get(kind)
+        if cached is None or cached[0] != key:
+            future = asyncio.ensure_future(asyncio.to_thread(loader))
+            cached = (key, future)
+            self._entries[kind] = cached
+        try:
+            return await asyncio.shield(cached[1])
+        except Exception:
+            # 失败的结果不缓存，下次重新加载
+            if self._entries.get(kind) is cached:
+                del self._entries[kind]
+            raise
+
+    def clear(self):
+        self._entries.clear()
+
+
+# 导出实例供 Agent 调用
+knowledge_cache = KnowledgeCache()
@@ -0,0 +1,276 @@
+"""
+LLM 录制 / 回放 - 把真实调用录成"磁带"，之后不联网、不计费地原样重放
+
+模块：llm_cassette.py
+描述：套在网关的底层客户端外面（接口与 genai.Client 中用到的部分一致：client.aio.models.generate_content、
+      client.models.generate_content、client.files），由 llm_gateway 按 LLM_CASSETTE_MODE 自动接入：
+        - passthrough：不录不放，直接调用后端（默认）
+        - record：照常调用后端（LLM_BACKEND=gemini / stub），每次请求与回复追加写入磁带
+        - replay：只从磁带取回复，不创建后端客户端、不需要 API Key；磁带里没有的请求直接报错
+
+      请求按"规范化后的 prompt"取哈希作为键：模型名 + 各段文本（统一换行、去行尾空白、合并多余空行）
+      + 生成参数；上传的 PDF 文件 ID 每次不同，只记为 <file>，cached_content 不参与。
+      同一个键录到多条回复时按顺序轮流回放（同一 prompt 多次生成的结果各不相同）。
+
+      回放一整套 7 天方案只需几秒，适合对非 LLM 部分（调度、渲染、保存）做可重复的性能回归：
+        LLM_CASSETTE_MODE=record python scripts/batch_generate.py specs.jsonl --name rec
+        LLM_CASSETTE_MODE=replay python scripts/batch_generate.py specs.jsonl --name replay
+
+磁带文件：JSONL，每行一次调用（键、模型、prompt 开头、回复文本、token 数、finish_reason、耗时）
+
+环境变量：
+    LLM_CASSETTE_MODE=passthrough             passthrough / record / replay
+    LLM_CASSETTE=output/.cassettes/default.jsonl  磁带文件
+    LLM_CASSETTE_LATENCY=                     回放时模拟延迟：留空 = 不等待；recorded = 按录制时的耗时；
+                                              recorded:0.1 = 录制耗时 × 0.1；或 stub 的延迟分布（如 fixed:0.5）
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import types
+from typing import Dict, List, Optional
+
+from src.logic.output_store import OUTPUT_ROOT
+from src.logic.stub_llm import LatencyDistribution
+
+CASSETTE_MODES = ("passthrough", "record", "replay")
+DEFAULT_CASSETTE = os.path.join(OUTPUT_ROOT, ".cassettes", "default.jsonl")
+
+# 不影响生成结果、每次运行都不同的参数
+_VOLATILE_CONFIG = {"cached_content"}
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+
+class CassetteMissError(RuntimeError):
+    """回放模式下磁带中没有对应的请求"""
+
+
+def cassette_mode() -> str:
+    mode = os.getenv("LLM_CASSETTE_MODE", "passthrough").lower()
+    if mode not in CASSETTE_MODES:
+        raise ValueError(f"无法识别的 LLM_CASSETTE_MODE: {mode!r}（可选：{' / '.join(CASSETTE_MODES)}）")
+    return mode
+
+
+def normalize_prompt(contents) -> List[str]:
+    """contents 的规范形式：文本统一换行与空白，文件引用只记为 <file>"""
+    parts = []
+    for part in contents if isinstance(contents, list) else [contents]:
+        if isinstance(part, str):
+            text = "\n".join(line.rstrip() for line in part.replace("\r\n", "\n").split("\n"))
+            parts.append(_BLANK_LINES_RE.sub("\n\n", text).strip())
+        else:
+            parts.append("<file>")
+    return parts
+
+
+def request_key(model: str, contents, config: Optional[Dict] = None) -> str:
+    config = {k: v for k, v in (config or {}).items() if k not in _VOLATILE_CONFIG and v is not None}
+    payload = json.dumps(
+        {"model": model, "contents": normalize_prompt(contents), "config": config},
+        ensure_ascii=False, sort_keys=True, default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CassetteResponse:
+    """与 genai 响应对象中用到的字段一致：text / usage_metadata / candidates[0].finish_reason"""
+
+    def __init__(self, text: str, prompt_tokens: int = 0, output_tokens: int = 0, finish_reason: str = "STOP"):
+        self.text = text
+        self.usage_metadata = types.SimpleNamespace(
+            prompt_token_count=prompt_tokens,
+            candidates_token_count=output_tokens,
+        )
+        self.candidates = [types.SimpleNamespace(finish_reason=finish_reason)]
+
+
+def _finish_reason(resp) -> str:
+    candidates = getattr(resp, "candidates", None) or []
+    reason = getattr(candidates[0], "finish_reason", None) if candidates else None
+    return str(getattr(reason, "name", reason) or "")
+
+
+class Cassette:
+    """磁带文件：启动时整体读入（键 → 回复列表），录制时逐条追加"""
+
+    def __init__(self, path: str = DEFAULT_CASSETTE):
+        self.path = path
+        self._entries: Optional[Dict[str, List[Dict]]] = None
+        self._cursor: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, List[Dict]]:
+        if self._entries is None:
+            entries: Dict[str, List[Dict]] = {}
+            if os.path.exists(self.path):
+                with open(self.path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            record = json.loads(line)
+                        except json.JSONDecodeError:
+                            continue  # 录制中断留下的半行
+                        entries.setdefault(record["key"], []).append(record)
+            self._entries = entries
+        return self._entries
+
+    def __len__(self):
+        return sum(len(v) for v in self._load().values())
+
+    def lookup(self, key: str) -> Optional[Dict]:
+        """取该键的下一条回复（多条时轮流返回）"""
+        with self._lock:
+            records = self._load().get(key)
+            if not records:
+                return None
+            index = self._cursor.get(key, 0)
+            self._cursor[key] = index + 1
+            return records[index % len(records)]
+
+    def append(self, key: str, model: str, contents, resp, seconds: float):
+        usage = getattr(resp, "usage_metadata", None)
+        text = getattr(resp, "text", None) or ""
+        prompt = "\n".join(normalize_prompt(contents))
+        record = {
+            "key": key,
+            "model": model,
+            "prompt_chars": len(prompt),
+            "prompt_head": prompt[:200],
+            "text": text,
+            "prompt_tokens": getattr(usage, "prompt_token_count", None) or 0,
+            "output_tokens": getattr(usage, "candidates_token_count", None) or 0,
+            "finish_reason": _finish_reason(resp),
+            "seconds": round(seconds, 3),
+            "recorded_at": time.time(),
+        }
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            # 每条一次 write（追加模式），多个 Agent 进程同时录制到同一文件时行不会交错
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+            self._load().setdefault(key, []).append(record)
+
+
+class CassetteClient:
+    """
+    录制 / 回放客户端
+
+    Args:
+        inner: 实际的后端客户端（record 模式必需；replay 模式为 None）
+        latency: 回放时的模拟延迟（见模块说明中的 LLM_CASSETTE_LATENCY）
+    """
+
+    def __init__(self, cassette: Cassette, mode: str, inner=None, latency: str = ""):
+        if mode == "record" and inner is None:
+            raise ValueError("record 模式需要实际的后端客户端")
+        self.cassette = cassette
+        self.mode = mode
+        self.inner = inner
+        self.latency = latency
+        self._latency_scale: Optional[float] = None
+        self._distribution: Optional[LatencyDistribution] = None
+        if latency.startswith("recorded"):
+            _, _, scale = latency.partition(":")
+            self._latency_scale = float(scale) if scale else 1.0
+        elif latency:
+            self._distribution = LatencyDistribution(latency)
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+        self.aio = types.SimpleNamespace(models=_AsyncModels(self))
+        self.models = _SyncModels(self)
+        self.files = inner.files if inner is not None else _ReplayFiles()
+
+    @classmethod
+    def from_env(cls, mode: str, inner=None) -> "CassetteClient":
+        return cls(
+            Cassette(os.getenv("LLM_CASSETTE", DEFAULT_CASSETTE)),
+            mode,
+            inner=inner,
+            latency=os.getenv("LLM_CASSETTE_LATENCY", ""),
+        )
+
+    def describe(self) -> str:
+        text = f"{self.mode} | 磁带 {self.cassette.path}"
+        if self.mode == "replay":
+            text += f"（{len(self.cassette)} 条）"
+            if self.latency:
+                text += f" | 模拟延迟 {self.latency}"
+        return text
+
+    def _replay(self, model: str, contents, config):
+        """
+        Returns:
+            (回复, 模拟延迟秒数)
+        """
+        key = request_key(model, contents, config)
+        record = self.cassette.lookup(key)
+        if record is None:
+            self.misses += 1
+            head = "\n".join(normalize_prompt(contents))[:80].replace("\n", " ")
+            raise CassetteMissError(f"磁带中没有该请求（key={key[:12]}，model={model}，prompt：{head}...）")
+        self.hits += 1
+        if self._latency_scale is not None:
+            delay = record.get("seconds", 0.0) * self._latency_scale
+        else:
+            delay = self._distribution.sample() if self._distribution is not None else 0.0
+        resp = CassetteResponse(record["text"], record.get("prompt_tokens", 0), record.get("output_tokens", 0),
+                                record.get("finish_reason") or "STOP")
+        return resp, delay
+
+    def _record(self, model: str, contents, config, resp, seconds: float):
+        self.cassette.append(request_key(model, contents, config), model, contents, resp, seconds)
+        self.recorded += 1
+
+
+class _AsyncModels:
+    def __init__(self, client: CassetteClient):
+        self.client = client
+
+    async def generate_content(self, model, contents, config=None):
+        client = self.client
+        if client.mode == "replay":
+            resp, delay = client._replay(model, contents, config)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            return resp
+        start = time.perf_counter()
+        resp = await client.inner.aio.models.generate_content(model=model, contents=contents, config=config)
+        client._record(model, contents, config, resp, time.perf_counter() - start)
+        return resp
+
+
+class _SyncModels:
+    def __init__(self, client: CassetteClient):
+        self.client = client
+
+    def generate_content(self, model, contents, config=None):
+        client = self.client
+        if client.mode == "replay":
+            resp, delay = client._replay(model, contents, config)
+            if delay > 0:
+                time.sleep(delay)
+            return resp
+        start = time.perf_counter()
+        resp = client.inner.models.generate_content(model=model, contents=contents, config=config)
+        client._record(model, contents, config, resp, time.perf_counter() - start)
+        return resp
+
+
+class _ReplayFiles:
+    """回放时的文件接口：上传 / 复用总是成功（文件引用不参与请求键）"""
+
+    def upload(self, file=None, **kwargs):
+        return types.SimpleNamespace(name=f"files/replay-{os.path.basename(str(file))}")
+
+    def get(self, name: str = "", **kwargs):
+        return types.SimpleNamespace(name=name)
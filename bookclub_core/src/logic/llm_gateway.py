@@ -0,0 +1,204 @@
+"""
+LLM 网关 - 全进程共享的 Gemini 调用入口
+
+模块：llm_gateway.py
+描述：统一 APIClient（旧版单体）与 BookClubAgent（多 Agent）的模型调用路径
+
+核心功能：
+    1. 单例 genai.Client：整个进程只建一个客户端，复用同一个 HTTP 连接池（keep-alive）
+    2. 模型句柄缓存：按 (model, cache_id) 记忆化，避免每次调用都重新构造模型/拉取缓存
+    3. 同步 + 异步接口：generate() 走 client.aio，不再阻塞 OpenAgents 事件循环
+    4. 全局并发上限：LLM_MAX_CONCURRENCY 限制同时在途的异步调用数（批量生成时按 API 配额控流）
+    5. 后端切换：LLM_BACKEND=stub 时使用桩后端（src/logic/stub_llm.py，压测 / 离线联调用）
+    6. 录制回放：LLM_CASSETTE_MODE=record / replay 时在后端外面套一层磁带（src/logic/llm_cassette.py）
+
+用法：
+    from src.logic.llm_gateway import llm_gateway
+
+    handle = llm_gateway.model("gemini-2.0-flash-exp")
+    text = await handle.generate(contents, config={"max_output_tokens": 2048})
+"""
+
+import asyncio
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+
+class ModelHandle:
+    """
+    绑定了 (model, cache_id) 的模型句柄
+
+    句柄本身很轻，只保存模型名和基础配置（如 cached_content），
+    真正的 HTTP 连接由网关里的共享客户端持有。
+    """
+
+    def __init__(self, gateway: "LLMGateway", model_name: str, cache_id: Optional[str] = None):
+        self.gateway = gateway
+        self.model_name = model_name
+        self.cache_id = cache_id
+        self.base_config: Dict[str, Any] = {"cached_content": cache_id} if cache_id else {}
+
+    def _merge_config(self, config: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        merged = dict(self.base_config)
+        if config:
+            merged.update(config)
+        return merged
+
+    def generate_sync(self, contents, config: Optional[Dict[str, Any]] = None):
+        """同步调用（仅供旧版单体 main.py 等非异步场景使用）"""
+        return self.gateway.client.models.generate_content(
+            model=self.model_name,
+            contents=contents,
+            config=self._merge_config(config),
+        )
+
+    async def generate(self, contents, config: Optional[Dict[str, Any]] = None):
+        """异步调用，走 client.aio，不占用事件循环（受网关全局并发上限约束）"""
+        semaphore = self.gateway.semaphore
+        if semaphore is None:
+            return await self.gateway.client.aio.models.generate_content(
+                model=self.model_name,
+                contents=contents,
+                config=self._merge_config(config),
+            )
+        async with semaphore:
+            return await self.gateway.client.aio.models.generate_content(
+                model=self.model_name,
+                contents=contents,
+                config=self._merge_config(config),
+            )
+
+    def __repr__(self):
+        return f"ModelHandle(model={self.model_name!r}, cache_id={self.cache_id!r})"
+
+
+class LLMGateway:
+    """
+    进程级 LLM 网关
+
+    - client：懒加载的共享 genai.Client（首次使用时才创建）
+    - model()：按 (model, cache_id) 返回记忆化的 ModelHandle
+    - set_client()：允许替换底层客户端（测试桩、录制回放等）
+    - set_concurrency()：全局异步并发上限（0 表示不限制）
+    """
+
+    def __init__(self, api_version: str = "v1beta"):
+        self.api_version = api_version
+        self._client = None
+        self._handles: Dict[Tuple[str, Optional[str]], ModelHandle] = {}
+        self._lock = threading.Lock()
+        self.max_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", "0"))
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def semaphore(self) -> Optional[asyncio.Semaphore]:
+        if self.max_concurrency <= 0:
+            return None
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def set_concurrency(self, limit: int):
+        """设置全局并发上限（需在发起调用前设置；0 表示不限制）"""
+        self.max_concurrency = limit
+        self._semaphore = None
+
+    @property
+    def available(self) -> bool:
+        """是否具备调用条件（已注入客户端或配置了 API Key）"""
+        return (
+            self._client is not None
+            or self.backend == "stub"
+            or os.getenv("LLM_CASSETTE_MODE", "").lower() == "replay"
+            or bool(os.getenv("GOOGLE_API_KEY"))
+        )
+
+    @property
+    def backend(self) -> str:
+        return os.getenv("LLM_BACKEND", "gemini").lower()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._build_client()
+        return self._client
+
+    def _build_client(self):
+        from src.logic.llm_cassette import CassetteClient, cassette_mode
+
+        mode = cassette_mode()
+        if mode == "passthrough":
+            return self._build_backend()
+        # 回放不需要后端（不联网、不需要 API Key）
+        client = CassetteClient.from_env(mode, inner=self._build_backend() if mode == "record" else None)
+        print(f"📼 [Gateway] LLM 录制回放（{client.describe()}）", flush=True)
+        return client
+
+    def _build_backend(self):
+        if self.backend == "stub":
+            from src.logic.stub_llm import StubLLMClient
+
+            client = StubLLMClient.from_env()
+            print(f"🧪 [Gateway] 使用桩 LLM 后端（{client.describe()}）", flush=True)
+            return client
+
+        from google import genai
+
+        api_key = os.getenv("GOOGLE_API_KEY")
+        if not api_key:
+            raise RuntimeError("GOOGLE_API_KEY 未设置")
+
+        # 连接池参数：同一进程内所有调用共享这些 keep-alive 连接
+        max_keepalive = int(os.getenv("LLM_POOL_MAX_KEEPALIVE", "10"))
+        http_options: Dict[str, Any] = {"api_version": self.api_version}
+        try:
+            import httpx
+
+            limits = httpx.Limits(
+                max_connections=int(os.getenv("LLM_POOL_MAX_CONNECTIONS", "20")),
+                max_keepalive_connections=max_keepalive,
+                keepalive_expiry=float(os.getenv("LLM_POOL_KEEPALIVE_EXPIRY", "120")),
+            )
+            http_options["client_args"] = {"limits": limits}
+            http_options["async_client_args"] = {"limits": limits}
+            client = genai.Client(api_key=api_key, http_options=http_options)
+        except Exception as e:
+            # 旧版 google-genai 不支持 client_args 时退回默认连接池
+            print(f"⚠️ [Gateway] 自定义连接池不可用（{e}），使用默认设置", flush=True)
+            client = genai.Client(api_key=api_key, http_options={"api_version": self.api_version})
+
+        print(f"🔌 [Gateway] 共享 genai.Client 已创建（keep-alive {max_keepalive}）", flush=True)
+        return client
+
+    def set_client(self, client):
+        """替换底层客户端，已缓存的句柄会自动使用新客户端"""
+        with self._lock:
+            self._client = client
+
+    def model(self, model_name: Optional[str] = None, cache_id: Optional[str] = None) -> ModelHandle:
+        """获取 (model, cache_id) 对应的模型句柄（记忆化）"""
+        model_name = model_name or os.getenv("GEMINI_MODEL", "gemini-2.0-flash-exp")
+        key = (model_name, cache_id)
+        handle = self._handles.get(key)
+        if handle is None:
+            with self._lock:
+                handle = self._handles.get(key)
+                if handle is None:
+                    handle = ModelHandle(self, model_name, cache_id)
+                    self._handles[key] = handle
+        return handle
+
+    async def generate(self, model_name: str, contents, config: Optional[Dict[str, Any]] = None,
+                       cache_id: Optional[str] = None):
+        return await self.model(model_name, cache_id).generate(contents, config)
+
+    def generate_sync(self, model_name: str, contents, config: Optional[Dict[str, Any]] = None,
+                      cache_id: Optional[str] = None):
+        return self.model(model_name, cache_id).generate_sync(contents, config)
+
+
+# 导出实例供 Agent 调用
+llm_gateway = LLMGateway()
@@ -0,0 +1,194 @@
+"""
+事件循环延迟采样 + 阻塞看门狗 - 衡量"有没有东西卡住了事件循环"，并指出是谁
+
+模块：loop_monitor.py
+描述：后台任务每 LOOP_LAG_INTERVAL 秒 sleep 一次，实际醒来时间比预期晚多少即为事件循环延迟
+      （同步的 PDF 解析、docx 渲染、文件上传、大段正则等都会体现在这里）。
+      最近 LOOP_LAG_WINDOW 个样本用于计算 p50 / p95 / p99，最大值与直方图从启动起累计。
+
+      看门狗线程：事件循环超过 LOOP_LAG_STALL_MS 没有心跳时，抓取事件循环线程当前的调用栈，
+      打印 "🐢 [LoopLag]" 日志（含栈），并把这次阻塞的时长记到栈中最内层的项目代码位置
+      （src/ 或 scripts/ 下的 文件:行号 函数名）上，按累计阻塞时长排出 top 阻塞点。
+
+      统计结果写入 .health/<agent_id>.json 的 loop_lag 字段，压测脚本据此汇总各进程的延迟。
+      同一进程托管多个 Agent 时共用一个监控（loop_monitor 实例），只有一个看门狗线程。
+
+环境变量：
+    LOOP_LAG_MONITOR=0        1 = 开启采样与看门狗（排查卡顿 / 压测时开启；scripts/load_test.py 会自动开启）
+    LOOP_LAG_INTERVAL=0.1     采样间隔（秒）
+    LOOP_LAG_WINDOW=3000      参与分位数计算的最近样本数
+    LOOP_LAG_STALL_MS=250     超过该阻塞时长时抓栈并记录阻塞点
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+LOOP_LAG_ENABLED = os.getenv("LOOP_LAG_MONITOR", "0") == "1"
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.1"))
+LOOP_LAG_WINDOW = int(os.getenv("LOOP_LAG_WINDOW", "3000"))
+LOOP_LAG_STALL_MS = float(os.getenv("LOOP_LAG_STALL_MS", "250"))
+
+# 直方图桶上界（毫秒），最后一个桶为 "+Inf"
+HISTOGRAM_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_PROJECT_DIRS = tuple(os.path.join(_PROJECT_ROOT, d) + os.sep for d in ("src", "scripts"))
+_THIS_FILE = os.path.abspath(__file__)
+
+
+def _percentile(sorted_values, p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, int(round(p / 100 * (len(sorted_values) - 1)))))
+    return sorted_values[k]
+
+
+def _blocking_site(frame) -> Dict[str, str]:
+    """
+    从阻塞时的栈里找出责任位置
+
+    Returns:
+        {"where": 最内层的项目代码 "文件:行号 函数"，"leaf": 实际卡住的最内层调用，"stack": 格式化的栈}
+    """
+    entries = traceback.extract_stack(frame)
+    where = ""
+    for entry in reversed(entries):
+        path = os.path.abspath(entry.filename)
+        if path.startswith(_PROJECT_DIRS) and path != _THIS_FILE:
+            where = f"{os.path.relpath(path, _PROJECT_ROOT)}:{entry.lineno} {entry.name}"
+            break
+    leaf = entries[-1] if entries else None
+    leaf_text = f"{os.path.basename(leaf.filename)}:{leaf.lineno} {leaf.name}" if leaf else "?"
+    return {
+        "where": where or leaf_text,
+        "leaf": leaf_text,
+        "stack": "".join(traceback.format_list(entries[-12:])),
+    }
+
+
+class LoopLagMonitor:
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL, window: int = LOOP_LAG_WINDOW,
+                 stall_ms: float = LOOP_LAG_STALL_MS):
+        self.interval = interval
+        self.stall_ms = stall_ms
+        self.samples = deque(maxlen=window)  # 毫秒
+        self.count = 0
+        self.max_ms = 0.0
+        self.histogram = [0] * (len(HISTOGRAM_BUCKETS) + 1)
+        self.stalls = 0
+        self.blockers: Dict[str, Dict] = {}  # 阻塞点 -> {"count", "total_ms", "max_ms", "leaf", "stack"}
+        self._reporters: List[Callable[[], None]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._beat = time.perf_counter()  # 事件循环最近一次心跳（看门狗线程读取）
+        self._loop_thread_id: Optional[int] = None
+        self._captured = None  # 看门狗抓到的阻塞：(心跳时间, 位置)，事件循环醒来后结算
+
+    def start(self, on_report: Optional[Callable[[], None]] = None, report_every: float = 5.0):
+        """
+        启动采样与看门狗（重复调用只追加 on_report，不会重复启动）
+
+        Args:
+            on_report: 每隔 report_every 秒调用一次（如把统计写入健康状态文件）
+        """
+        if on_report is not None:
+            self._reporters.append(on_report)
+        if self._task is None or self._task.done():
+            self._loop_thread_id = threading.get_ident()
+            self._beat = time.perf_counter()
+            self._task = asyncio.get_running_loop().create_task(self._run(report_every))
+        if self.stall_ms > 0 and (self._watchdog is None or not self._watchdog.is_alive()):
+            self._stop.clear()
+            self._watchdog = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+            self._watchdog.start()
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+        self._stop.set()
+
+    async def _run(self, report_every: float):
+        last_report = time.perf_counter()
+        while True:
+            start = time.perf_counter()
+            self._beat = start
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            self._beat = now
+            self._record(max(0.0, (now - start - self.interval) * 1000), start)
+            if self._reporters and now - last_report >= report_every:
+                last_report = now
+                for report in self._reporters:
+                    report()
+
+    def _record(self, lag_ms: float, beat: float = 0.0):
+        self.samples.append(lag_ms)
+        self.count += 1
+        self.max_ms = max(self.max_ms, lag_ms)
+        bucket = next((i for i, bound in enumerate(HISTOGRAM_BUCKETS) if lag_ms <= bound), len(HISTOGRAM_BUCKETS))
+        self.histogram[bucket] += 1
+
+        captured, self._captured = self._captured, None
+        # 只认本次 sleep 期间抓到的栈（看门狗晚一步抓到的是上一次阻塞，丢弃）
+        captured = captured[1] if captured and captured[0] == beat else None
+        if self.stall_ms <= 0 or (lag_ms < self.stall_ms and captured is None):
+            return
+        # 超过阈值：记到看门狗抓到的位置上（阻塞短于看门狗轮询间隔、没抓到栈时记为"未捕获"）
+        self.stalls += 1
+        site = captured or {"where": "（未捕获，阻塞短于看门狗轮询间隔）", "leaf": "", "stack": ""}
+        entry = self.blockers.setdefault(site["where"], {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+        entry["count"] += 1
+        entry["total_ms"] += lag_ms
+        if lag_ms >= entry["max_ms"]:
+            entry.update(max_ms=lag_ms, leaf=site["leaf"], stack=site["stack"])
+        print(f"🐢 [LoopLag] 事件循环阻塞 {lag_ms:.0f}ms：{site['where']}", flush=True)
+
+    def _watch(self):
+        """看门狗线程：心跳超时即抓取事件循环线程的栈（每次阻塞只抓一次）"""
+        poll = max(0.01, self.stall_ms / 1000 / 2)
+        captured_beat = None
+        while not self._stop.wait(poll):
+            beat = self._beat
+            if beat == captured_beat:
+                continue
+            # 心跳间隔本身包含 interval 的 sleep，超出部分才是阻塞
+            if (time.perf_counter() - beat - self.interval) * 1000 < self.stall_ms:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            site = _blocking_site(frame)
+            del frame
+            captured_beat = beat
+            self._captured = (beat, site)
+            print(f"🐢 [LoopLag] 事件循环已阻塞超过 {self.stall_ms:.0f}ms，当前调用栈：\n{site['stack']}", flush=True)
+
+    def stats(self) -> Dict:
+        values = sorted(self.samples)
+        bounds = [str(b) for b in HISTOGRAM_BUCKETS] + ["+Inf"]
+        top = sorted(self.blockers.items(), key=lambda kv: kv[1]["total_ms"], reverse=True)[:5]
+        return {
+            "samples": self.count,
+            "p50_ms": round(_percentile(values, 50), 1),
+            "p95_ms": round(_percentile(values, 95), 1),
+            "p99_ms": round(_percentile(values, 99), 1),
+            "max_ms": round(self.max_ms, 1),
+            "histogram_ms": dict(zip(bounds, self.histogram)),
+            "stalls": self.stalls,
+            "top_blockers": [
+                {"where": where, "count": b["count"], "total_ms": round(b["total_ms"], 1),
+                 "max_ms": round(b["max_ms"], 1), "leaf": b.get("leaf", "")}
+                for where, b in top
+            ],
+        }
+
+
+# 导出实例供 Agent 调用（同一进程内的多个 Agent 共用）
+loop_monitor = LoopLagMonitor()
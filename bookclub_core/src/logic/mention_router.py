@@ -0,0 +1,128 @@
+"""
+@ 消息路由 + 事件幂等
+
+模块：mention_router.py
+描述：替代 "@content" in user_text 的子串判断，避免两类重复生成：
+    1. 误触发：引用了上一条含 @bc-content 的消息、或 @bc-content-old 之类的前缀重名
+    2. 重复投递：同一事件被网络重新投递时再次触发数分钟、数美元的长生成
+
+MentionRouter：只解析用户本人写下的 @（跳过 > 引用行、代码块和 quoted_text），精确匹配别名
+IdempotencyStore：按事件 ID 去重，带 TTL，检查与写入均为 O(1)
+parse_command：识别"@bc-content 取消"、"重写 Day 2"之类的控制指令（消息以指令开头才算，避免误伤需求正文）
+"""
+
+import re
+import time
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Set, Tuple
+
+# @ 前面不能是字母数字（排除邮箱），名字本身精确到完整 token（排除 @bc-content-old）
+MENTION_RE = re.compile(r"(?<![A-Za-z0-9_.])@([A-Za-z0-9_-]+)")
+_FENCE_RE = re.compile(r"```.*?```", re.S)
+# 本系统各 Agent 的 ID（含多副本后缀，如 bc-content-2）
+_AGENT_ID_RE = re.compile(r"^bc-(?:intake|content|ops)(?:-[A-Za-z0-9_]+)?$", re.I)
+
+# 取消：去掉 @ 和标点后整条消息就是指令词
+_CANCEL_WORDS = {"取消", "取消任务", "取消生成", "停止", "停止生成", "cancel", "stop"}
+_COMMAND_STRIP_RE = re.compile(r"[\s，。,.!！？?]+")
+# 局部重写："重写 Day 2"、"重写第 2 天"、"重写 Part 4.1 语气再轻松些"
+_REWRITE_RE = re.compile(
+    r"^(?:重写|重新生成|rewrite)\s*(?:(?:day\s*|第\s*)(\d+)\s*天?|part\s*(\d+(?:\.\d+)*))\s*[，,：:。]?\s*(.*)$",
+    re.I | re.S,
+)
+
+
+def strip_quoted(text: str, quoted_text: Optional[str] = None) -> str:
+    """去掉引用内容：> 引用行、代码块、以及平台单独给出的 quoted_text"""
+    if quoted_text:
+        text = text.replace(quoted_text, "")
+    text = _FENCE_RE.sub("", text)
+    lines = [line for line in text.split("\n") if not line.lstrip().startswith((">", "＞"))]
+    return "\n".join(lines)
+
+
+def parse_mentions(text: str, quoted_text: Optional[str] = None) -> List[str]:
+    """返回用户本人写下的全部 @ 目标（小写，保持出现顺序）"""
+    return [m.lower() for m in MENTION_RE.findall(strip_quoted(text, quoted_text))]
+
+
+def parse_command(text: str, quoted_text: Optional[str] = None) -> Optional[Tuple[str, Optional[dict]]]:
+    """
+    Returns:
+        ("cancel", None)
+        ("rewrite", {"unit": "day" | "part", "id": "2" | "4.1", "note": 附加要求})
+        不是控制指令时返回 None
+    """
+    body = MENTION_RE.sub("", strip_quoted(text, quoted_text)).strip()
+    word = _COMMAND_STRIP_RE.sub("", body).lower()
+    if word in _CANCEL_WORDS:
+        return "cancel", None
+    match = _REWRITE_RE.match(body)
+    if match:
+        day, part, note = match.groups()
+        unit = {"unit": "day", "id": day} if day else {"unit": "part", "id": part}
+        return "rewrite", {**unit, "note": note.strip()}
+    return None
+
+
+def is_agent_source(source_id: Optional[str]) -> bool:
+    """消息是否由本系统的 Agent 发出（如 intake 的欢迎消息里带着 "@bc-content" 使用示例）"""
+    return bool(source_id) and bool(_AGENT_ID_RE.match(str(source_id)))
+
+
+class MentionRouter:
+    def __init__(self, role_type: str, agent_id: Optional[str] = None, extra_aliases: Iterable[str] = ()):
+        aliases = {f"bc-{role_type}", role_type}
+        if agent_id:
+            aliases.add(str(agent_id).lower())
+        aliases.update(a.lower() for a in extra_aliases)
+        self.agent_id = (agent_id or f"bc-{role_type}").lower()
+        self.aliases: Set[str] = aliases
+
+    def is_for_me(self, text: str, mentioned_agent_id: Optional[str] = None,
+                  quoted_text: Optional[str] = None) -> bool:
+        """
+        以正文里用户本人写的 @ 为准；正文没有任何 @ 时才参考平台给出的 mentioned_agent_id
+        （平台字段可能来自被引用的旧消息）
+        """
+        mentions = parse_mentions(text, quoted_text)
+        if mentions:
+            return any(m in self.aliases for m in mentions)
+        return bool(mentioned_agent_id) and mentioned_agent_id.lower() in self.aliases
+
+
+class IdempotencyStore:
+    """
+    事件 ID 去重表（进程内）
+
+    OrderedDict 按写入时间排序：过期清理只看表头，单次操作均摊 O(1)。
+    """
+
+    def __init__(self, ttl_seconds: float = 3600, max_entries: int = 10000):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self._seen: "OrderedDict[str, float]" = OrderedDict()
+
+    def _expire(self, now: float):
+        while self._seen:
+            key, ts = next(iter(self._seen.items()))
+            if now - ts < self.ttl and len(self._seen) <= self.max_entries:
+                break
+            self._seen.popitem(last=False)
+
+    def check_and_add(self, key: Optional[str]) -> bool:
+        """
+        Returns:
+            True 表示首次出现（应处理），False 表示重复事件（应丢弃）
+        """
+        if not key:
+            return True
+        now = time.time()
+        self._expire(now)
+        if key in self._seen:
+            return False
+        self._seen[key] = now
+        return True
+
+    def __len__(self):
+        return len(self._seen)
@@ -0,0 +1,115 @@
+"""
+结构化大纲 - 逐天生成时每一天只带自己需要的上下文
+
+模块：outline.py
+描述：大纲回复解析为 [{"day", "theme", "description"}]，需求单压缩为一份摘要（每次任务只算一次）。
+    单天 prompt 只包含：需求摘要 + 本天条目 + 前后两天的主题（保证衔接），
+    不再每天重复完整需求单与整份大纲，一次任务的输入 token 随天数只增加一份摘要的长度。
+
+环境变量：
+    INTAKE_SUMMARY_CHARS=1500   需求摘要中自由文本的字数上限（字段行总是保留）
+    INTAKE_FIELD_CHARS=120      单个字段值最多保留的字数
+"""
+
+import os
+import re
+from typing import Dict, List, Optional
+
+INTAKE_SUMMARY_CHARS = int(os.getenv("INTAKE_SUMMARY_CHARS", "1500"))
+INTAKE_FIELD_CHARS = int(os.getenv("INTAKE_FIELD_CHARS", "120"))
+
+# "Day 1：主题 - 描述"，兼容 **加粗**、列表符号、英文冒号、"第1天"、破折号 / 冒号分隔的描述
+_ENTRY_RE = re.compile(
+    r"^[\s>*\-#]*(?:Day\s*(\d+)|第\s*(\d+)\s*天)\s*[*]*\s*[：:]\s*(.+?)\s*$",
+    re.I | re.M,
+)
+_DESCRIPTION_SEP_RE = re.compile(r"\s+[-–—]+\s+|\s*——\s*|\s*[|｜]\s*")
+
+# 需求单里的装饰行与没有内容的字段
+_DECORATION_RE = re.compile(r"^[\s═━─=\-`*]*$|信息收集完成|可传递给|PDF\s*路径")
+_EMPTY_FIELD_RE = re.compile(r"^\s*[-*]?\s*[^：:]{1,20}[：:]\s*$")
+_MENTION_RE = re.compile(r"@bc-[A-Za-z0-9_-]+")
+_FIELD_RE = re.compile(r"^([-*•]?\s*[^：:]{1,20}[：:])\s*(.+)$")
+_SECTION_RE = re.compile(r"^【[^】]+】")
+SUMMARY_TRUNCATED_NOTE = "（需求单较长，以上为摘要：部分字段值与说明已截断）"
+
+
+def _strip_emphasis(text: str) -> str:
+    return text.strip().strip("*_").strip()
+
+
+def parse_outline(outline: str) -> Dict[int, dict]:
+    """
+    解析大纲回复
+
+    Returns:
+        天 -> {"day", "theme", "description"}；同一天出现多次时取第一条
+    """
+    entries: Dict[int, dict] = {}
+    for match in _ENTRY_RE.finditer(outline or ""):
+        day = int(match.group(1) or match.group(2))
+        if day in entries:
+            continue
+        # 先拆主题 / 描述再去强调符号："**Day 1：主题** - 描述" 的 ** 落在主题末尾
+        parts = _DESCRIPTION_SEP_RE.split(match.group(3).strip(), maxsplit=1)
+        theme = _strip_emphasis(parts[0]).strip("[]【】")
+        description = _strip_emphasis(parts[1]).strip("[]") if len(parts) > 1 else ""
+        entries[day] = {"day": day, "theme": theme, "description": description}
+    return entries
+
+
+def format_entry(entry: dict) -> str:
+    line = f"Day {entry['day']}：{entry['theme']}"
+    return f"{line} - {entry['description']}" if entry.get("description") else line
+
+
+def neighbour_context(entries: Dict[int, dict], day: int) -> List[str]:
+    """前一天 / 后一天的主题（只取主题，不带描述），用于承上启下"""
+    lines = []
+    for other, label in ((day - 1, "前一天"), (day + 1, "后一天")):
+        entry = entries.get(other)
+        if entry:
+            lines.append(f"{label}：Day {other}：{entry['theme']}")
+    return lines
+
+
+def summarize_intake(user_text: str, max_chars: int = INTAKE_SUMMARY_CHARS) -> str:
+    """
+    需求单摘要：保留【分组】标题与填写了内容的字段，去掉分隔线、空字段与 @ 提及
+    - 字段行总是保留（产品、转化等靠后的分组也不丢），过长的字段值截到 INTAKE_FIELD_CHARS 字
+    - 自由文本按原顺序保留，累计超过 max_chars 后的不再保留
+    有内容被截断时在末尾注明，让模型知道这是摘要
+    """
+    lines = []
+    free_chars = 0
+    truncated = False
+    for raw in (user_text or "").split("\n"):
+        line = _MENTION_RE.sub("", raw).strip()
+        if not line or _DECORATION_RE.search(line) or _EMPTY_FIELD_RE.match(line):
+            continue
+        if _SECTION_RE.match(line):
+            lines.append(line)
+            continue
+        field = _FIELD_RE.match(line)
+        if field:
+            name, value = field.group(1), field.group(2).strip()
+            if len(value) > INTAKE_FIELD_CHARS:
+                value, truncated = value[:INTAKE_FIELD_CHARS].rstrip() + "…", True
+            lines.append(f"{name}{value}")
+            continue
+        if free_chars + len(line) > max_chars:
+            truncated = True
+            continue
+        free_chars += len(line)
+        lines.append(line)
+    if truncated:
+        lines.append(SUMMARY_TRUNCATED_NOTE)
+    return "\n".join(lines)
+
+
+def outline_topic(entries: Dict[int, dict], day: int, fallback: Optional[str] = None) -> str:
+    """第 day 天的 "主题 - 描述"（PDF 检索与历史逐字稿匹配的查询词）；大纲里没有这一天时用 fallback"""
+    entry = entries.get(day)
+    if entry is None:
+        return fallback or ""
+    return format_entry(entry).split("：", 1)[1]
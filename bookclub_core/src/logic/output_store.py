@@ -0,0 +1,367 @@
+"""
+输出存储 - 按次归档 + 清单 + 内容寻址去重 + 压缩/保留策略
+
+模块：output_store.py
+描述：替代 output/ 下平铺的 {role}_{YYYYmmdd_HHMMSS}[_suffix] 文件：
+      同一秒内的两次保存不会再互相覆盖，目录也不会无限增长。
+
+目录结构：
+    output/runs/index.jsonl                       所有 run 的索引（列表查询只读这一个文件）
+    output/runs/20261019/175038_content_1a2b3c/   每次任务一个目录（按天分片）
+        manifest.json                             输入哈希、文件列表（sha256/大小/耗时）、总耗时
+        content.md / content.docx / content_wechat.txt / content_day1.md ...
+    output/runs/20260901.tar.gz                   过期后压缩的整天分片（可选）
+    output/.blobs/ab/abcdef...                    内容寻址存储：相同内容只占一份磁盘空间
+
+去重方式：run 目录里的文件与 .blobs 中的同内容文件是硬链接（同一 inode）。
+    注意：直接原地修改某个 run 里的文件会影响其他引用同一内容的 run，修改前请先另存一份。
+    不支持硬链接的文件系统上自动退化为不去重。
+
+环境变量：
+    OUTPUT_DIR=output                 输出根目录
+    OUTPUT_DEDUPE=1                   内容去重（0 关闭）
+    OUTPUT_ARCHIVE_AFTER_DAYS=0       超过 N 天的分片压缩为 .tar.gz（0 = 不压缩）
+    OUTPUT_RETENTION_DAYS=0           超过 N 天的 run（含压缩包）直接删除（0 = 永久保留）
+
+命令行：python scripts/outputs.py list | show <run_id> | maintain
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import tarfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows：不加文件锁（多进程同时整理索引时可能丢行）
+    fcntl = None
+
+OUTPUT_ROOT = os.getenv("OUTPUT_DIR", "output")
+
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+@contextmanager
+def _file_lock(path: str, blocking: bool = True):
+    """跨进程文件锁（intake / content / ops 是三个进程，共用同一个 index.jsonl）"""
+    if fcntl is None:
+        yield True
+        return
+    with open(path, "a") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class Run:
+    """一次任务的输出目录（首次写文件时才创建）"""
+
+    def __init__(self, store: "OutputStore", role: str, inputs: str = "", job_id: Optional[str] = None,
+                 channel: Optional[str] = None, requester: Optional[str] = None):
+        now = datetime.now()
+        self.store = store
+        self.day = now.strftime("%Y%m%d")
+        self.run_id = f"{now.strftime('%H%M%S')}_{role}_{uuid.uuid4().hex[:6]}"
+        self.path = os.path.join(store.runs_dir, self.day, self.run_id)
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self.manifest: Dict = {
+            "run_id": self.run_id,
+            "day": self.day,
+            "role": role,
+            "job_id": job_id,
+            "channel": channel,
+            "requester": requester,
+            "inputs_hash": hashlib.sha256(inputs.encode("utf-8")).hexdigest()[:16],
+            "status": "running",
+            "created_at": self.started,
+            "files": [],
+        }
+
+    def file_path(self, name: str) -> str:
+        os.makedirs(self.path, exist_ok=True)
+        return os.path.join(self.path, name)
+
+    def add_file(self, name: str, seconds: float = 0.0) -> dict:
+        """登记已写好的文件：计算哈希、去重、更新清单"""
+        path = os.path.join(self.path, name)
+        sha, deduped = self.store.intern(path)
+        entry = {
+            "name": name,
+            "sha256": sha,
+            "bytes": os.path.getsize(path),
+            "seconds": round(seconds, 4),
+            "deduped": deduped,
+        }
+        with self._lock:
+            self.manifest["files"] = [f for f in self.manifest["files"] if f["name"] != name] + [entry]
+            self._write_manifest()
+        return entry
+
+    def write_text(self, name: str, text: str) -> dict:
+        """写入一个纯文本文件（如需求单、大纲）并登记"""
+        start = time.perf_counter()
+        with open(self.file_path(name), "w", encoding="utf-8") as f:
+            f.write(text)
+        return self.add_file(name, time.perf_counter() - start)
+
+    def link_file(self, src_path: str, name: Optional[str] = None) -> Optional[dict]:
+        """
+        把其他 run 里未改动的文件带进本 run（硬链接，不重新渲染；不支持时复制）
+
+        Returns:
+            清单条目；源文件不存在时返回 None
+        """
+        if not os.path.exists(src_path):
+            return None
+        name = name or os.path.basename(src_path)
+        dst_path = self.file_path(name)
+        try:
+            os.link(src_path, dst_path)
+        except OSError:
+            shutil.copy2(src_path, dst_path)
+        return self.add_file(name)
+
+    def finish(self, status: str = "ok"):
+        with self._lock:
+            self.manifest["status"] = status
+            self.manifest["finished_at"] = time.time()
+            self.manifest["seconds"] = round(self.manifest["finished_at"] - self.started, 2)
+            if not self.manifest["files"]:
+                return  # 没有产出文件的 run 不落盘、不进索引
+            self._write_manifest()
+        self.store._append_index({
+            "run_id": self.run_id,
+            "day": self.day,
+            "role": self.manifest["role"],
+            "job_id": self.manifest["job_id"],
+            "channel": self.manifest["channel"],
+            "requester": self.manifest["requester"],
+            "status": status,
+            "created_at": self.manifest["created_at"],
+            "seconds": self.manifest["seconds"],
+            "files": len(self.manifest["files"]),
+            "bytes": sum(f["bytes"] for f in self.manifest["files"]),
+            "path": self.path,
+        })
+
+    def _write_manifest(self):
+        os.makedirs(self.path, exist_ok=True)
+        tmp_path = os.path.join(self.path, "manifest.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, os.path.join(self.path, "manifest.json"))
+
+
+class OutputStore:
+    def __init__(self, root: str = OUTPUT_ROOT):
+        self.root = root
+        self.runs_dir = os.path.join(root, "runs")
+        self.blobs_dir = os.path.join(root, ".blobs")
+        self.index_path = os.path.join(self.runs_dir, "index.jsonl")
+        self.dedupe = os.getenv("OUTPUT_DEDUPE", "1") != "0"
+        self.archive_after_days = int(os.getenv("OUTPUT_ARCHIVE_AFTER_DAYS", "0"))
+        self.retention_days = int(os.getenv("OUTPUT_RETENTION_DAYS", "0"))
+
+    # ---------- 写入 ----------
+    def new_run(self, role: str, inputs: str = "", job_id: Optional[str] = None,
+                channel: Optional[str] = None, requester: Optional[str] = None) -> Run:
+        return Run(self, role, inputs, job_id, channel, requester)
+
+    @contextmanager
+    def run(self, role: str, inputs: str = "", job_id: Optional[str] = None,
+            channel: Optional[str] = None, requester: Optional[str] = None):
+        """with 块结束时写入最终清单并登记索引（异常时状态为 error，被取消时为 cancelled）"""
+        run = self.new_run(role, inputs, job_id, channel, requester)
+        try:
+            yield run
+        except asyncio.CancelledError:
+            run.finish("cancelled")  # 已写好的文件保留，清单标记为未完成
+            raise
+        except BaseException:
+            run.finish("error")
+            raise
+        run.finish("ok")
+
+    def intern(self, path: str):
+        """
+        把文件放进内容寻址存储
+
+        Returns:
+            (sha256, deduped)：deduped=True 表示已有相同内容，当前文件已替换为指向它的硬链接
+        """
+        sha = _sha256(path)
+        if not self.dedupe:
+            return sha, False
+        blob = os.path.join(self.blobs_dir, sha[:2], sha)
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        try:
+            os.link(path, blob)
+            return sha, False
+        except FileExistsError:
+            tmp_path = f"{path}.lnk"
+            try:
+                os.link(blob, tmp_path)
+                os.replace(tmp_path, path)
+                return sha, True
+            except OSError:
+                return sha, False
+        except OSError:
+            return sha, False  # 文件系统不支持硬链接
+
+    def _append_index(self, record: dict):
+        os.makedirs(self.runs_dir, exist_ok=True)
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with _file_lock(self.index_path + ".lock"):
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    # ---------- 查询 ----------
+    def _read_index(self) -> List[dict]:
+        if not os.path.exists(self.index_path):
+            return []
+        records = []
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+        return records
+
+    def list_runs(self, limit: int = 20, role: Optional[str] = None) -> List[dict]:
+        """最近的 run（只读 index.jsonl，不遍历目录）"""
+        records = self._read_index()
+        if role:
+            records = [r for r in records if r.get("role") == role]
+        return list(reversed(records[-limit:])) if limit else list(reversed(records))
+
+    def find_run(self, role: str, job_id: Optional[str] = None, channel: Optional[str] = None,
+                 requester: Optional[str] = None) -> Optional[dict]:
+        """
+        最近一次可用的 run（未压缩、目录仍在）：给出 job_id 时只看该任务（含其后的修订版），
+        给出 channel / requester 时只看该频道 / 该用户发起的任务
+        """
+        for record in reversed(self._read_index()):
+            if record.get("role") != role or record.get("archived"):
+                continue
+            if job_id and record.get("job_id") != job_id:
+                continue
+            if channel is not None and record.get("channel") != channel:
+                continue
+            if requester is not None and record.get("requester") != requester:
+                continue
+            if record.get("status") in ("ok", "cancelled") and os.path.isdir(record.get("path", "")):
+                return record
+        return None
+
+    def load_manifest(self, run_id: str) -> Optional[dict]:
+        for record in reversed(self._read_index()):
+            if record["run_id"] == run_id:
+                if record.get("archived"):
+                    return {**record, "files": "（已压缩，见 " + record["archived"] + "）"}
+                try:
+                    with open(os.path.join(record["path"], "manifest.json"), "r", encoding="utf-8") as f:
+                        return json.load(f)
+                except (OSError, ValueError):
+                    return record
+        return None
+
+    # ---------- 压缩 / 保留 / 回收 ----------
+    def maintain(self, archive_after_days: Optional[int] = None, retention_days: Optional[int] = None) -> dict:
+        """
+        按天分片整理：过期分片先压缩（可选），超过保留期的直接删除，最后回收无人引用的 blob
+        只看分片目录名（YYYYmmdd），不逐个遍历 run，几千个 run 也很快
+        """
+        archive_after = self.archive_after_days if archive_after_days is None else archive_after_days
+        retention = self.retention_days if retention_days is None else retention_days
+        stats = {"archived": [], "pruned": [], "blobs_freed": 0}
+        if not os.path.isdir(self.runs_dir):
+            return stats
+
+        with _file_lock(os.path.join(self.runs_dir, ".maintain.lock"), blocking=False) as acquired:
+            if not acquired:
+                return stats  # 其他进程正在整理
+
+            today = datetime.now().date()
+            for entry in sorted(os.listdir(self.runs_dir)):
+                day = entry.split(".")[0]
+                try:
+                    age = (today - datetime.strptime(day, "%Y%m%d").date()).days
+                except ValueError:
+                    continue
+                path = os.path.join(self.runs_dir, entry)
+                if retention and age > retention:
+                    if os.path.isdir(path):
+                        shutil.rmtree(path, ignore_errors=True)
+                    else:
+                        os.remove(path)
+                    stats["pruned"].append(day)
+                elif archive_after and age > archive_after and os.path.isdir(path):
+                    archive_path = f"{path}.tar.gz"
+                    with tarfile.open(f"{archive_path}.tmp", "w:gz") as tar:
+                        tar.add(path, arcname=day)
+                    os.replace(f"{archive_path}.tmp", archive_path)
+                    shutil.rmtree(path, ignore_errors=True)
+                    stats["archived"].append(day)
+
+            if stats["archived"] or stats["pruned"]:
+                self._rewrite_index(set(stats["archived"]), set(stats["pruned"]))
+                stats["blobs_freed"] = self.gc_blobs()
+        return stats
+
+    def _rewrite_index(self, archived_days: set, pruned_days: set):
+        with _file_lock(self.index_path + ".lock"):
+            records = []
+            for record in self._read_index():
+                if record.get("day") in pruned_days:
+                    continue
+                if record.get("day") in archived_days:
+                    record["archived"] = os.path.join(self.runs_dir, f"{record['day']}.tar.gz")
+                records.append(record)
+            tmp_path = f"{self.index_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.index_path)
+
+    def gc_blobs(self) -> int:
+        """删除只剩 .blobs 自己引用的内容（硬链接计数为 1）"""
+        freed = 0
+        if not os.path.isdir(self.blobs_dir):
+            return freed
+        for prefix in os.listdir(self.blobs_dir):
+            prefix_dir = os.path.join(self.blobs_dir, prefix)
+            for name in os.listdir(prefix_dir):
+                blob = os.path.join(prefix_dir, name)
+                try:
+                    if os.stat(blob).st_nlink <= 1:
+                        os.remove(blob)
+                        freed += 1
+                except OSError:
+                    continue
+        return freed
+
+
+# 导出实例供 Agent 调用
+output_store = OutputStore()
@@ -0,0 +1,184 @@
+"""
+PDF 本地段落检索 - 页码标注 + BM25 索引
+
+模块：pdf_index.py
+描述：把 data/you_are_what_you_eat.pdf 抽取为带页码的文本块，
+      建立 chunk 级 BM25 索引并持久化到磁盘，只把与当前主题最相关的
+      top-k 段落（附页码）放进 prompt，替代每次调用都附带整本 PDF。
+
+索引文件：data/.index/pdf_bm25.json（按 PDF 的 sha256 校验）
+    - PDF 未变：直接加载，不再抽取
+    - PDF 变了：重新抽取，文本未变的块复用旧的词频统计（增量重建）
+
+依赖：pypdf（可选，未安装时 content 回退为附带整本 PDF）
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+PDF_PATH = "data/you_are_what_you_eat.pdf"
+INDEX_PATH = "data/.index/pdf_bm25.json"
+INDEX_VERSION = 1
+
+CHUNK_SIZE = 400      # 每块字符数
+CHUNK_OVERLAP = 60    # 相邻块重叠字符数（避免一句话被切断后检索不到）
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_CJK_RUN_RE = re.compile(r"[一-鿿]+")
+_WORD_RE = re.compile(r"[A-Za-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """中文按字二元组（bigram）切分，英文/数字按单词切分"""
+    tokens: List[str] = []
+    for run in _CJK_RUN_RE.findall(text):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    tokens.extend(w.lower() for w in _WORD_RE.findall(text))
+    return tokens
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def extract_pages(pdf_path: str) -> List[Tuple[int, str]]:
+    """抽取每页文本，返回 [(页码, 文本)]，页码从 1 开始（与 "PDF P22" 的引用方式一致）"""
+    from pypdf import PdfReader
+
+    reader = PdfReader(pdf_path)
+    pages = []
+    for i, page in enumerate(reader.pages, 1):
+        text = page.extract_text() or ""
+        text = re.sub(r"[ \t]+", " ", text)
+        text = re.sub(r"\n{2,}", "\n", text).strip()
+        if text:
+            pages.append((i, text))
+    return pages
+
+
+def chunk_pages(pages: List[Tuple[int, str]]) -> List[Dict]:
+    chunks = []
+    step = CHUNK_SIZE - CHUNK_OVERLAP
+    for page_no, text in pages:
+        for start in range(0, max(len(text) - CHUNK_OVERLAP, 1), step):
+            piece = text[start:start + CHUNK_SIZE].strip()
+            if piece:
+                chunks.append({"page": page_no, "text": piece})
+    return chunks
+
+
+class PdfPassageIndex:
+    def __init__(self, pdf_path: str = PDF_PATH, index_path: str = INDEX_PATH):
+        self.pdf_path = pdf_path
+        self.index_path = index_path
+        self.pdf_hash: Optional[str] = None
+        self.chunks: List[Dict] = []   # {"page", "text", "h", "tf", "len"}
+        self.postings: Dict[str, List[int]] = {}   # 倒排表：词 → 含该词的块下标
+        self.avg_len = 0.0
+
+    @property
+    def ready(self) -> bool:
+        return bool(self.chunks)
+
+    # ---------- 构建 / 加载 ----------
+    def build_or_load(self) -> "PdfPassageIndex":
+        """同步执行（抽取 PDF 较慢，调用方应放在线程池中）"""
+        pdf_hash = file_sha256(self.pdf_path)
+        old = self._read_index()
+
+        if old and old.get("pdf_hash") == pdf_hash and old.get("version") == INDEX_VERSION:
+            self.chunks = old["chunks"]
+            self.pdf_hash = pdf_hash
+            self._finalize()
+            print(f"✅ [PDF Index] 复用本地索引（{len(self.chunks)} 段）", flush=True)
+            return self
+
+        reused = 0
+        old_tf = {c["h"]: c["tf"] for c in (old or {}).get("chunks", [])}
+        chunks = []
+        for chunk in chunk_pages(extract_pages(self.pdf_path)):
+            h = hashlib.md5(chunk["text"].encode("utf-8")).hexdigest()
+            tf = old_tf.get(h)
+            if tf is None:
+                tf = dict(Counter(tokenize(chunk["text"])))
+            else:
+                reused += 1
+            chunks.append({"page": chunk["page"], "text": chunk["text"], "h": h, "tf": tf, "len": sum(tf.values())})
+
+        self.chunks = chunks
+        self.pdf_hash = pdf_hash
+        self._finalize()
+        self._write_index()
+        print(f"✅ [PDF Index] 索引已重建（{len(chunks)} 段，复用 {reused} 段）", flush=True)
+        return self
+
+    def _finalize(self):
+        postings: Dict[str, List[int]] = {}
+        for i, c in enumerate(self.chunks):
+            for t in c["tf"]:
+                postings.setdefault(t, []).append(i)
+        self.postings = postings
+        self.avg_len = (sum(c["len"] for c in self.chunks) / len(self.chunks)) if self.chunks else 0.0
+
+    def _read_index(self) -> Optional[dict]:
+        if not os.path.exists(self.index_path):
+            return None
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_index(self):
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"version": INDEX_VERSION, "pdf_hash": self.pdf_hash, "chunks": self.chunks},
+                f,
+                ensure_ascii=False,
+            )
+        os.replace(tmp_path, self.index_path)
+
+    # ---------- 检索 ----------
+    def search(self, query: str, k: int = 6) -> List[Dict]:
+        """BM25 检索，返回 top-k 段落（按页码排序，方便模型按书的顺序引用）"""
+        if not self.chunks:
+            return []
+        terms = set(tokenize(query))
+        n = len(self.chunks)
+        scores: Dict[int, float] = {}
+        for t in terms:
+            docs = self.postings.get(t)
+            if not docs:
+                continue
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for i in docs:
+                c = self.chunks[i]
+                f = c["tf"][t]
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * c["len"] / (self.avg_len or 1))
+                scores[i] = scores.get(i, 0.0) + idf * f * (BM25_K1 + 1) / (f + norm)
+
+        scored = [(score, self.chunks[i]) for i, score in scores.items()]
+        scored.sort(key=lambda x: x[0], reverse=True)
+        top = [c for _, c in scored[:k]]
+        return sorted(top, key=lambda c: c["page"])
+
+
+def format_passages(passages: List[Dict]) -> str:
+    """拼成 prompt 片段：每段以【PDF P页码】开头"""
+    return "\n\n".join(f"【PDF P{p['page']}】{p['text']}" for p in passages)
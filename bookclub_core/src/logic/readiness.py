@@ -0,0 +1,88 @@
+"""
+就绪状态跟踪 - 知识库后台预热 + 按需等待
+
+模块：readiness.py
+描述：每个知识组件（rules / nutrition / pdf）对应一个 Future，
+      后台预热完成后标记就绪；只有真正依赖该组件的生成才会等待。
+
+状态同时写入 .health/<agent_id>.json，供 supervisord / 健康检查脚本读取：
+    python scripts/healthcheck.py bc-intake bc-content bc-ops
+"""
+
+import asyncio
+import json
+import os
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+HEALTH_DIR = os.getenv("HEALTH_DIR", ".health")
+
+
+class Readiness:
+    def __init__(self, name: str, components: Iterable[str]):
+        self.name = name
+        self.started_at = time.time()
+        self.components: Dict[str, dict] = {c: {"state": "pending"} for c in components}
+        self._futures: Dict[str, asyncio.Future] = {}
+        # 附加到状态文件里的运行指标：名称 -> 返回 dict 的函数（如事件循环延迟）
+        self.metrics: Dict[str, Callable[[], dict]] = {}
+
+    def _future(self, component: str) -> asyncio.Future:
+        fut = self._futures.get(component)
+        if fut is None:
+            fut = asyncio.get_running_loop().create_future()
+            self._futures[component] = fut
+        return fut
+
+    @property
+    def warm(self) -> bool:
+        return all(c["state"] != "pending" for c in self.components.values())
+
+    def mark(self, component: str, ok: bool = True, detail: str = ""):
+        """标记组件预热结束（失败也算结束，调用方按降级模式继续）"""
+        self.components[component] = {
+            "state": "ready" if ok else "failed",
+            "detail": detail,
+            "elapsed_s": round(time.time() - self.started_at, 2),
+        }
+        fut = self._future(component)
+        if not fut.done():
+            fut.set_result(ok)
+        self.write()
+
+    async def wait(self, component: str, timeout: Optional[float] = None) -> bool:
+        """
+        等待组件就绪
+
+        Returns:
+            True 表示可用；超时或加载失败返回 False（调用方降级处理）
+        """
+        if component not in self.components:
+            return False
+        try:
+            return await asyncio.wait_for(asyncio.shield(self._future(component)), timeout)
+        except asyncio.TimeoutError:
+            print(f"⏱️ [Ready] 等待 {component} 超时（{timeout}s），以降级模式继续", flush=True)
+            return False
+
+    def snapshot(self) -> dict:
+        return {
+            "agent": self.name,
+            "pid": os.getpid(),
+            "warm": self.warm,
+            "started_at": self.started_at,
+            "updated_at": time.time(),
+            "components": self.components,
+            **{name: collect() for name, collect in self.metrics.items()},
+        }
+
+    def write(self):
+        try:
+            os.makedirs(HEALTH_DIR, exist_ok=True)
+            path = os.path.join(HEALTH_DIR, f"{self.name}.json")
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"⚠️ [Ready] 健康状态写入失败: {e}", flush=True)
@@ -0,0 +1,278 @@
+"""
+多副本协调 - 同一个逻辑 Agent（如 bc-content）起 N 个进程分摊任务
+
+模块：replicas.py
+描述：设置 REPLICA_ID 后，同一份 agents/content.yaml 可以启动多个进程：
+      各副本以 bc-content-<REPLICA_ID> 的身份连接网络，但都响应 @bc-content。
+      同一条 @ 会投递给所有副本，由租约保证每个任务只执行一次：
+
+    1. 分配：按事件 ID 在存活副本中做 rendezvous 哈希（一致性哈希的一种，副本增减时只影响
+       该副本名下的任务），首选副本立即认领，其余副本等 REPLICA_STANDBY_DELAY 秒再尝试
+       （首选副本卡住或已下线时由别的副本兜底）
+    2. 认领：以 O_EXCL 创建 output/.leases/<role>/<key>.json，创建成功的副本执行任务
+    3. 续租：执行期间每 TTL/3 秒刷新租约文件的修改时间，结束时写入 done / error
+    4. 接管：没认领到的副本在后台盯着租约，超过 TTL 未刷新（进程崩溃）则接管并重跑
+    5. 存活：每个副本每 TTL/3 秒刷新 members/<role>/<replica>，超过 TTL 未刷新的不参与哈希
+
+租约放在共享目录上（与 output_store 相同的文件锁），适用于同一台机器或挂载同一输出目录的多个进程。
+
+环境变量：
+    REPLICA_ID=                  副本编号（留空 = 单实例，不做任何协调）
+    REPLICA_LEASE_TTL=30         租约 / 存活心跳超时（秒）
+    REPLICA_STANDBY_DELAY=2      非首选副本认领前的等待时间（秒）
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Callable, List, Optional
+
+from src.logic.output_store import OUTPUT_ROOT, _file_lock
+
+LEASE_ROOT = os.path.join(OUTPUT_ROOT, ".leases")
+
+REPLICA_ID = os.getenv("REPLICA_ID", "")
+LEASE_TTL = float(os.getenv("REPLICA_LEASE_TTL", "30"))
+STANDBY_DELAY = float(os.getenv("REPLICA_STANDBY_DELAY", "2"))
+
+# 已结束的租约保留多久（秒）：期间同一事件重新投递也不会再执行
+LEASE_KEEP_SECONDS = 24 * 3600
+
+
+def rendezvous_owner(key: str, members: List[str]) -> Optional[str]:
+    """rendezvous（最高随机权重）哈希：每个副本对 key 打分，分最高者为首选副本"""
+    if not members:
+        return None
+    return max(members, key=lambda m: hashlib.sha1(f"{m}:{key}".encode("utf-8")).digest())
+
+
+class LeaseStore:
+    """文件租约：一个任务一个 JSON 文件，文件修改时间即最近一次续租时间"""
+
+    def __init__(self, root: str = LEASE_ROOT, ttl: float = LEASE_TTL):
+        self.root = root
+        self.ttl = ttl
+
+    def _path(self, role: str, key: str) -> str:
+        name = hashlib.sha1(str(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.root, role, f"{name}.json")
+
+    def read(self, role: str, key: str) -> Optional[dict]:
+        path = self._path(role, key)
+        try:
+            age = time.time() - os.stat(path).st_mtime
+            with open(path, "r", encoding="utf-8") as f:
+                lease = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            lease = {"state": "running"}  # 对方刚创建、还没写完
+            age = 0.0
+        lease["age"] = age
+        return lease
+
+    def _write(self, path: str, lease: dict):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(lease, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def try_acquire(self, role: str, key: str, owner: str) -> bool:
+        """
+        认领任务（没有租约，或租约已过期且未结束时成功）
+
+        Returns:
+            True 表示当前副本持有租约，应执行任务
+        """
+        path = self._path(role, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        lease = {"key": str(key), "owner": owner, "state": "running", "acquired_at": time.time()}
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            pass
+        else:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(lease, f, ensure_ascii=False)
+            return True
+
+        # 已有租约：只有过期未结束的才能接管（加锁，避免两个副本同时接管）
+        with _file_lock(f"{path}.lock"):
+            current = self.read(role, key)
+            if current is not None and (current.get("state") != "running" or current["age"] < self.ttl):
+                return False
+            if current is not None:
+                lease["taken_over_from"] = current.get("owner")
+            self._write(path, lease)
+            return True
+
+    def renew(self, role: str, key: str, owner: str) -> bool:
+        """续租；租约已被别的副本接管时返回 False"""
+        lease = self.read(role, key)
+        if not lease or lease.get("owner") != owner:
+            return False
+        try:
+            os.utime(self._path(role, key))
+            return True
+        except OSError:
+            return False
+
+    def release(self, role: str, key: str, owner: str, state: str = "done"):
+        lease = self.read(role, key)
+        if not lease or lease.get("owner") != owner:
+            return
+        lease.pop("age", None)
+        lease.update(state=state, finished_at=time.time())
+        self._write(self._path(role, key), lease)
+
+    # ---------- 副本存活 ----------
+    def heartbeat(self, role: str, replica: str):
+        path = os.path.join(self.root, "members", role, replica)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(str(os.getpid()))
+
+    def members(self, role: str) -> List[str]:
+        """最近 TTL 秒内有心跳的副本"""
+        member_dir = os.path.join(self.root, "members", role)
+        if not os.path.isdir(member_dir):
+            return []
+        now = time.time()
+        alive = []
+        for name in os.listdir(member_dir):
+            try:
+                if now - os.stat(os.path.join(member_dir, name)).st_mtime < self.ttl:
+                    alive.append(name)
+            except OSError:
+                continue
+        return sorted(alive)
+
+    def gc(self, role: str, max_age: float = LEASE_KEEP_SECONDS) -> int:
+        """删除结束已久的租约文件"""
+        lease_dir = os.path.join(self.root, role)
+        if not os.path.isdir(lease_dir):
+            return 0
+        removed = 0
+        now = time.time()
+        for name in os.listdir(lease_dir):
+            path = os.path.join(lease_dir, name)
+            try:
+                if now - os.stat(path).st_mtime > max_age:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                continue
+        return removed
+
+
+class ReplicaCoordinator:
+    def __init__(self, role: str, replica_id: str = REPLICA_ID, store: Optional[LeaseStore] = None):
+        self.role = role
+        self.replica_id = replica_id
+        self.enabled = bool(replica_id)
+        self.store = store or LeaseStore()
+        self._tasks = set()  # 续租 / 接管任务（持有引用，避免被回收）
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def start(self):
+        """启动存活心跳（on_startup 中调用）"""
+        if self.enabled:
+            self._spawn(self._heartbeat_loop())
+
+    async def _heartbeat_loop(self):
+        beats = 0
+        while True:
+            try:
+                self.store.heartbeat(self.role, self.replica_id)
+                if beats % 1000 == 0:
+                    self.store.gc(self.role)
+            except OSError as e:
+                print(f"⚠️ [Replica] 心跳写入失败: {e}", flush=True)
+            beats += 1
+            await asyncio.sleep(self.store.ttl / 3)
+
+    async def claim(self, key: str) -> bool:
+        """
+        尝试认领任务（单实例模式总是成功）
+
+        Returns:
+            True 表示由当前副本执行
+        """
+        if not self.enabled:
+            return True
+        members = self.store.members(self.role)
+        if self.replica_id not in members:
+            members.append(self.replica_id)
+        if rendezvous_owner(key, members) != self.replica_id:
+            await asyncio.sleep(STANDBY_DELAY)
+        return self.store.try_acquire(self.role, key, self.replica_id)
+
+    def mark_cancelled(self, key: str) -> bool:
+        """
+        排队中的任务被取消：写入 cancelled 租约，之后不再有副本执行它
+        同一条取消指令投递给所有副本，只有写入成功的副本返回 True（由它回复用户）
+        """
+        if not self.enabled:
+            return True
+        if not self.store.try_acquire(self.role, key, self.replica_id):
+            return False
+        self.store.release(self.role, key, self.replica_id, "cancelled")
+        return True
+
+    @contextmanager
+    def hold(self, key: str):
+        """执行期间持续续租；结束时写入 done（异常时为 error，被取消时为 cancelled，均不再被接管）"""
+        if not self.enabled:
+            yield
+            return
+        renew_task = self._spawn(self._renew_loop(key))
+        state = "done"
+        try:
+            yield
+        except asyncio.CancelledError:
+            state = "cancelled"
+            raise
+        except BaseException:
+            state = "error"
+            raise
+        finally:
+            renew_task.cancel()
+            self.store.release(self.role, key, self.replica_id, state)
+
+    async def _renew_loop(self, key: str):
+        while True:
+            await asyncio.sleep(self.store.ttl / 3)
+            if not self.store.renew(self.role, key, self.replica_id):
+                print(f"⚠️ [Replica] 任务 {key} 的租约已被其他副本接管", flush=True)
+                return
+
+    def watch(self, key: str, takeover: Callable[[], Awaitable], can_take: Callable[[], bool] = lambda: True):
+        """
+        盯着别的副本持有的租约：过期未结束时接管，调用 takeover() 重跑任务
+        can_take() 为 False（当前副本没有空闲名额）时先不接管，留给空闲的副本
+        """
+        if not self.enabled:
+            return
+
+        async def _watch():
+            while True:
+                await asyncio.sleep(self.store.ttl / 2)
+                lease = self.store.read(self.role, key)
+                if lease is None or lease.get("state") != "running":
+                    return
+                if lease["age"] < self.store.ttl or not can_take():
+                    continue
+                if self.store.try_acquire(self.role, key, self.replica_id):
+                    print(f"♻️ [Replica] {lease.get('owner')} 已失联，{self.replica_id} 接管任务 {key}", flush=True)
+                    await takeover()
+                    return
+
+        self._spawn(_watch())
@@ -0,0 +1,72 @@
+"""
+局部重写 - 只重新生成某一天 / 某个 Part，拼回已有方案
+
+模块：revisions.py
+描述：在任务话题里回复 "@bc-content 重写 Day 2" 或 "@bc-ops 重写 Part 4.1"：
+    - content：读取该任务 run 目录里保存的需求单与大纲，只为这一天调用一次 LLM，
+      其余天的 .md / .docx / _wechat.txt 直接硬链接进新 run（不重新渲染），再重新合并全文
+    - ops：只重写物料包里对应编号的小节，按标题定位后替换，其余小节原样保留
+    新结果写入一个新的 run（job_id 与原任务相同，manifest 记录 revision_of），
+    同一话题里继续重写时，总是基于最新的修订版。
+
+本模块只负责 Markdown 的定位与拼接，生成仍由 BookClubAgent 完成。
+"""
+
+import re
+from typing import List, Optional, Tuple
+
+REQUEST_FILE = "request.md"
+OUTLINE_FILE = "outline.md"
+
+# 带编号的标题："# Part 4：招募期文案"、"## 4.1 朋友圈文案（17条）"
+_NUMBERED_HEADING_RE = re.compile(r"^(#{1,6})\s*(Part\s*)?(\d+(?:\.\d+)*)(?=[\s：:、.])", re.M | re.I)
+
+
+def find_section(markdown: str, number: str) -> Optional[Tuple[int, int, str]]:
+    """
+    按编号定位小节（从标题行到下一个同级或更高级标题之前）
+    同一编号出现多次时（"# Part 4" 与 Part 1 里的 "### 4."），优先写明 Part 的标题，其次层级最浅的，
+    再其次最靠前的
+
+    Returns:
+        (start, end, 标题行)，找不到时返回 None
+    """
+    candidates = [m for m in _NUMBERED_HEADING_RE.finditer(markdown) if m.group(3) == number]
+    if not candidates:
+        return None
+    match = min(candidates, key=lambda m: (m.group(2) is None, len(m.group(1)), m.start()))
+    level = len(match.group(1))
+    next_heading = re.compile(rf"^#{{1,{level}}}\s", re.M).search(markdown, match.end())
+    end = next_heading.start() if next_heading else len(markdown)
+    line_end = markdown.find("\n", match.start())
+    heading = markdown[match.start():line_end if line_end != -1 else len(markdown)]
+    return match.start(), end, heading.strip()
+
+
+def splice_section(markdown: str, number: str, new_section: str) -> Optional[str]:
+    """用新内容替换编号对应的小节；新内容没带标题时补上原标题"""
+    located = find_section(markdown, number)
+    if located is None:
+        return None
+    start, end, heading = located
+    new_section = new_section.strip()
+    if not _NUMBERED_HEADING_RE.match(new_section):
+        new_section = f"{heading}\n\n{new_section}"
+    return markdown[:start] + new_section + "\n\n" + markdown[end:].lstrip("\n")
+
+
+def section_headings(markdown: str, max_level: int = 2) -> List[str]:
+    """物料包结构（只取 Part / 小节标题），作为局部重写时的上下文"""
+    return [
+        line.strip() for line in markdown.split("\n")
+        if re.match(rf"^#{{1,{max_level}}}\s", line)
+    ]
+
+
+def extract_outline(combined: str) -> str:
+    """旧版 run 没有单独保存大纲时，从合并稿开头（标题与第一条分隔线之间）取回"""
+    head = combined.split("\n---\n", 1)[0]
+    lines = head.split("\n")
+    if lines and lines[0].startswith("# "):
+        lines = lines[1:]
+    return "\n".join(lines).strip()
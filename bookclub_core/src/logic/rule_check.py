@@ -0,0 +1,92 @@
+"""
+膳食规则本地检查 - 在生成结果里找出明显违反 data/dietary_rules.md 定量标准的句子
+
+模块：rule_check.py
+描述：只检查 prompt【约束提醒】里的几条硬性标准，按句子匹配"每天 / 每日 / 一天"语境下的数量：
+        - egg：每天超过 1 个鸡蛋，或建议弃蛋黄 / 只吃蛋白
+        - salt：每天食盐超过 5g
+        - milk：每天奶类超过 500ml
+        - staple：每天主食少于 150g
+        - cholesterol：每天胆固醇超过 200mg（高血脂人群标准）
+      范围写法（"300-500ml"）取上限判断；"不超过 / 以内"之类的限定语只说明这是上限，
+      上限本身超标仍算违规（"胆固醇 300mg 以内"）；"少于 2 个鸡蛋"按最多 1 个计。
+      "不要 / 避免 / 误区"之类的否定句不计。
+      不调用模型，结果用于模型对比（scripts/benchmark_models.py）与人工抽查，不拦截输出。
+"""
+
+import re
+from typing import Dict, List
+
+_SENTENCE_RE = re.compile(r"[^。！？!?\n]+")
+_DAILY_RE = re.compile(r"每天|每日|一天|天天|/天|／天|每顿")
+# 严格小于：个数类（鸡蛋）的上限要减一
+_STRICT_LIMIT_RE = re.compile(r"少于|低于|不到|<|＜")
+# 纠正误区 / 检查清单里的反面说法（"不要每天吃 2 个鸡蛋"、"没有推荐丢弃蛋黄"）
+# "别" 只算劝阻（"别吃"、"别再"），不算 "特别 / 分别 / 区别 / 类别 / 级别" 里的 "别"
+_NEGATION_RE = re.compile(r"不要|不能|不应|不必|不建议|(?<![特分区类级个性识告])别|避免|误区|错误|没有|❌")
+_CN_NUMBERS = {"一": 1, "两": 2, "二": 2, "三": 3, "四": 4, "五": 5, "六": 6}
+_NUMBER = r"(\d+(?:\.\d+)?|[一两二三四五六])"
+_RANGE = r"(\d+(?:\.\d+)?)(?:\s*[-~～至到]\s*(\d+(?:\.\d+)?))?"
+
+_EGG_COUNT_RE = re.compile(_NUMBER + r"\s*[个颗枚只]\s*(?:水煮|煮|炒|荷包)?(?:鸡)?蛋")
+_EGG_COUNT_AFTER_RE = re.compile(r"蛋\s*" + _NUMBER + r"\s*[个颗枚只]")
+_YOLK_RE = re.compile(r"(?<![不别勿])(?:弃|丢弃|丢掉|扔掉|去掉)蛋黄|不吃蛋黄|只吃蛋白|蛋黄不要吃")
+_SALT_RE = re.compile(r"(?:食)?盐[^0-9，,；;]{0,6}?" + _RANGE + r"\s*(?:g|克)(?![a-z])", re.I)
+_SALT_AFTER_RE = re.compile(_RANGE + r"\s*(?:g|克)\s*(?:的)?(?:食)?盐", re.I)
+_MILK_RE = re.compile(r"(?:牛奶|奶类|酸奶|奶)[^0-9，,；;]{0,6}?" + _RANGE + r"\s*(?:ml|毫升)", re.I)
+_MILK_AFTER_RE = re.compile(_RANGE + r"\s*(?:ml|毫升)\s*(?:的)?(?:牛奶|奶类|酸奶|纯奶)", re.I)
+_STAPLE_RE = re.compile(r"主食[^0-9，,；;]{0,6}?" + _RANGE + r"\s*(?:g|克)(?![a-z])", re.I)
+_CHOLESTEROL_RE = re.compile(r"胆固醇[^0-9，,；;]{0,6}?" + _RANGE + r"\s*(?:mg|毫克)", re.I)
+
+RULES = ("egg", "salt", "milk", "staple", "cholesterol")
+
+
+def _number(text: str) -> float:
+    return float(_CN_NUMBERS.get(text, text))
+
+
+def _amounts(pattern, sentence: str):
+    """句中每处数量的 (下限, 上限)"""
+    for match in pattern.finditer(sentence):
+        low = float(match.group(1))
+        high = float(match.group(2)) if match.group(2) else low
+        yield low, high
+
+
+def _sentence_violations(sentence: str) -> List[str]:
+    if _NEGATION_RE.search(sentence):
+        return []
+    if _YOLK_RE.search(sentence):
+        return ["egg"]
+    if not _DAILY_RE.search(sentence):
+        return []
+    strict = 1 if _STRICT_LIMIT_RE.search(sentence) else 0
+    found = []
+    eggs = [*_EGG_COUNT_RE.finditer(sentence), *_EGG_COUNT_AFTER_RE.finditer(sentence)]
+    if any(_number(m.group(1)) - strict > 1 for m in eggs) \
+            and not re.search(r"每周|一周", sentence):
+        found.append("egg")
+    salt = [*_amounts(_SALT_RE, sentence), *_amounts(_SALT_AFTER_RE, sentence)]
+    if any(high > 5 for _, high in salt):
+        found.append("salt")
+    milk = [*_amounts(_MILK_RE, sentence), *_amounts(_MILK_AFTER_RE, sentence)]
+    if any(high > 500 for _, high in milk):
+        found.append("milk")
+    if any(high < 150 for _, high in _amounts(_STAPLE_RE, sentence)):
+        found.append("staple")
+    if any(high > 200 for _, high in _amounts(_CHOLESTEROL_RE, sentence)):
+        found.append("cholesterol")
+    return found
+
+
+def check_rules(text: str) -> List[Dict[str, str]]:
+    """
+    Returns:
+        [{"rule": "egg" | "salt" | ..., "sentence": 原句}, ...]（按出现顺序）
+    """
+    violations = []
+    for match in _SENTENCE_RE.finditer(text or ""):
+        sentence = match.group(0).strip()
+        for rule in _sentence_violations(sentence):
+            violations.append({"rule": rule, "sentence": sentence[:120]})
+    return violations
@@ -0,0 +1,166 @@
+"""
+桩 LLM 后端 - 不联网、不计费，按配置的延迟 / 输出长度 / 错误率返回假回复
+
+模块：stub_llm.py
+描述：接口与 genai.Client 中用到的部分一致（client.aio.models.generate_content、
+      client.models.generate_content、client.files），可直接交给 llm_gateway.set_client()。
+      设置 LLM_BACKEND=stub 时网关自动用它替代 genai.Client，
+      通过 supervisord / openagents agent start 启动的 Agent 进程无需改代码即可接入压测。
+
+回复内容：带 "Day N：" 大纲行和 Markdown 小节的占位文本（generate_content 能正常解析大纲），
+          长度按 STUB_OUTPUT_CHARS 上下浮动，超出 max_output_tokens 时截断并标记 MAX_TOKENS。
+
+环境变量：
+    LLM_BACKEND=stub               启用桩后端（默认 gemini）
+    STUB_LATENCY=lognormal:2:0.5   延迟分布（秒）：fixed:<s> / uniform:<min>:<max> / lognormal:<中位数>:<sigma>
+    STUB_OUTPUT_CHARS=3000         每次回复的平均字数
+    STUB_ERROR_RATE=0              调用失败的概率（0-1），失败时抛出 StubLLMError（模拟 503）
+    STUB_SEED=                     随机种子（留空则每次不同）
+"""
+
+import asyncio
+import math
+import os
+import random
+import time
+import types
+from typing import Optional
+
+# 约 1.5 个中文字符 / token（与 _execute_reasoning 中 max_output_tokens 的估算一致）
+CHARS_PER_TOKEN = 1.5
+
+
+class StubLLMError(RuntimeError):
+    """桩后端按 STUB_ERROR_RATE 注入的失败"""
+
+
+class LatencyDistribution:
+    """
+    延迟分布，格式 "<kind>:<参数>"：
+        fixed:1.5            固定 1.5 秒
+        uniform:0.5:3        0.5-3 秒均匀分布
+        lognormal:2:0.5      中位数 2 秒、sigma 0.5 的对数正态（长尾，最接近真实 API）
+    """
+
+    def __init__(self, spec: str = "lognormal:2:0.5", rng: Optional[random.Random] = None):
+        self.spec = spec
+        self.rng = rng or random.Random()
+        kind, *params = spec.split(":")
+        self.kind = kind.strip().lower()
+        self.params = [float(p) for p in params]
+        expected = {"fixed": 1, "uniform": 2, "lognormal": 2}.get(self.kind)
+        if expected is None or len(self.params) != expected:
+            raise ValueError(f"无法识别的延迟分布: {spec!r}（示例：fixed:1.5 / uniform:0.5:3 / lognormal:2:0.5）")
+
+    def sample(self) -> float:
+        if self.kind == "fixed":
+            return self.params[0]
+        if self.kind == "uniform":
+            return self.rng.uniform(*self.params)
+        median, sigma = self.params
+        return self.rng.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+
+
+class _Response:
+    """与 genai 响应对象中用到的字段一致：text / usage_metadata / candidates[0].finish_reason"""
+
+    def __init__(self, text: str, prompt_tokens: int, finish_reason: str):
+        self.text = text
+        self.usage_metadata = types.SimpleNamespace(
+            prompt_token_count=prompt_tokens,
+            candidates_token_count=int(len(text) / CHARS_PER_TOKEN),
+        )
+        self.candidates = [types.SimpleNamespace(finish_reason=finish_reason)]
+
+
+class StubLLMClient:
+    def __init__(self, latency: str = "lognormal:2:0.5", output_chars: int = 3000,
+                 error_rate: float = 0.0, seed: Optional[int] = None):
+        self.rng = random.Random(seed)
+        self.latency = LatencyDistribution(latency, self.rng)
+        self.output_chars = output_chars
+        self.error_rate = error_rate
+        self.calls = 0
+        self.errors = 0
+        self.aio = types.SimpleNamespace(models=_AsyncModels(self))
+        self.models = _SyncModels(self)
+        self.files = _Files()
+
+    @classmethod
+    def from_env(cls) -> "StubLLMClient":
+        seed = os.getenv("STUB_SEED")
+        return cls(
+            latency=os.getenv("STUB_LATENCY", "lognormal:2:0.5"),
+            output_chars=int(os.getenv("STUB_OUTPUT_CHARS", "3000")),
+            error_rate=float(os.getenv("STUB_ERROR_RATE", "0")),
+            seed=int(seed) if seed else None,
+        )
+
+    def describe(self) -> str:
+        return f"延迟 {self.latency.spec} | 输出约 {self.output_chars} 字 | 错误率 {self.error_rate:.0%}"
+
+    def _plan(self):
+        """一次调用的 (延迟, 是否失败)"""
+        self.calls += 1
+        failed = self.rng.random() < self.error_rate
+        if failed:
+            self.errors += 1
+        return self.latency.sample(), failed
+
+    def _respond(self, contents, config) -> _Response:
+        prompt_chars = sum(len(c) for c in contents if isinstance(c, str)) if isinstance(contents, list) else len(str(contents))
+        target = max(1, int(self.output_chars * self.rng.uniform(0.8, 1.2)))
+        max_tokens = (config or {}).get("max_output_tokens")
+        finish_reason = "STOP"
+        if max_tokens and target > max_tokens * CHARS_PER_TOKEN:
+            target = int(max_tokens * CHARS_PER_TOKEN)
+            finish_reason = "MAX_TOKENS"
+        return _Response(_filler_text(target), int(prompt_chars / CHARS_PER_TOKEN), finish_reason)
+
+
+class _AsyncModels:
+    def __init__(self, client: StubLLMClient):
+        self.client = client
+
+    async def generate_content(self, model, contents, config=None):
+        delay, failed = self.client._plan()
+        await asyncio.sleep(delay)
+        if failed:
+            raise StubLLMError(f"503 UNAVAILABLE（桩后端注入的失败，model={model}）")
+        return self.client._respond(contents, config)
+
+
+class _SyncModels:
+    def __init__(self, client: StubLLMClient):
+        self.client = client
+
+    def generate_content(self, model, contents, config=None):
+        delay, failed = self.client._plan()
+        time.sleep(delay)
+        if failed:
+            raise StubLLMError(f"503 UNAVAILABLE（桩后端注入的失败，model={model}）")
+        return self.client._respond(contents, config)
+
+
+class _Files:
+    """文件接口：上传 / 复用总是成功（桩后端不读取文件内容）"""
+
+    def upload(self, file=None, **kwargs):
+        return types.SimpleNamespace(name=f"files/stub-{os.path.basename(str(file))}")
+
+    def get(self, name: str = "", **kwargs):
+        return types.SimpleNamespace(name=name)
+
+
+_FILLER_LINE = "这是桩后端生成的占位内容，用于压测流水线的调度、渲染与保存开销。"
+
+
+def _filler_text(chars: int) -> str:
+    """带大纲行与 Markdown 小节的占位文本，截断到 chars 字"""
+    head = "\n".join(f"Day {d}：主题 {d} - 占位" for d in range(1, 8))
+    body = [head, ""]
+    section = 1
+    while sum(len(line) + 1 for line in body) < chars:
+        body += [f"## {section}. 小节 {section}", "", _FILLER_LINE * 3, ""]
+        section += 1
+    return "\n".join(body)[:chars]
@@ -0,0 +1,173 @@
+"""
+结构化追踪 - 流水线各阶段的 Span（OpenTelemetry 兼容格式）
+
+模块：tracing.py
+描述：替代 print 计时，记录 @ 接单 → 大纲 → 每天 → 每次 LLM 调用 → 每种格式保存 → 每条频道回复
+      的耗时与父子关系，导出为本地 JSONL（每行一个 span，字段与 OTLP JSON 对齐）。
+
+用法：
+    from src.logic.tracing import tracer, debug
+
+    with tracer.job(job_id, "mention.receive", role="content"):
+        with tracer.span("content.outline"):
+            ...
+
+    debug(lambda: f"payload={payload}")   # 仅在 DEBUG 级别且被采样时才格式化
+
+汇总：python scripts/trace_summary.py output/traces/spans.jsonl
+
+环境变量：
+    TRACE_ENABLED=0          关闭追踪
+    TRACE_DIR=output/traces  导出目录
+    BOOKCLUB_LOG_LEVEL=DEBUG 打开调试日志（默认 INFO，调试日志零开销）
+    BOOKCLUB_DEBUG_SAMPLE=0.1 调试日志采样比例
+"""
+
+import contextvars
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Union
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("bookclub_span", default=None)
+
+_LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40}
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "job_id", "name", "start_ns", "end_ns", "attributes", "status", "error",
+                 "service")
+
+    def __init__(self, name: str, trace_id: str, job_id: str, parent_id: Optional[str], attributes: Dict[str, Any],
+                 service: Optional[str] = None):
+        self.name = name
+        self.service = service
+        self.trace_id = trace_id
+        self.job_id = job_id
+        self.parent_id = parent_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes
+        self.status = "OK"
+        self.error = ""
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_otlp(self, service: str) -> dict:
+        attributes = {"job.id": self.job_id, **self.attributes}
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "kind": "SPAN_KIND_INTERNAL",
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in attributes.items()],
+            "status": {"code": f"STATUS_CODE_{self.status}", "message": self.error},
+            "resource": {"service.name": service},
+        }
+
+
+def _otlp_value(v: Any) -> dict:
+    if isinstance(v, bool):
+        return {"boolValue": v}
+    if isinstance(v, int):
+        return {"intValue": str(v)}
+    if isinstance(v, float):
+        return {"doubleValue": v}
+    return {"stringValue": str(v)}
+
+
+class Tracer:
+    def __init__(self):
+        self.enabled = os.getenv("TRACE_ENABLED", "1") != "0"
+        self.trace_dir = os.getenv("TRACE_DIR", os.path.join("output", "traces"))
+        self.service = "bookclub"
+        self._lock = threading.Lock()
+        self._file = None
+
+    def configure(self, service: str):
+        self.service = service
+
+    @contextmanager
+    def job(self, job_id: str, name: str, service: Optional[str] = None, **attributes):
+        """
+        开启一个新任务的根 span（每次 @ 接单一个 trace）
+
+        Args:
+            service: 该 trace 的服务名（同一进程托管多个 Agent 时按 Agent 区分，默认取 configure() 的值）
+        """
+        span = Span(name, uuid.uuid4().hex, str(job_id), None, attributes, service=service)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status, span.error = "ERROR", repr(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            self._finish(span)
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """在当前 span 下开启子 span（没有父 span 时退化为空操作）"""
+        parent = _current_span.get()
+        if parent is None or not self.enabled:
+            yield None
+            return
+        span = Span(name, parent.trace_id, parent.job_id, parent.span_id, attributes, service=parent.service)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status, span.error = "ERROR", repr(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            self._finish(span)
+
+    def current(self) -> Optional[Span]:
+        return _current_span.get()
+
+    def _finish(self, span: Span):
+        span.end_ns = time.time_ns()
+        if not self.enabled:
+            return
+        line = json.dumps(span.to_otlp(span.service or self.service), ensure_ascii=False)
+        with self._lock:
+            try:
+                if self._file is None:
+                    os.makedirs(self.trace_dir, exist_ok=True)
+                    self._file = open(os.path.join(self.trace_dir, "spans.jsonl"), "a", encoding="utf-8", buffering=1)
+                self._file.write(line + "\n")
+            except OSError as e:
+                print(f"⚠️ [Trace] span 写入失败: {e}", flush=True)
+
+
+# ---------- 分级 + 采样日志 ----------
+_log_level = _LEVELS.get(os.getenv("BOOKCLUB_LOG_LEVEL", "INFO").upper(), 20)
+_debug_sample = float(os.getenv("BOOKCLUB_DEBUG_SAMPLE", "1.0"))
+
+
+def debug(message: Union[str, Callable[[], str]]):
+    """
+    调试日志：默认 INFO 级别下直接返回（传入 lambda 时连字符串都不会格式化）
+    DEBUG 级别下按 BOOKCLUB_DEBUG_SAMPLE 采样输出
+    """
+    if _log_level > 10:
+        return
+    if _debug_sample < 1.0 and random.random() >= _debug_sample:
+        return
+    text = message() if callable(message) else message
+    print(f"🔔 [DEBUG] {text}", flush=True)
+
+
+# 导出实例供 Agent 调用
+tracer = Tracer()
@@ -24,6 +24,9 @@ INTAKE_INSTRUCTION = """
 【工具调用协议】
 当你需要查询食物营养成分时，必须调用工具。
 格式：tool: query_food({"food_name": "食物名"})
+需要查询多种食物时，请在同一条回复中一次列出全部调用（每行一个），不要分多轮查询：
+tool: query_food({"food_name": "鸡蛋"})
+tool: query_food({"food_name": "牛奶"})
 
 【输出要求】
 你的回复必须包含三个清晰的部分：
@@ -1,12 +1,17 @@
-import pandas as pd
 import os
-from typing import Dict, Any
+from typing import Dict, Any, List
 
 class FoodNutritionLookup:
     def __init__(self, excel_path: str):
         self.excel_path = excel_path
         self.data: Dict[str, Dict[str, Any]] = {}
-        self._load_data()
+        # 懒加载：首次查询时才导入 pandas 并读取整张工作簿，import 本模块不再有开销
+        self._loaded = False
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self._loaded = True
+            self._load_data()
 
     def _load_data(self):
         """针对实际表头优化的加载逻辑"""
@@ -15,6 +20,8 @@ class FoodNutritionLookup:
             return
 
         try:
+            import pandas as pd
+
             # 1. 读取 Excel
             # 如果你的 Excel 开头有几行是标题或说明，请修改 header=0 为对应的行数
             df = pd.read_excel(self.excel_path, header=0)
@@ -40,6 +47,7 @@ class FoodNutritionLookup:
 
     def query(self, food_name: str) -> str:
         """Agent 调用接口，增加名称预处理"""
+        self._ensure_loaded()
         # 预处理搜索词：去除用户输入可能带有的空格
         clean_query = str(food_name).replace(" ", "").strip()
         
@@ -56,5 +64,9 @@ class FoodNutritionLookup:
         
         return f"抱歉，本地成分表中未找到关于‘{food_name}’的数据。"
 
+    def query_many(self, food_names: List[str]) -> Dict[str, str]:
+        """批量查询：一次回复中的多个 query_food 调用合并到这里执行"""
+        return {name: self.query(name) for name in dict.fromkeys(food_names)}
+
 # 实例化
 nutrition_tool = FoodNutritionLookup("data/nutrition.xlsx")
\ No newline at end of file
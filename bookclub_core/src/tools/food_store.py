@@ -0,0 +1,281 @@
+"""
+食物营养库 - 统一速查表与成分表，按需截取
+
+模块：food_store.py
+描述：把 data/nutrition_reference.md（整理过的常用食物速查表）和
+      data/nutrition.xlsx（中国食物成分表，1285 种）合并为一个带索引的食物库，
+      用字典树在大纲 / 当天主题 / 书中段落里做最长匹配，找出被提到的食物，
+      每次 prompt 只附带这些食物的紧凑表格，prompt 大小不再随食物表增长。
+
+合并规则：同名食物以速查表为准（人工整理过），成分表补充其余食物；
+         "鸡蛋(均值)"、"稻米(粳米)" 之类的名称会额外登记去掉括号后的别名。
+         两个来源的列名写法不同（"蛋白质(g)" / "蛋白质"），出表时按去掉单位后的列名对齐。
+
+缓存：data/.index/food_store.json（按两个源文件的大小 + 修改时间校验，未变时不再读 Excel）
+"""
+
+import json
+import os
+import re
+from typing import Dict, List, Optional
+
+REFERENCE_PATH = "data/nutrition_reference.md"
+EXCEL_PATH = "data/nutrition.xlsx"
+CACHE_PATH = "data/.index/food_store.json"
+CACHE_VERSION = 1
+
+# 表格优先展示的营养素列（按顺序取源数据里存在的列）
+PREFERRED_COLUMNS = [
+    "能量", "蛋白质", "脂肪", "碳水化合物", "膳食纤维", "胆固醇", "钠", "钙", "铁", "钾", "维生素C", "维生素A",
+]
+MAX_COLUMNS = 8
+MIN_ALIAS_LEN = 2  # 去括号 / 拆分得到的单字别名误匹配太多；原名本身是单字（如"盐"）的保留
+# 单字食物名出现在这些词里时不算提到该食物（"血糖" 里的 "糖"、"方面" 里的 "面"）
+SINGLE_CHAR_EXCLUDES = {
+    "血糖", "糖尿", "糖化", "糖耐", "糖原", "糖皮", "盐酸", "酒精", "油脂", "加油",
+    "方面", "面对", "面临", "表面", "全面", "面积", "面前", "面子", "厘米", "毫米", "水平", "水肿",
+}
+
+_TABLE_SEP_RE = re.compile(r"^\|?[\s\-:|]+\|?$")
+_BULLET_RE = re.compile(r"^[-*]\s*\**([^：:*]+?)\**\s*[：:]\s*(.+)$")
+_PAREN_RE = re.compile(r"[（(].*?[）)]")
+_UNIT_RE = re.compile(r"^(.+?)\s*[（(]\s*([^（()）]*?)\s*[）)]\s*$")
+
+
+def _file_signature(path: str) -> Optional[list]:
+    try:
+        st = os.stat(path)
+        return [st.st_size, int(st.st_mtime)]
+    except OSError:
+        return None
+
+
+def _clean_name(name: str) -> str:
+    return str(name).replace(" ", "").replace("*", "").strip()
+
+
+def split_unit(column: str):
+    """列名拆成 (营养素, 单位)："蛋白质(g)" → ("蛋白质", "g")；没有单位时单位为空"""
+    match = _UNIT_RE.match(column)
+    if match:
+        return match.group(1), match.group(2)
+    return column, ""
+
+
+def parse_reference_markdown(text: str) -> Dict[str, Dict[str, str]]:
+    """
+    解析速查表：支持 Markdown 表格（第一列为食物名）和 "- 食物：说明" 列表两种写法
+    """
+    foods: Dict[str, Dict[str, str]] = {}
+    header: Optional[List[str]] = None
+    for raw in text.split("\n"):
+        line = raw.strip()
+        if line.startswith("|"):
+            cells = [c.strip() for c in line.strip("|").split("|")]
+            if _TABLE_SEP_RE.match(line):
+                continue
+            if header is None:
+                header = [_clean_name(c) for c in cells]
+                continue
+            name = _clean_name(cells[0]) if cells else ""
+            if name:
+                foods[name] = {h: c for h, c in zip(header[1:], cells[1:]) if h and c}
+            continue
+        header = None  # 表格结束
+        match = _BULLET_RE.match(line)
+        if match:
+            name = _clean_name(match.group(1))
+            if name and len(name) <= 12:
+                foods.setdefault(name, {"说明": match.group(2).strip()})
+    return foods
+
+
+def load_excel_foods(excel_path: str) -> Dict[str, Dict[str, str]]:
+    """复用成分表工具的读取逻辑（pandas 仅在这里、且只在缓存失效时导入）"""
+    from src.tools.excel_handler import FoodNutritionLookup
+
+    lookup = FoodNutritionLookup(excel_path)
+    lookup._ensure_loaded()
+    foods = {}
+    for name, row in lookup.data.items():
+        fields = {}
+        for key, value in row.items():
+            if value is None or value != value or str(key).startswith("Unnamed") or key == "序号":  # NaN
+                continue
+            fields[str(key)] = str(value)
+        foods[_clean_name(name)] = fields
+    return foods
+
+
+class FoodStore:
+    def __init__(self, reference_path: str = REFERENCE_PATH, excel_path: str = EXCEL_PATH,
+                 cache_path: str = CACHE_PATH):
+        self.reference_path = reference_path
+        self.excel_path = excel_path
+        self.cache_path = cache_path
+        self.foods: Dict[str, dict] = {}      # 名称 → {"source", "fields"}
+        self.aliases: Dict[str, str] = {}     # 别名 → 名称
+        self._trie: dict = {}
+
+    @property
+    def ready(self) -> bool:
+        return bool(self.foods)
+
+    def __len__(self):
+        return len(self.foods)
+
+    # ---------- 构建 / 加载 ----------
+    def build_or_load(self) -> "FoodStore":
+        """同步执行（首次读取 Excel 较慢，调用方应放在线程池中）"""
+        signature = {
+            "version": CACHE_VERSION,
+            "reference": _file_signature(self.reference_path),
+            "excel": _file_signature(self.excel_path),
+        }
+        if signature["reference"] is None and signature["excel"] is None:
+            return self
+
+        cached = self._read_cache()
+        if cached and cached.get("signature") == signature:
+            self.foods = cached["foods"]
+            self._build_index()
+            print(f"✅ [FoodStore] 复用食物库缓存（{len(self.foods)} 种）", flush=True)
+            return self
+
+        foods: Dict[str, dict] = {}
+        if signature["excel"] is not None:
+            try:
+                for name, fields in load_excel_foods(self.excel_path).items():
+                    foods[name] = {"source": "xlsx", "fields": fields}
+            except Exception as e:
+                print(f"⚠️ [FoodStore] 成分表读取失败（{e}），仅使用速查表", flush=True)
+        if signature["reference"] is not None:
+            with open(self.reference_path, "r", encoding="utf-8") as f:
+                for name, fields in parse_reference_markdown(f.read()).items():
+                    foods[name] = {"source": "reference", "fields": fields}  # 速查表优先
+
+        self.foods = foods
+        self._build_index()
+        self._write_cache(signature)
+        print(f"✅ [FoodStore] 食物库已构建（{len(foods)} 种）", flush=True)
+        return self
+
+    def _build_index(self):
+        def priority(name):
+            # 同一别名对应多个食物时：速查表优先，其次名称最短（"鸡蛋" 优先于 "鸡蛋(红皮)"）
+            return (self.foods[name]["source"] != "reference", len(name))
+
+        aliases: Dict[str, str] = {}
+        for name in self.foods:
+            base = _PAREN_RE.sub("", name)
+            candidates = {name, base, *re.split(r"[，,、/]", base)}
+            for alias in candidates:
+                alias = alias.strip()
+                if len(alias) < MIN_ALIAS_LEN and alias != name:
+                    continue
+                current = aliases.get(alias)
+                if current is None or priority(name) < priority(current):
+                    aliases[alias] = name
+        self.aliases = aliases
+
+        trie: dict = {}
+        for alias in aliases:
+            node = trie
+            for ch in alias:
+                node = node.setdefault(ch, {})
+            node[""] = alias  # 终止标记
+        self._trie = trie
+
+    def _read_cache(self) -> Optional[dict]:
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_cache(self, signature: dict):
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp_path = f"{self.cache_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"signature": signature, "foods": self.foods}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"⚠️ [FoodStore] 缓存写入失败: {e}", flush=True)
+
+    # ---------- 提及抽取 ----------
+    def extract(self, text: str, limit: int = 0) -> List[str]:
+        """
+        字典树最长匹配：返回文本中提到的食物（按首次出现顺序、去重）
+        耗时只与文本长度和最长食物名有关，与食物库大小无关
+        """
+        found: Dict[str, None] = {}
+        trie = self._trie
+        i, n = 0, len(text)
+        while i < n:
+            node = trie.get(text[i])
+            if node is None:
+                i += 1
+                continue
+            j, match_end, match = i + 1, 0, None
+            while True:
+                if "" in node:
+                    match_end, match = j, node[""]
+                if j >= n:
+                    break
+                node = node.get(text[j])
+                if node is None:
+                    break
+                j += 1
+            if match is None or (len(match) == 1 and self._inside_word(text, i)):
+                i += 1
+                continue
+            found.setdefault(self.aliases[match], None)
+            if limit and len(found) >= limit:
+                break
+            i = match_end
+        return list(found)
+
+    @staticmethod
+    def _inside_word(text: str, i: int) -> bool:
+        """位置 i 的单字是否属于 SINGLE_CHAR_EXCLUDES 里的词"""
+        return text[max(i - 1, 0):i + 1] in SINGLE_CHAR_EXCLUDES or text[i:i + 2] in SINGLE_CHAR_EXCLUDES
+
+    # ---------- 输出 ----------
+    def table(self, names: List[str]) -> str:
+        """
+        紧凑 Markdown 表格（列取这些食物共有的常用营养素，最多 MAX_COLUMNS 列）
+        列按去掉单位后的营养素名对齐；各行单位一致时单位写在表头，不一致时写在每个数值后面
+        """
+        rows = []
+        for name in names:
+            if name not in self.foods:
+                continue
+            values = {}
+            for key, value in self.foods[name]["fields"].items():
+                nutrient, unit = split_unit(key)
+                values.setdefault(nutrient, (value, unit))
+            rows.append((name, values))
+        if not rows:
+            return ""
+        present = {key for _, values in rows for key in values}
+        columns = [c for c in PREFERRED_COLUMNS if c in present]
+        if not columns:
+            columns = list(dict.fromkeys(key for _, values in rows for key in values))
+        columns = columns[:MAX_COLUMNS]
+
+        headers, per_cell = [], []
+        for column in columns:
+            units = {values[column][1] for _, values in rows if column in values}
+            shared = units.pop() if len(units) == 1 else None
+            headers.append(f"{column}({shared})" if shared else column)
+            per_cell.append(shared is None)
+
+        lines = ["| 食物 | " + " | ".join(headers) + " |", "|" + "---|" * (len(columns) + 1)]
+        for name, values in rows:
+            cells = []
+            for column, with_unit in zip(columns, per_cell):
+                value, unit = values.get(column, ("-", ""))
+                cells.append(f"{value}{unit}" if with_unit and value != "-" else value)
+            lines.append(f"| {name} | " + " | ".join(cells) + " |")
+        return "\n".join(lines)
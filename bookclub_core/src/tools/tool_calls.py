@@ -0,0 +1,113 @@
+"""
+工具调用协议 - 一次回复中的多工具批量解析与执行
+
+协议（写在 system prompt 中）：
+    tool: query_food({"food_name": "鸡蛋"})
+    tool: query_food({"food_name": "牛奶"})
+
+一条模型回复里可以出现任意多行调用。解析器逐个用 JSON 解码参数
+（不再依赖 find("{") / rfind("}")），执行器按工具名分组批量执行，
+多组之间并发（工具变成 I/O 型时同样适用），结果一次性回传给模型，
+N 种食物只需 1 次额外往返。
+"""
+
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple
+
+TOOL_CALL_RE = re.compile(r"tool:\s*([A-Za-z_]\w*)\s*\(")
+
+_decoder = json.JSONDecoder()
+
+
+class ToolCall(NamedTuple):
+    name: str
+    args: Dict[str, Any]
+
+
+def parse_tool_calls(text: str) -> List[ToolCall]:
+    """从模型回复中解析出全部工具调用（参数不合法的调用会被跳过）"""
+    calls: List[ToolCall] = []
+    if not text or "tool:" not in text:
+        return calls
+
+    for match in TOOL_CALL_RE.finditer(text):
+        pos = match.end()
+        while pos < len(text) and text[pos].isspace():
+            pos += 1
+        try:
+            args, _ = _decoder.raw_decode(text, pos)
+        except ValueError:
+            continue
+        if isinstance(args, dict):
+            calls.append(ToolCall(match.group(1), args))
+    return calls
+
+
+def _query_food_batch(args_list: List[Dict[str, Any]]) -> List[str]:
+    from src.tools.excel_handler import nutrition_tool
+
+    # 没有食物名的调用不查表（空字符串会模糊匹配到表里第一种食物）
+    names = [str(a.get("food_name") or "").strip() for a in args_list]
+    results = nutrition_tool.query_many([n for n in names if n]) if any(names) else {}
+    return [results[n] if n else "工具 query_food 参数错误：缺少 food_name" for n in names]
+
+
+# 工具名 → 批量执行函数（输入参数列表，返回与之对齐的结果列表）
+TOOL_REGISTRY: Dict[str, Callable[[List[Dict[str, Any]]], List[str]]] = {
+    "query_food": _query_food_batch,
+}
+
+
+def run_tool_calls(calls: List[ToolCall], max_workers: int = 4) -> List[Tuple[ToolCall, str]]:
+    """
+    批量执行工具调用
+
+    - 完全相同的调用只执行一次
+    - 同名工具合并为一次批量调用，不同工具之间并发执行
+    - 返回去重后的 (调用, 结果) 列表，保持首次出现的顺序
+    """
+    unique: List[ToolCall] = []
+    seen = set()
+    for call in calls:
+        key = (call.name, json.dumps(call.args, sort_keys=True, ensure_ascii=False))
+        if key not in seen:
+            seen.add(key)
+            unique.append(call)
+
+    groups: Dict[str, List[int]] = {}
+    for idx, call in enumerate(unique):
+        groups.setdefault(call.name, []).append(idx)
+
+    def run_group(name: str, indices: List[int]) -> List[str]:
+        handler = TOOL_REGISTRY.get(name)
+        if handler is None:
+            return [f"未知工具：{name}"] * len(indices)
+        try:
+            return handler([unique[i].args for i in indices])
+        except Exception as e:
+            return [f"工具 {name} 执行失败：{e}"] * len(indices)
+
+    results: List[str] = [""] * len(unique)
+    if len(groups) == 1:
+        name, indices = next(iter(groups.items()))
+        for i, result in zip(indices, run_group(name, indices)):
+            results[i] = result
+    elif groups:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(groups))) as pool:
+            futures = {name: pool.submit(run_group, name, indices) for name, indices in groups.items()}
+            for name, future in futures.items():
+                for i, result in zip(groups[name], future.result()):
+                    results[i] = result
+
+    return list(zip(unique, results))
+
+
+def format_tool_results(results: List[Tuple[ToolCall, str]]) -> str:
+    """把批量结果拼成一条回传消息"""
+    lines = []
+    for i, (call, result) in enumerate(results, 1):
+        args = json.dumps(call.args, ensure_ascii=False)
+        lines.append(f"{i}. {call.name}({args}) → {result}")
+    return "\n".join(lines)
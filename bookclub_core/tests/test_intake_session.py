@@ -0,0 +1,30 @@
+import os
+
+from src.logic.intake_session import IntakeSessionStore, render_request, session_key
+
+COMPLETE = {"身份": "注册营养师", "专业特长": "临床营养", "风格偏好": "温情亲切", "交付周期": "3天"}
+
+
+def test_render_request_complete():
+    assert "✅ 信息收集完成" in render_request(COMPLETE)
+
+
+def test_render_request_lists_missing_fields():
+    text = render_request({"身份": "注册营养师"})
+    assert "信息收集完成" not in text
+    assert "专业特长、风格偏好、交付周期" in text
+
+
+def test_sessions_are_scoped_by_thread(tmp_path):
+    store = IntakeSessionStore(os.path.join(tmp_path, "sessions.sqlite"))
+    first, second = session_key("ch", "alice", "m1"), session_key("ch", "alice", "m2")
+    store.link(first, "m1")
+    store.save({**store.open(first), "fields": {"身份": "营养师"}})
+    store.link(second, "m2")
+    store.save(store.open(second))
+
+    assert store.resolve("ch", "alice", "m1") == first
+    assert store.resolve("ch", "alice", "m2") == second
+    # 回复没登记过的消息（Agent 的追问）：归到该用户在本频道最近的会话
+    assert store.resolve("ch", "alice", "bot-reply") == second
+    assert store.resolve("ch", "bob", "m1") == session_key("ch", "bob", "m1")
@@ -0,0 +1,53 @@
+import asyncio
+
+from src.logic.jobs import Job, JobRegistry
+
+
+def test_find_is_scoped_to_thread_and_sender():
+    async def scenario():
+        jobs = JobRegistry(concurrency=1)
+        block = asyncio.Event()
+        running = jobs.submit(Job("e1", channel="ch", source_id="alice"), block.wait)
+        queued = jobs.submit(Job("e2", channel="ch", source_id="", thread_ids=("m2",)), block.wait)
+        await asyncio.sleep(0)
+
+        assert jobs.find(thread_id="m2", channel="ch", source_id="bob") is queued
+        # 话题里没有任务：不退回到频道内其他任务
+        assert jobs.find(thread_id="old", channel="ch", source_id="alice") is None
+        # 没有话题：只取该用户的任务（source_id 为空的任务不当作通配）
+        assert jobs.find(channel="ch", source_id="alice") is running
+        assert jobs.find(channel="ch", source_id="bob") is None
+
+        block.set()
+        await asyncio.gather(running.task, queued.task)
+
+    asyncio.run(scenario())
+
+
+def test_cancel_before_start_marks_job_cancelled():
+    async def scenario():
+        jobs = JobRegistry(concurrency=1)
+        job = jobs.submit(Job("e1"), asyncio.Event().wait)
+        assert jobs.cancel(job)
+        await asyncio.wait({job.task})
+        assert job.state == "cancelled" and not job.active
+
+    asyncio.run(scenario())
+
+
+def test_submit_ignores_duplicate_active_job():
+    async def scenario():
+        jobs = JobRegistry(concurrency=1)
+        block = asyncio.Event()
+        first = jobs.submit(Job("e1"), block.wait)
+        calls = []
+
+        async def second_run():
+            calls.append(1)
+
+        assert jobs.submit(Job("e1"), second_run) is first
+        assert jobs.cancel(first)
+        await asyncio.wait({first.task})
+        assert first.state == "cancelled" and not calls
+
+    asyncio.run(scenario())
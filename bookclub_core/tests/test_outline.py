@@ -0,0 +1,30 @@
+from src.logic.outline import SUMMARY_TRUNCATED_NOTE, parse_outline, summarize_intake
+
+
+def test_bold_entry_with_description():
+    entries = parse_outline("**Day 1：营养的真相** - 认识食物\n- Day 2：**控糖** —— *少吃精制糖*")
+    assert entries[1]["theme"] == "营养的真相"
+    assert entries[1]["description"] == "认识食物"
+    assert entries[2]["theme"] == "控糖"
+    assert entries[2]["description"] == "少吃精制糖"
+
+
+def test_chinese_day_label_without_description():
+    entries = parse_outline("第3天：【睡眠与代谢】")
+    assert entries[3] == {"day": 3, "theme": "睡眠与代谢", "description": ""}
+
+
+def test_intake_summary_keeps_late_sections():
+    text = "\n".join(
+        ["【INTAKE 输出】", "【主理人信息】", "- 身份：注册营养师", "背景说明" * 400,
+         "【产品信息】", "- 产品名称：益生菌", "- 核心功效：" + "调节肠道" * 100, "【转化目标】", "- 目标：30 人下单"]
+    )
+    summary = summarize_intake(text, max_chars=200)
+    assert "- 产品名称：益生菌" in summary
+    assert "- 目标：30 人下单" in summary
+    assert "背景说明" not in summary
+    assert summary.endswith(SUMMARY_TRUNCATED_NOTE)
+
+
+def test_short_intake_summary_has_no_note():
+    assert SUMMARY_TRUNCATED_NOTE not in summarize_intake("【书籍信息】\n- 书名：《你是你吃出来的》")
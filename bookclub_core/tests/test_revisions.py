@@ -0,0 +1,54 @@
+from src.logic.revisions import find_section, splice_section
+
+OPS_DOC = """# 读书会物料包
+
+# Part 1：主理人手册
+
+### 4. 答疑话术
+
+Part 1 里的第 4 小节
+
+# Part 4：招募期文案
+
+## 4.1 朋友圈文案
+
+原朋友圈文案
+
+## 4.2 社群公告
+
+原社群公告
+
+# Part 5：结营
+"""
+
+
+def test_part_heading_wins_over_nested_same_number():
+    start, end, heading = find_section(OPS_DOC, "4")
+    assert heading == "# Part 4：招募期文案"
+    assert "原社群公告" in OPS_DOC[start:end]
+    assert "Part 5" not in OPS_DOC[start:end]
+
+
+def test_shallowest_heading_wins_without_part():
+    doc = "# 1 总览\n\n### 2. 细节\n\n细节内容\n\n## 2. 执行\n\n执行内容\n"
+    _, _, heading = find_section(doc, "2")
+    assert heading == "## 2. 执行"
+
+
+def test_subsection_number():
+    start, end, heading = find_section(OPS_DOC, "4.1")
+    assert heading == "## 4.1 朋友圈文案"
+    assert OPS_DOC[start:end].strip().endswith("原朋友圈文案")
+
+
+def test_missing_number():
+    assert find_section(OPS_DOC, "7") is None
+    assert splice_section(OPS_DOC, "7", "新内容") is None
+
+
+def test_splice_part_keeps_nested_section_of_other_part():
+    result = splice_section(OPS_DOC, "4", "新的招募期文案")
+    assert "# Part 4：招募期文案\n\n新的招募期文案" in result
+    assert "Part 1 里的第 4 小节" in result
+    assert "原朋友圈文案" not in result
+    assert "# Part 5：结营" in result
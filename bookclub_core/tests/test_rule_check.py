@@ -0,0 +1,42 @@
+from src.logic.rule_check import check_rules
+
+
+def _rules(text):
+    return [v["rule"] for v in check_rules(text)]
+
+
+def test_salt_limit_is_inclusive():
+    assert _rules("每天食盐控制在5g以内。") == []
+    assert _rules("每天食盐 5g 就够了。") == []
+    assert _rules("每天食盐 6g。") == ["salt"]
+    assert _rules("每天食盐不超过6克。") == ["salt"]
+
+
+def test_cholesterol_limit_above_standard_is_flagged():
+    assert _rules("每天胆固醇摄入300mg以内。") == ["cholesterol"]
+    assert _rules("每天胆固醇摄入200mg以内。") == []
+
+
+def test_egg_counts():
+    assert _rules("每天吃2个鸡蛋。") == ["egg"]
+    assert _rules("每天最多2个鸡蛋。") == ["egg"]
+    assert _rules("每天少于2个鸡蛋。") == []
+    assert _rules("每周吃5个鸡蛋，每天1个。") == []
+    assert _rules("不要每天吃3个鸡蛋。") == []
+
+
+def test_milk_and_staple():
+    assert _rules("每天喝牛奶300-500ml。") == []
+    assert _rules("每天奶类不超过600ml。") == ["milk"]
+    assert _rules("每天主食100g。") == ["staple"]
+
+
+def test_bie_inside_words_is_not_negation():
+    assert _rules("早餐特别推荐每天吃3个鸡蛋。") == ["egg"]
+    assert _rules("每天盐分别控制在8g。") == ["salt"]
+    assert _rules("别每天吃3个鸡蛋。") == []
+
+
+def test_egg_count_after_noun():
+    assert _rules("每天吃鸡蛋2个。") == ["egg"]
+    assert _rules("每天吃鸡蛋1个。") == []